@@ -0,0 +1,45 @@
+"""Add plant_biophysics table with precomputed quantification inputs
+
+Revision ID: e4b7a2c9d1f3
+Revises: c840856cb980
+Create Date: 2025-10-20 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b7a2c9d1f3'
+down_revision: Union[str, None] = 'c840856cb980'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'plant_biophysics',
+        sa.Column('plant_id', sa.Integer(), nullable=False),
+        sa.Column('lai_proxy', sa.Float(), nullable=False),
+        sa.Column('canopy_area', sa.Float(), nullable=False),
+        sa.Column('transpiration_class', sa.Float(), nullable=False),
+        sa.Column('growth_speed', sa.Float(), nullable=False),
+        sa.Column('surface_roughness', sa.Float(), nullable=False),
+        sa.Column('aromatic_bonus', sa.Float(), nullable=False),
+        sa.Column('biodiversity_score', sa.Float(), nullable=False),
+        sa.Column('base_water_need', sa.Float(), nullable=False),
+        sa.Column('maintenance_mins_week', sa.Float(), nullable=False),
+        sa.Column('risk_level', sa.String(length=20), nullable=False),
+        sa.Column('confidence_score', sa.Float(), nullable=False),
+        sa.Column('plant_updated_at', sa.DateTime(), nullable=True),
+        sa.Column('version', sa.String(length=20), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['plant_id'], ['plants.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('plant_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('plant_biophysics')
@@ -0,0 +1,58 @@
+"""Back climate data bulk upserts with the (suburb_id, recorded_date) unique constraint
+
+Revision ID: f1a9c3e5b7d2
+Revises: e4b7a2c9d1f3
+Create Date: 2025-10-22 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a9c3e5b7d2'
+down_revision: Union[str, None] = 'e4b7a2c9d1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Make sure ON CONFLICT (suburb_id, recorded_date) has a unique index to use.
+
+    Databases created from the models already have unique_suburb_date; ones
+    built by hand may not, and may hold duplicate rows that would block it.
+    """
+    # Keep only the newest row for each suburb and day
+    op.execute("""
+        DELETE FROM climate_data a
+        USING climate_data b
+        WHERE a.suburb_id = b.suburb_id
+          AND a.recorded_date = b.recorded_date
+          AND a.id < b.id
+    """)
+
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_constraint WHERE conname = 'unique_suburb_date'
+            ) THEN
+                ALTER TABLE climate_data
+                    ADD CONSTRAINT unique_suburb_date UNIQUE (suburb_id, recorded_date);
+            END IF;
+        END $$;
+    """)
+
+    # The constraint's index covers the same columns, so this one only slows writes
+    op.execute("DROP INDEX IF EXISTS idx_climate_suburb_date")
+
+
+def downgrade() -> None:
+    # unique_suburb_date predates this revision and is left in place
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS idx_climate_suburb_date
+        ON climate_data (suburb_id, recorded_date)
+    """)
@@ -4,6 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.climate_updater import ClimateUpdateService
 from app.repositories.climate_repository import ClimateRepository
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.plant_catalog import plant_catalog
+from app.utils.cache import get_cache_stats
+from app.utils.http_cache import get_http_cache_stats
 from app.core.database import get_async_db
 from app.core.config import settings
 
@@ -86,4 +90,46 @@ async def get_climate_update_status(
         status = await climate_service.get_update_status()
         return status
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error getting status: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error getting status: {str(e)}")
+
+
+@router.post("/plants/reload")
+async def reload_plant_catalog(
+    db: AsyncSession = Depends(get_async_db),
+    is_admin: bool = Depends(verify_admin_key)
+):
+    """Reload the in-memory plant catalog after plant data has been changed"""
+    try:
+        snapshot = await plant_catalog.load(DatabasePlantRepository(db))
+        return {
+            "message": "Plant catalog reloaded",
+            "version": snapshot.version,
+            "plant_count": len(snapshot)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reloading plant catalog: {str(e)}")
+
+
+@router.get("/plants/catalog")
+async def get_plant_catalog_status(
+    is_admin: bool = Depends(verify_admin_key)
+):
+    """Get version information about the in-memory plant catalog"""
+    snapshot = plant_catalog.snapshot
+    if snapshot is None:
+        return {"loaded": False, "version": 0, "plant_count": 0}
+    return {
+        "loaded": True,
+        "version": snapshot.version,
+        "plant_count": len(snapshot),
+        "loaded_at": snapshot.loaded_at.isoformat(),
+        "max_updated_at": snapshot.max_updated_at.isoformat() if snapshot.max_updated_at else None
+    }
+
+
+@router.get("/cache/stats")
+async def get_response_cache_stats(
+    is_admin: bool = Depends(verify_admin_key)
+):
+    """Get response cache hit rates per prefix, the state of each cache tier and HTTP (ETag) cache counters"""
+    return {**get_cache_stats(), "http": get_http_cache_stats()}
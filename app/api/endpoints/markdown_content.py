@@ -1,9 +1,11 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List, Dict, Any
 import os
 import glob
 from pathlib import Path
 
+from app.utils.http_cache import conditional_response, file_version, files_last_modified
+
 router = APIRouter(tags=["markdown-content"])
 
 # Base path for markdown files
@@ -38,141 +40,134 @@ def get_category_files(category: str) -> List[Dict[str, Any]]:
 
     return markdown_files
 
+async def category_response(request: Request, category: str):
+    """Category listing, ETag/304 aware and versioned by the category's files"""
+    category_path = MARKDOWN_BASE_PATH / category
+    if not category_path.exists():
+        raise HTTPException(status_code=404, detail=f"Category '{category}' not found")
+
+    paths = list(category_path.glob("*.md"))
+    return await conditional_response(
+        request,
+        file_version(paths),
+        lambda: {"category": category, "files": get_category_files(category)},
+        last_modified=files_last_modified(paths)
+    )
+
 @router.get("/markdown/categories")
-async def get_available_categories():
+async def get_available_categories(request: Request):
     """Get list of all available markdown categories"""
     try:
-        categories = []
-        if MARKDOWN_BASE_PATH.exists():
-            for item in MARKDOWN_BASE_PATH.iterdir():
-                if item.is_dir():
-                    # Count files in category
-                    file_count = len(list(item.glob("*.md")))
-                    categories.append({
-                        "name": item.name,
-                        "slug": item.name.lower().replace(" ", "-"),
-                        "file_count": file_count
-                    })
-
-        return {
-            "categories": categories,
-            "total_categories": len(categories)
-        }
+        paths = list(MARKDOWN_BASE_PATH.glob("*/*.md")) if MARKDOWN_BASE_PATH.exists() else []
+        return await conditional_response(
+            request,
+            file_version([MARKDOWN_BASE_PATH, *paths]),
+            _build_categories,
+            last_modified=files_last_modified(paths)
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching categories: {str(e)}")
 
+def _build_categories() -> Dict[str, Any]:
+    categories = []
+    if MARKDOWN_BASE_PATH.exists():
+        for item in MARKDOWN_BASE_PATH.iterdir():
+            if item.is_dir():
+                # Count files in category
+                file_count = len(list(item.glob("*.md")))
+                categories.append({
+                    "name": item.name,
+                    "slug": item.name.lower().replace(" ", "-"),
+                    "file_count": file_count
+                })
+
+    return {
+        "categories": categories,
+        "total_categories": len(categories)
+    }
+
 @router.get("/markdown/beneficial-insects")
-async def get_beneficial_insects_content():
+async def get_beneficial_insects_content(request: Request):
     """Get all markdown files from Beneficial Insects category"""
     try:
-        return {
-            "category": "Beneficial Insects",
-            "files": get_category_files("Beneficial Insects")
-        }
+        return await category_response(request, "Beneficial Insects")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/companion-planting")
-async def get_companion_planting_content():
+async def get_companion_planting_content(request: Request):
     """Get all markdown files from Companion Planting category"""
     try:
-        return {
-            "category": "Companion Planting",
-            "files": get_category_files("Companion Planting")
-        }
+        return await category_response(request, "Companion Planting")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/composting")
-async def get_composting_content():
+async def get_composting_content(request: Request):
     """Get all markdown files from Composting category"""
     try:
-        return {
-            "category": "Composting",
-            "files": get_category_files("Composting")
-        }
+        return await category_response(request, "Composting")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/craft")
-async def get_craft_content():
+async def get_craft_content(request: Request):
     """Get all markdown files from Craft category"""
     try:
-        return {
-            "category": "Craft",
-            "files": get_category_files("Craft")
-        }
+        return await category_response(request, "Craft")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/fertiliser-soil")
-async def get_fertiliser_soil_content():
+async def get_fertiliser_soil_content(request: Request):
     """Get all markdown files from Fertiliser Soil category"""
     try:
-        return {
-            "category": "Fertiliser Soil",
-            "files": get_category_files("Fertiliser Soil")
-        }
+        return await category_response(request, "Fertiliser Soil")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/flowers")
-async def get_flowers_content():
+async def get_flowers_content(request: Request):
     """Get all markdown files from flowers category"""
     try:
-        return {
-            "category": "flowers",
-            "files": get_category_files("flowers")
-        }
+        return await category_response(request, "flowers")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/grow-guide")
-async def get_grow_guide_content():
+async def get_grow_guide_content(request: Request):
     """Get all markdown files from grow_guide category"""
     try:
-        return {
-            "category": "grow_guide",
-            "files": get_category_files("grow_guide")
-        }
+        return await category_response(request, "grow_guide")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/herbs")
-async def get_herbs_content():
+async def get_herbs_content(request: Request):
     """Get all markdown files from herbs category"""
     try:
-        return {
-            "category": "herbs",
-            "files": get_category_files("herbs")
-        }
+        return await category_response(request, "herbs")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/informational")
-async def get_informational_content():
+async def get_informational_content(request: Request):
     """Get all markdown files from informational category"""
     try:
-        return {
-            "category": "informational",
-            "files": get_category_files("informational")
-        }
+        return await category_response(request, "informational")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/pests-diseases")
-async def get_pests_diseases_content():
+async def get_pests_diseases_content(request: Request):
     """Get all markdown files from pests-diseases category"""
     try:
-        return {
-            "category": "pests-diseases",
-            "files": get_category_files("pests-diseases")
-        }
+        return await category_response(request, "pests-diseases")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/category/{category_name}")
-async def get_category_content(category_name: str):
+async def get_category_content(request: Request, category_name: str):
     """Get all markdown files from a specific category (dynamic endpoint)"""
     try:
         # Convert slug back to directory name if needed
@@ -191,15 +186,12 @@ async def get_category_content(category_name: str):
 
         actual_category = category_map.get(category_name, category_name)
 
-        return {
-            "category": actual_category,
-            "files": get_category_files(actual_category)
-        }
+        return await category_response(request, actual_category)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/markdown/file/{category_name}/{filename}")
-async def get_specific_file(category_name: str, filename: str):
+async def get_specific_file(request: Request, category_name: str, filename: str):
     """Get a specific markdown file from a category"""
     try:
         # Convert slug back to directory name if needed
@@ -231,10 +223,12 @@ async def get_specific_file(category_name: str, filename: str):
         if not file_path.exists():
             raise HTTPException(status_code=404, detail=f"File '{filename}' not found in category '{actual_category}'")
 
-        return {
-            "category": actual_category,
-            "file": read_markdown_file(file_path)
-        }
+        return await conditional_response(
+            request,
+            file_version([file_path]),
+            lambda: {"category": actual_category, "file": read_markdown_file(file_path)},
+            last_modified=files_last_modified([file_path])
+        )
     except HTTPException:
         raise
     except Exception as e:
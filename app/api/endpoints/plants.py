@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Literal, Optional
 
 from app.schemas.response import AllPlantsResponse, PaginatedPlantsResponse
 from app.services.plant_service import PlantService
 from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.plant_catalog import plant_catalog
 from app.core.database import get_async_db
+from app.utils.http_cache import cache_headers, conditional_response, is_not_modified
 
 router = APIRouter(tags=["plants"])
 
@@ -27,15 +30,49 @@ async def get_plant_service(
 
 @router.get("/plants", response_model=AllPlantsResponse)
 async def get_all_plants(
+    request: Request,
+    include_images: bool = Query(False, description="Inline each plant image as base64 (large; image_url is always set)"),
+    stream: Optional[Literal["json", "ndjson"]] = Query(
+        None, description="Stream the catalog as a chunked JSON object or as NDJSON (one plant per line)"
+    ),
     plant_service: PlantService = Depends(get_plant_service)
 ):
-    """Get all plants from the database"""
+    """Get all plants from the database
+
+    Supports If-None-Match/If-Modified-Since: the ETag changes only when the
+    plant catalog does. With ``stream`` the body is serialized in batches
+    while it is sent instead of being built (and cached) in full first.
+    """
     try:
-        return await plant_service.get_all_plants_with_images()
+        snapshot = await plant_catalog.ensure_loaded(plant_service.plant_repository)
+        if stream:
+            return _stream_plants(request, plant_service, snapshot, stream == "ndjson", include_images)
+        return await conditional_response(
+            request,
+            snapshot.fingerprint,
+            lambda: plant_service.get_all_plants_with_images(include_images=include_images),
+            last_modified=snapshot.max_updated_at,
+            cache=not include_images  # Multi-MB with images: don't hold or precompress it
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error loading plants: {str(e)}")
 
 
+def _stream_plants(request: Request, plant_service: PlantService, snapshot, ndjson: bool, include_images: bool):
+    """Chunked catalog response, still answering conditional requests with 304"""
+    etag = f"{snapshot.fingerprint}-{'ndjson' if ndjson else 'json'}{'-images' if include_images else ''}"
+    headers = cache_headers(etag, snapshot.max_updated_at)
+
+    if is_not_modified(request, etag, snapshot.max_updated_at):
+        return Response(status_code=304, headers=headers)
+
+    return StreamingResponse(
+        plant_service.stream_all_plants(snapshot, ndjson=ndjson, include_images=include_images),
+        media_type="application/x-ndjson" if ndjson else "application/json",
+        headers=headers
+    )
+
+
 @router.get("/plants/{plant_id}/image-url")
 async def get_plant_image_url(
     plant_id: int,
@@ -72,6 +109,7 @@ async def get_all_plant_images(
 
 @router.get("/plants/paginated", response_model=PaginatedPlantsResponse)
 async def get_plants_paginated(
+    request: Request,
     page: int = Query(1, ge=1, description="Page number (starts from 1)"),
     limit: int = Query(12, ge=1, le=100, description="Number of items per page"),
     category: Optional[str] = Query(None, description="Filter by category (flower, herb, vegetable)"),
@@ -93,13 +131,20 @@ async def get_plants_paginated(
 
     Returns:
         PaginatedPlantsResponse with plants and pagination metadata
+        (ETag/304 aware, versioned by the plant catalog)
     """
     try:
-        return await plant_service.get_plants_paginated(
-            page=page,
-            limit=limit,
-            category=category,
-            search_term=search
+        snapshot = await plant_catalog.ensure_loaded(plant_service.plant_repository)
+        return await conditional_response(
+            request,
+            snapshot.fingerprint,
+            lambda: plant_service.get_plants_paginated(
+                page=page,
+                limit=limit,
+                category=category,
+                search_term=search
+            ),
+            last_modified=snapshot.max_updated_at
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from types import SimpleNamespace
 from typing import List
 
 from app.schemas.request import PlantQuantificationRequest
@@ -8,6 +9,7 @@ from app.services.quantification_service import QuantificationService
 from app.repositories.database_plant_repository import DatabasePlantRepository
 from app.repositories.climate_repository import ClimateRepository
 from app.core.database import get_async_db
+from app.services.plant_catalog import plant_catalog
 
 router = APIRouter(tags=["quantification"])
 
@@ -32,6 +34,53 @@ async def get_quantification_service() -> QuantificationService:
     return QuantificationService()
 
 
+def _default_suburb(name: str) -> SimpleNamespace:
+    """UHI context used when a suburb is not in the database"""
+    return SimpleNamespace(
+        name=name,
+        suburb_heat_category="Moderate Heat",
+        suburb_heat_intensity=8.0
+    )
+
+
+def _build_quantification_response(
+    request: PlantQuantificationRequest,
+    plant,
+    quantified_impact,
+    suitability
+) -> PlantQuantificationResponse:
+    """Build the API response for one quantified plant"""
+    # Determine climate zone
+    climate_zone = request.climate_zone or "temperate"
+
+    return PlantQuantificationResponse(
+        plant_name=plant.plant_name,
+        scientific_name=plant.scientific_name,
+        plant_category=plant.plant_category,
+        quantified_impact=QuantifiedImpactResponse(
+            temperature_reduction_c=quantified_impact.temperature_reduction_c,
+            air_quality_points=quantified_impact.air_quality_points,
+            co2_absorption_g_year=quantified_impact.co2_absorption_g_year,  # Fixed: now in grams
+            water_processed_l_week=quantified_impact.water_processed_l_week,
+            pollinator_support=quantified_impact.pollinator_support,
+            edible_yield=quantified_impact.edible_yield,
+            maintenance_time=quantified_impact.maintenance_time,
+            water_requirement=quantified_impact.water_requirement,
+            risk_badge=quantified_impact.risk_badge,
+            confidence_level=quantified_impact.confidence_level,
+            why_this_plant=quantified_impact.why_this_plant,
+            community_impact_potential=quantified_impact.community_impact_potential
+        ),
+        suitability_score=SuitabilityScoreResponse(
+            total_score=suitability.total_score,
+            breakdown=suitability.breakdown
+        ),
+        suburb=request.suburb,
+        climate_zone=climate_zone,
+        plant_count=request.plant_count
+    )
+
+
 @router.post("/quantify-plant", response_model=PlantQuantificationResponse)
 async def quantify_plant_impact(
     request: PlantQuantificationRequest,
@@ -55,8 +104,9 @@ async def quantify_plant_impact(
     - Community impact potential
     """
     try:
-        # Get plant data
-        plant = await plant_repository.get_plant_object_by_name(request.plant_name)
+        # Get plant data from the in-memory catalog
+        snapshot = await plant_catalog.ensure_loaded(plant_repository)
+        plant = snapshot.find_by_name(request.plant_name)
         if not plant:
             raise HTTPException(
                 status_code=404,
@@ -66,58 +116,23 @@ async def quantify_plant_impact(
         # Get suburb data for UHI context
         suburb = await climate_repository.get_suburb_by_name(request.suburb)
         if not suburb:
-            # Use default suburb data if not found - create a simple object with required attributes
-            class DefaultSuburb:
-                def __init__(self, name):
-                    self.name = name
-                    self.suburb_heat_category = "Moderate Heat"
-                    self.suburb_heat_intensity = 8.0
-
-            suburb = DefaultSuburb(request.suburb)
+            # Use default suburb data if not found
+            suburb = _default_suburb(request.suburb)
 
         # Extract preferences
         site_prefs = request.user_preferences.site
         user_prefs = request.user_preferences.preferences
 
-        # Quantify plant impact using optimized method that returns metrics and suitability
-        quantified_impact, metrics, suitability = quantification_service.quantify_plant_impact_with_metrics(
-            plant=plant,
+        # Quantify plant impact using the precomputed catalog biophysics
+        quantified_impact, metrics, suitability = quantification_service.quantify_many(
+            [plant],
             site=site_prefs,
             preferences=user_prefs,
             suburb=suburb,
             plant_count=request.plant_count
-        )
+        )[0]
 
-        # Determine climate zone
-        climate_zone = request.climate_zone or "temperate"
-
-        # Build response
-        return PlantQuantificationResponse(
-            plant_name=plant.plant_name,
-            scientific_name=plant.scientific_name,
-            plant_category=plant.plant_category,
-            quantified_impact=QuantifiedImpactResponse(
-                temperature_reduction_c=quantified_impact.temperature_reduction_c,
-                air_quality_points=quantified_impact.air_quality_points,
-                co2_absorption_g_year=quantified_impact.co2_absorption_g_year,  # Fixed: now in grams
-                water_processed_l_week=quantified_impact.water_processed_l_week,
-                pollinator_support=quantified_impact.pollinator_support,
-                edible_yield=quantified_impact.edible_yield,
-                maintenance_time=quantified_impact.maintenance_time,
-                water_requirement=quantified_impact.water_requirement,
-                risk_badge=quantified_impact.risk_badge,
-                confidence_level=quantified_impact.confidence_level,
-                why_this_plant=quantified_impact.why_this_plant,
-                community_impact_potential=quantified_impact.community_impact_potential
-            ),
-            suitability_score=SuitabilityScoreResponse(
-                total_score=suitability.total_score,
-                breakdown=suitability.breakdown
-            ),
-            suburb=request.suburb,
-            climate_zone=climate_zone,
-            plant_count=request.plant_count
-        )
+        return _build_quantification_response(request, plant, quantified_impact, suitability)
 
     except Exception as e:
         import traceback
@@ -149,27 +164,48 @@ async def batch_quantify_plants(
                 detail="Maximum 20 plants can be quantified in a single batch request"
             )
 
-        results = []
-
-        for request in requests:
-            try:
-                # Reuse single quantification logic
-                result = await quantify_plant_impact(
-                    request=request,
-                    plant_repository=plant_repository,
-                    climate_repository=climate_repository,
-                    quantification_service=quantification_service
-                )
-                results.append(result)
+        snapshot = await plant_catalog.ensure_loaded(plant_repository)
 
-            except HTTPException as e:
+        # Group requests that share suburb, site, preferences and plant count so
+        # each group is quantified in one vectorized call
+        groups = {}
+        suburbs = {}
+        for index, request in enumerate(requests):
+            plant = snapshot.find_by_name(request.plant_name)
+            if not plant:
                 # Skip plants that aren't found but continue with others
-                if e.status_code == 404:
-                    continue
-                else:
-                    raise e
+                continue
+
+            suburb_key = request.suburb.lower()
+            if suburb_key not in suburbs:
+                suburbs[suburb_key] = await climate_repository.get_suburb_by_name(request.suburb) \
+                    or _default_suburb(request.suburb)
+
+            key = (
+                suburb_key,
+                request.user_preferences.site.model_dump_json(),
+                request.user_preferences.preferences.model_dump_json(),
+                request.plant_count
+            )
+            groups.setdefault(key, []).append((index, request, plant))
+
+        results = {}
+        for (suburb_key, _, _, plant_count), members in groups.items():
+            first = members[0][1]
+            quantified = quantification_service.quantify_many(
+                [plant for _, _, plant in members],
+                site=first.user_preferences.site,
+                preferences=first.user_preferences.preferences,
+                suburb=suburbs[suburb_key],
+                plant_count=plant_count
+            )
+            for (index, request, plant), (quantified_impact, _, suitability) in zip(members, quantified):
+                results[index] = _build_quantification_response(
+                    request, plant, quantified_impact, suitability
+                )
 
-        return results
+        # Return results in request order
+        return [results[index] for index in sorted(results)]
 
     except Exception as e:
         import traceback
@@ -1,16 +1,45 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
-import json
-import os
+from fastapi import APIRouter, HTTPException, Request
 from pathlib import Path
 from typing import Optional
 
+from app.core.config import settings
+from app.services.uhi_data import UHI_DATA_PATH, UHISnapshot, uhi_data
+from app.services.uhi_tiles import StaleTilesError, uhi_tiles
+from app.utils.http_cache import conditional_response, file_version, files_last_modified, respond
+
 router = APIRouter(tags=["uhi"])
 
-# Base path for UHI data files - relative to project root
-# Get the project root directory (where app/ folder is located)
-PROJECT_ROOT = Path(__file__).parent.parent.parent.parent  # Go up from endpoints/uhi.py to project root
-UHI_DATA_PATH = PROJECT_ROOT / "app" / "static" / "uhi"
+
+def _heat_snapshot() -> UHISnapshot:
+    """Preloaded heat dataset (reloaded only when the file changes)"""
+    try:
+        return uhi_data.get()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing data: {str(e)}")
+
+
+def _tile_pack():
+    """Open boundary tile pack (refused while it lags behind the heat data)"""
+    try:
+        return uhi_tiles.get()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except StaleTilesError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+async def _static_response(request: Request, path: Path, build, media_type: str = "application/json", max_age: int = None):
+    """ETag/304-aware response for data built from one file (versioned by its mtime)"""
+    return await conditional_response(
+        request,
+        file_version([path]),
+        build,
+        media_type=media_type,
+        last_modified=files_last_modified([path]),
+        max_age=max_age
+    )
 
 # Essential endpoints for basic heatmap
 @router.get("/boundaries")
@@ -36,170 +65,145 @@ async def get_suburb_boundaries(simplified: bool = True):
             "description": "Full detail boundaries"
         }
 
-@router.get("/data")
-async def get_uhi_data():
-    """Get heat intensity data to color the polygons - Essential for heatmap"""
-    file_path = UHI_DATA_PATH / "melbourne_heat_data.json"
+@router.get("/tiles")
+async def get_tile_metadata():
+    """Describe the boundary tiles (URL template, zoom range, bounds) for the map layer
 
-    if not file_path.exists():
+    Tiles are per-zoom simplified GeoJSON with heat values already joined
+    in, so the map needs one request per visible tile instead of the
+    boundaries file plus /data. Zoom in past max_zoom by scaling max_zoom tiles.
+    """
+    pack = _tile_pack()
+    return {
+        "url": f"{settings.API_V1_STR}/uhi/tiles/{{z}}/{{x}}/{{y}}.geojson",
+        "min_zoom": pack.min_zoom,
+        "max_zoom": pack.max_zoom,
+        "bounds": pack.header.get("bounds"),
+        "tiles": len(pack),
+        "source_version": pack.header.get("source_version")
+    }
+
+@router.get("/tiles/{z}/{x}/{y}.geojson")
+async def get_boundary_tile(request: Request, z: int, x: int, y: int):
+    """Get one z/x/y boundary tile (served from the memory-mapped tile pack)"""
+    pack = _tile_pack()
+    body = pack.tile(z, x, y)
+    if body is None:
         raise HTTPException(
             status_code=404,
-            detail=f"UHI data not found at {file_path.absolute()}"
+            detail=f"No tile {z}/{x}/{y}; zoom levels {pack.min_zoom}-{pack.max_zoom} are available"
         )
+    return respond(request, body, max_age=86400)
 
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-
-        # Clean the data - replace infinity values with large numbers that JSON can handle
-        # The original data has max values as 999 which might be causing issues
-        import math
-
-        def clean_json_data(obj):
-            """Recursively clean JSON data to remove inf/nan values"""
-            if isinstance(obj, dict):
-                return {k: clean_json_data(v) for k, v in obj.items()}
-            elif isinstance(obj, list):
-                return [clean_json_data(item) for item in obj]
-            elif isinstance(obj, float):
-                if math.isinf(obj) or math.isnan(obj):
-                    return None  # or return 0, or some default value
-                return obj
-            return obj
-
-        # Clean the data
-        cleaned_data = clean_json_data(data)
-
-        # Alternative fix: Just return the data using JSONResponse which handles special values
-        from fastapi.responses import JSONResponse
-        import json as json_module
-
-        # Use json.dumps with allow_nan=False to catch issues
-        json_str = json_module.dumps(cleaned_data, allow_nan=False)
-        return JSONResponse(content=json_module.loads(json_str))
+@router.get("/data")
+async def get_uhi_data(request: Request):
+    """Get heat intensity data to color the polygons - Essential for heatmap
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error processing data: {str(e)}")
+    Served from bytes prebuilt when the dataset was loaded (inf/NaN values
+    already replaced with null).
+    """
+    return respond(request, _heat_snapshot().data_body)
 
 # Nice-to-have endpoints
 @router.get("/suburb/{suburb_id}")
-async def get_suburb_heat_data(suburb_id: str):
+async def get_suburb_heat_data(request: Request, suburb_id: str):
     """Get heat data for specific suburb when user clicks"""
-    file_path = UHI_DATA_PATH / "melbourne_heat_data.json"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="UHI data not found")
-
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-
-    # Find suburb in data
-    for suburb in data.get('suburbs', []):
-        if suburb['id'] == suburb_id:
-            return {
-                "suburb": suburb,
-                "heat_categories": data['heat_categories']
-            }
-
-    raise HTTPException(status_code=404, detail=f"Suburb {suburb_id} not found")
+    snapshot = _heat_snapshot()
+    suburb = snapshot.by_id.get(suburb_id)
+    if suburb is None:
+        raise HTTPException(status_code=404, detail=f"Suburb {suburb_id} not found")
+
+    return await conditional_response(
+        request,
+        snapshot.version,
+        lambda: {"suburb": suburb, "heat_categories": snapshot.heat_categories},
+        last_modified=snapshot.last_modified
+    )
 
 @router.get("/metadata")
-async def get_metadata():
+async def get_metadata(request: Request):
     """Get dataset metadata and heat categories for legend display"""
-    file_path = UHI_DATA_PATH / "melbourne_heat_data.json"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="UHI data not found")
-
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-
-    return {
-        "metadata": data.get('metadata', {}),
-        "statistics": data.get('statistics', {}),
-        "heat_categories": data.get('heat_categories', {})
-    }
+    return respond(request, _heat_snapshot().metadata_body)
 
 # Optional endpoints for additional features
 @router.get("/suburbs/search")
-async def search_suburbs(q: str, limit: int = 10):
-    """Search suburbs by name for search bar feature"""
-    file_path = UHI_DATA_PATH / "melbourne_heat_data.json"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="UHI data not found")
-
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-
-    query = q.lower()
-    suburbs = data.get('suburbs', [])
+async def search_suburbs(request: Request, q: str, limit: int = 10, fuzzy: bool = True):
+    """Search suburbs by name for search bar feature
 
-    # Filter suburbs matching query
-    matching = [s for s in suburbs if query in s['name'].lower()]
-
-    # Sort by name relevance (exact match first)
-    matching.sort(key=lambda x: (not x['name'].lower().startswith(query), x['name']))
+    Names containing the query come from a suffix-array index (prefix
+    matches first). When nothing matches and fuzzy is set, the closest
+    names are returned instead, so typos still autocomplete.
+    """
+    snapshot = _heat_snapshot()
 
-    # Apply limit
-    matching = matching[:limit]
+    def build():
+        matching, used_fuzzy = snapshot.search(q, limit, fuzzy)
+        return {
+            "suburbs": matching,
+            "total": len(matching),
+            "query": q,
+            "fuzzy": used_fuzzy
+        }
 
-    return {
-        "suburbs": matching,
-        "total": len(matching),
-        "query": q
-    }
+    # Per-keystroke queries: not worth storing or precompressing, only a weak ETag
+    return await conditional_response(
+        request, snapshot.version, build, last_modified=snapshot.last_modified, cache=False
+    )
 
 @router.get("/suburbs/by-heat")
 async def get_suburbs_by_heat(
+    request: Request,
     category: Optional[str] = None,
+    min_intensity: Optional[float] = None,
+    max_intensity: Optional[float] = None,
     limit: int = 10
 ):
-    """Get suburbs sorted by heat intensity for 'Top 10 Hottest' list"""
-    file_path = UHI_DATA_PATH / "melbourne_heat_data.json"
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="UHI data not found")
-
-    with open(file_path, 'r') as f:
-        data = json.load(f)
-
-    suburbs = data.get('suburbs', [])
+    """Get suburbs sorted by heat intensity for 'Top 10 Hottest' list
 
-    # Filter by category if specified
-    if category:
-        suburbs = [s for s in suburbs if s['heat']['category'].lower() == category.lower()]
-
-    # Sort by heat intensity
-    suburbs.sort(key=lambda x: x['heat']['intensity'], reverse=True)
-
-    # Apply limit
-    suburbs = suburbs[:limit]
+    min_intensity/max_intensity (inclusive, degrees Celsius) restrict the
+    list to a heat range, e.g. a heat_categories band from /metadata.
+    """
+    snapshot = _heat_snapshot()
+
+    def build():
+        if min_intensity is None and max_intensity is None:
+            # Pre-sorted per category, so this is a slice
+            suburbs = snapshot.hottest(category, limit)
+        else:
+            suburbs = snapshot.in_heat_range(min_intensity, max_intensity)
+            if category:
+                suburbs = [s for s in suburbs if s["heat"]["category"].lower() == category.lower()]
+            suburbs = suburbs[:limit]
+
+        filters = {"category": category} if category else {}
+        if min_intensity is not None:
+            filters["min_intensity"] = min_intensity
+        if max_intensity is not None:
+            filters["max_intensity"] = max_intensity
+        return {
+            "suburbs": suburbs,
+            "total": len(suburbs),
+            "filter": filters or None
+        }
 
-    return {
-        "suburbs": suburbs,
-        "total": len(suburbs),
-        "filter": {"category": category} if category else None
-    }
+    return await conditional_response(
+        request, snapshot.version, build, last_modified=snapshot.last_modified, cache=False
+    )
 
 @router.get("/summary")
-async def get_heat_summary():
+async def get_heat_summary(request: Request):
     """Get heat category summary statistics for dashboard"""
     file_path = UHI_DATA_PATH / "heat_category_summary.csv"
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Summary data not found")
 
-    return FileResponse(
-        path=file_path,
-        media_type="text/csv",
-        headers={"Cache-Control": "public, max-age=86400"}
-    )
+    return await _static_response(request, file_path, file_path.read_bytes, media_type="text/csv", max_age=86400)
 
 @router.get("/chart-data")
-async def get_chart_data():
+async def get_chart_data(request: Request):
     """Get chart data CSV for additional visualizations"""
     file_path = UHI_DATA_PATH / "melbourne_heat_chart_data.csv"
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="Chart data not found")
 
-    return FileResponse(
-        path=file_path,
-        media_type="text/csv",
-        headers={"Cache-Control": "public, max-age=86400"}
-    )
\ No newline at end of file
+    return await _static_response(request, file_path, file_path.read_bytes, media_type="text/csv", max_age=86400)
\ No newline at end of file
@@ -1,10 +1,22 @@
-from typing import List
+from typing import Dict, List
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _parse_prefix_map(value: str) -> Dict[str, int]:
+    """Parse "prefix:number,prefix:number" into a dict (used for per-prefix cache settings)"""
+    result = {}
+    for item in value.split(","):
+        if ":" in item:
+            prefix, number = item.split(":", 1)
+            result[prefix.strip()] = int(number)
+    return result
+
+
 class Settings:
     """Application configuration settings"""
     
@@ -59,6 +71,22 @@ class Settings:
     WAQI_API_TOKEN: str = os.getenv("WAQI_API_TOKEN", "")
     OPEN_METEO_API_KEY: str = os.getenv("OPEN_METEO_API_KEY", "")
     EPA_VIC_API_KEY: str = os.getenv("EPA_VIC_API_KEY", "")
+
+    # Climate updates fetch once per grid cell and share the result with every suburb in it (0 = per suburb)
+    CLIMATE_WEATHER_GRID_DEGREES: float = float(os.getenv("CLIMATE_WEATHER_GRID_DEGREES", "0.05"))  # ~5 km
+    CLIMATE_AQI_GRID_DEGREES: float = float(os.getenv("CLIMATE_AQI_GRID_DEGREES", "0.1"))  # Coarser: ~10 WAQI stations cover Melbourne
+    # Fetched climate rows are buffered and written this many at a time with one upsert
+    CLIMATE_UPSERT_BATCH_SIZE: int = int(os.getenv("CLIMATE_UPSERT_BATCH_SIZE", "100"))
+    # Climate API scheduling: requests per second per upstream, concurrent calls,
+    # per-attempt deadline and retries, and the circuit breaker that pauses a failing upstream
+    OPEN_METEO_RATE_LIMIT: float = float(os.getenv("OPEN_METEO_RATE_LIMIT", "5"))
+    WAQI_RATE_LIMIT: float = float(os.getenv("WAQI_RATE_LIMIT", "5"))
+    ARPANSA_RATE_LIMIT: float = float(os.getenv("ARPANSA_RATE_LIMIT", "1"))
+    CLIMATE_WORKERS: int = int(os.getenv("CLIMATE_WORKERS", "10"))
+    CLIMATE_REQUEST_DEADLINE: float = float(os.getenv("CLIMATE_REQUEST_DEADLINE", "15"))
+    CLIMATE_MAX_RETRIES: int = int(os.getenv("CLIMATE_MAX_RETRIES", "2"))
+    CLIMATE_CIRCUIT_FAILURES: int = int(os.getenv("CLIMATE_CIRCUIT_FAILURES", "5"))
+    CLIMATE_CIRCUIT_RESET_SECONDS: int = int(os.getenv("CLIMATE_CIRCUIT_RESET_SECONDS", "300"))
     
     # Google Cloud Storage
     GCS_BUCKET_URL: str = os.getenv("GCS_BUCKET_URL", "https://storage.googleapis.com/plantopia-images-1757656642/plant_images")
@@ -69,6 +97,37 @@ class Settings:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))  # 7 days
     ALGORITHM: str = "HS256"
 
+    # Plant catalog: seconds between checks of plants.updated_at (0 disables polling)
+    PLANT_CATALOG_REFRESH_SECONDS: int = int(os.getenv("PLANT_CATALOG_REFRESH_SECONDS", "300"))
+
+    # Maximum number of profiles accepted by POST /recommendations/batch
+    RECOMMENDATION_BATCH_MAX: int = int(os.getenv("RECOMMENDATION_BATCH_MAX", "500"))
+
+    # Response cache (app.utils.cache)
+    # L1 is per worker; L2 is shared by all workers: "" (none), "sqlite" or "redis"
+    CACHE_L1_MAXSIZE: int = int(os.getenv("CACHE_L1_MAXSIZE", "1000"))  # Entries per prefix
+    CACHE_PREFIX_MAXSIZE: Dict[str, int] = _parse_prefix_map(os.getenv("CACHE_PREFIX_MAXSIZE", ""))  # e.g. "recommendations:5000"
+    CACHE_L1_MAX_BYTES: int = int(os.getenv("CACHE_L1_MAX_BYTES", str(256 * 1024 * 1024)))  # Memory budget for L1 (0 = no limit)
+    CACHE_PREFIX_MAX_BYTES: Dict[str, int] = _parse_prefix_map(os.getenv("CACHE_PREFIX_MAX_BYTES", ""))  # e.g. "recommendations:67108864"
+    CACHE_PREFIX_TTL: Dict[str, int] = _parse_prefix_map(os.getenv("CACHE_PREFIX_TTL", ""))  # Overrides decorator TTLs
+    CACHE_PREFIX_STALE_TTL: Dict[str, int] = _parse_prefix_map(os.getenv("CACHE_PREFIX_STALE_TTL", ""))  # Stale-while-revalidate windows
+    CACHE_L2_BACKEND: str = os.getenv("CACHE_L2_BACKEND", "").lower()
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", str(Path(tempfile.gettempdir()) / "plantopia_cache.sqlite3"))
+    CACHE_REDIS_URL: str = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    CACHE_L1_MAX_TTL: int = int(os.getenv("CACHE_L1_MAX_TTL", "60"))  # L1 lifetime cap when an L2 is configured
+    CACHE_INVALIDATION_POLL_SECONDS: float = float(os.getenv("CACHE_INVALIDATION_POLL_SECONDS", "1"))  # How often workers replay the L2 invalidation log
+
+    # HTTP response cache for static reference endpoints (ETag/304, precompressed bodies)
+    HTTP_CACHE_MAX_BYTES: int = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    HTTP_CACHE_MAX_AGE: int = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))  # Browsers revalidate with If-None-Match after this
+
+    # Shared outbound HTTP client (climate APIs)
+    HTTP_CLIENT_POOL_SIZE: int = int(os.getenv("HTTP_CLIENT_POOL_SIZE", "100"))  # Open connections across all hosts
+    HTTP_CLIENT_PER_HOST: int = int(os.getenv("HTTP_CLIENT_PER_HOST", "10"))  # Concurrent connections per API host
+    HTTP_CLIENT_DNS_TTL: int = int(os.getenv("HTTP_CLIENT_DNS_TTL", "300"))  # Seconds to cache DNS lookups
+    HTTP_CLIENT_KEEPALIVE: float = float(os.getenv("HTTP_CLIENT_KEEPALIVE", "30"))  # Seconds idle connections are kept
+    HTTP_CLIENT_TIMEOUT: float = float(os.getenv("HTTP_CLIENT_TIMEOUT", "10"))  # Total seconds per request
+
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
@@ -0,0 +1,86 @@
+"""
+Shared outbound HTTP client
+
+One pooled aiohttp session per process, opened in the app lifespan and
+injected into the climate API clients, so connections (TCP + TLS) and DNS
+lookups are reused across suburbs and APIs instead of being set up for
+every request.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Default per-request timeout for the API clients
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=settings.HTTP_CLIENT_TIMEOUT)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class UpstreamError(Exception):
+    """An upstream API request failed (connection error, timeout or error response)
+
+    The API clients raise this instead of returning None, which they keep
+    for a successful response that carries no data.
+    """
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Create a connection-pooled session
+
+    Must be called from a running event loop.
+
+    Returns:
+        aiohttp.ClientSession with keep-alive, DNS caching and per-host limits
+    """
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_CLIENT_POOL_SIZE,
+        limit_per_host=settings.HTTP_CLIENT_PER_HOST,
+        ttl_dns_cache=settings.HTTP_CLIENT_DNS_TTL,
+        keepalive_timeout=settings.HTTP_CLIENT_KEEPALIVE
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=REQUEST_TIMEOUT)
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Shared session for the running event loop
+
+    Normally opened by ``init_http_client`` at startup; scripts and
+    background jobs running outside the app get one created on first use.
+
+    Returns:
+        aiohttp.ClientSession
+    """
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        # A session is bound to the loop it was created on
+        _session = create_http_session()
+        _session_loop = loop
+    return _session
+
+
+async def init_http_client() -> aiohttp.ClientSession:
+    """Open the shared session (app startup)."""
+    session = get_http_session()
+    logger.info(
+        f"HTTP client pool ready (limit={settings.HTTP_CLIENT_POOL_SIZE}, "
+        f"per host={settings.HTTP_CLIENT_PER_HOST})"
+    )
+    return session
+
+
+async def close_http_client() -> None:
+    """Close the shared session and its pooled connections (app shutdown)."""
+    global _session, _session_loop
+    session, _session, _session_loop = _session, None, None
+    if session is not None and not session.closed:
+        await session.close()
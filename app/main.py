@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.gzip import GZipMiddleware
 from contextlib import asynccontextmanager
@@ -5,7 +7,13 @@ from fastapi.responses import Response
 
 from app.core.config import settings
 from app.api.endpoints import api_router
-from app.core.database import init_db, close_db
+from app.core.database import init_db, close_db, AsyncSessionLocal
+from app.core.http_client import init_http_client, close_http_client
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.plant_catalog import plant_catalog
+from app.services.uhi_data import uhi_data
+from app.services.uhi_tiles import uhi_tiles
+from app.utils.cache import close_cache
 
 
 @asynccontextmanager
@@ -14,8 +22,35 @@ async def lifespan(app: FastAPI):
     # Startup
     await init_db()
     print("Database initialized")
+
+    # Pooled outbound HTTP session shared by the climate API clients
+    await init_http_client()
+
+    # Load static plant reference data once; requests fall back to lazy loading
+    try:
+        async with AsyncSessionLocal() as session:
+            await plant_catalog.load(DatabasePlantRepository(session))
+    except Exception as e:
+        print(f"Warning: plant catalog not loaded at startup: {e}")
+    plant_catalog.start_auto_refresh(AsyncSessionLocal, settings.PLANT_CATALOG_REFRESH_SECONDS)
+
+    # Parse, sanitize and pre-serialize the UHI heat dataset once
+    try:
+        uhi_data.load()
+    except Exception as e:
+        print(f"Warning: UHI data not loaded at startup: {e}")
+
+    # Boundary tiles are generated, not committed: build them if missing or stale
+    try:
+        await asyncio.to_thread(uhi_tiles.ensure_current)
+    except Exception as e:
+        print(f"Warning: UHI tiles not built at startup: {e}")
+
     yield
     # Shutdown
+    await plant_catalog.stop_auto_refresh()
+    await close_cache()
+    await close_http_client()
     await close_db()
     print("Database connections closed")
 
@@ -91,6 +91,37 @@ class Plant(Base):
     )
 
 
+class PlantBiophysics(Base):
+    """
+    Plant biophysics model - quantification inputs derived from the free-text
+    plant columns (spacing, type, characteristics, position, maturity).
+    Computed once per plant by the data load scripts, recomputed when the plant
+    row changes or the derivation version is bumped.
+    """
+    __tablename__ = 'plant_biophysics'
+
+    plant_id = Column(Integer, ForeignKey('plants.id', ondelete='CASCADE'), primary_key=True)
+    lai_proxy = Column(Float, nullable=False)  # Leaf Area Index proxy
+    canopy_area = Column(Float, nullable=False)  # m² per plant
+    transpiration_class = Column(Float, nullable=False)
+    growth_speed = Column(Float, nullable=False)
+    surface_roughness = Column(Float, nullable=False)
+    aromatic_bonus = Column(Float, nullable=False)
+    biodiversity_score = Column(Float, nullable=False)
+    base_water_need = Column(Float, nullable=False)  # L/week before season and wind factors
+    maintenance_mins_week = Column(Float, nullable=False)
+    risk_level = Column(String(20), nullable=False)  # low, medium, high
+    confidence_score = Column(Float, nullable=False)
+
+    # Staleness tracking
+    plant_updated_at = Column(DateTime)  # plants.updated_at the values were derived from
+    version = Column(String(20), nullable=False)  # Derivation version
+    computed_at = Column(DateTime, default=datetime.utcnow)
+
+    # Relationships
+    plant = relationship("Plant")
+
+
 class Suburb(Base):
     """Suburb model - stores Melbourne suburb information"""
     __tablename__ = 'suburbs'
@@ -153,10 +184,10 @@ class ClimateData(Base):
     # Relationships
     suburb = relationship("Suburb", back_populates="climate_data")
     
-    # Ensure unique climate records per suburb per day
+    # Ensure unique climate records per suburb per day; the constraint's index
+    # also serves (suburb_id, recorded_date) lookups and the bulk upsert's ON CONFLICT
     __table_args__ = (
         UniqueConstraint('suburb_id', 'recorded_date', name='unique_suburb_date'),
-        Index('idx_climate_suburb_date', 'suburb_id', 'recorded_date'),
     )
 
 
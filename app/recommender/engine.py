@@ -1,13 +1,16 @@
+import heapq
+import numpy as np
 import pandas as pd
 import json
 import os
 import re
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from dateutil import tz
 from dateutil import parser as dtparser
 from app.recommender.normalization import normalize_dataframe
 from app.recommender.scoring import calculate_scores, goal_match
+from app.recommender.matrix import PlantMatrix, calculate_scores_batch, MONTHS, SUN_ORDER
 
 
 def _norm(s: str) -> str:
@@ -97,10 +100,9 @@ def select_environment(suburb: str, climate_json: dict, cli_override_climate_zon
 
     return env
 
-def get_user_preferences(path: str) -> Dict[str, Any]:
-    """Load user preferences with defaults."""
-    # Default preferences
-    defaults = {
+def default_user_preferences() -> Dict[str, Any]:
+    """Default user preferences (a fresh copy on every call)."""
+    return {
         "user_id": "anon_mvp",
         "site": {
             "location_type": "balcony",
@@ -136,26 +138,52 @@ def get_user_preferences(path: str) -> Dict[str, Any]:
             "wind_speed_kph": 15
         }
     }
-    
+
+def merge_user_preferences(user_data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Fill missing sections and keys of a preferences dict with defaults.
+
+    In-memory equivalent of get_user_preferences for API requests. The input
+    dict and its sections are not modified.
+
+    Args:
+        user_data: User preferences, e.g. ``request.user_preferences.dict()``
+
+    Returns:
+        Preferences with every default section and key present
+    """
+    defaults = default_user_preferences()
+    if user_data is None:
+        return defaults
+
+    try:
+        merged = {
+            section: dict(value) if isinstance(value, dict) else value
+            for section, value in user_data.items()
+        }
+        for section in defaults:
+            if section not in merged:
+                merged[section] = defaults[section]
+            elif isinstance(defaults[section], dict):
+                for key, value in defaults[section].items():
+                    if key not in merged[section]:
+                        merged[section][key] = value
+        return merged
+    except Exception as e:
+        print(f"Warning: Could not merge user preferences: {e}")
+        return defaults
+
+def get_user_preferences(path: str) -> Dict[str, Any]:
+    """Load user preferences from a JSON file with defaults (legacy CLI scenarios)."""
     if os.path.exists(path):
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 user_data = json.load(f)
-            
-            # Merge with defaults
-            for section in defaults:
-                if section not in user_data:
-                    user_data[section] = defaults[section]
-                elif isinstance(defaults[section], dict):
-                    for key, value in defaults[section].items():
-                        if key not in user_data[section]:
-                            user_data[section][key] = value
-            
-            return user_data
         except Exception as e:
             print(f"Warning: Could not load user preferences from {path}: {e}")
+        else:
+            return merge_user_preferences(user_data)
     
-    return defaults
+    return default_user_preferences()
 
 def hard_filter(plants: List[Dict[str, Any]], user: Dict[str, Any], env: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Apply hard filters to plant list."""
@@ -205,14 +233,47 @@ def hard_filter(plants: List[Dict[str, Any]], user: Dict[str, Any], env: Dict[st
     
     return filtered
 
+def hard_filter_indexed(matrix: PlantMatrix, user: Dict[str, Any], env: Dict[str, Any]) -> np.ndarray:
+    """Bitmask version of hard_filter over a PlantMatrix.
+
+    Returns:
+        Row numbers of the eligible plants, in catalog order
+    """
+    user_site = user.get("site", {})
+    user_preferences = user.get("preferences", {})
+    climate_zone = env.get("climate_zone", "temperate")
+    month_now = env.get("month_now", datetime.now().strftime("%B"))
+
+    mask = matrix.sowable(climate_zone, month_now).copy()
+
+    goal = user_preferences.get("goal", "mixed")
+    if goal == "edible":
+        mask &= matrix.edible
+    elif goal == "ornamental":
+        mask &= ~matrix.edible
+
+    if user_site.get("location_type") == "indoors":
+        mask &= matrix.indoor_ok
+    if user_site.get("containers"):
+        mask &= matrix.container_ok
+
+    mask &= matrix.sun_within(user_site.get("sun_exposure", "part_sun"), 1)
+
+    return np.flatnonzero(mask)
+
 def relax_if_needed(eligible: List[Dict[str, Any]], all_plants: List[Dict[str, Any]], 
-                   user: Dict[str, Any], env: Dict[str, Any], target: int = 5) -> List[Dict[str, Any]]:
-    """Relax filters if needed to reach target."""
+                   user: Dict[str, Any], env: Dict[str, Any], target: int = 5,
+                   notes: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Relax filters if needed to reach target.
+
+    Relaxation notes are appended to ``notes`` when a list is supplied.
+    """
     if len(eligible) >= target:
         return eligible
     
     # Collect notes about relaxations
-    notes = []
+    if notes is None:
+        notes = []
     
     # 1. Include "near" season ±1 month
     climate_zone = env.get("climate_zone", "temperate")
@@ -289,14 +350,77 @@ def relax_if_needed(eligible: List[Dict[str, Any]], all_plants: List[Dict[str, A
     # 3. If still not enough, return what we have
     return further_expanded
 
+def relax_indexed(matrix: PlantMatrix, eligible_rows: np.ndarray, user: Dict[str, Any],
+                  env: Dict[str, Any], target: int = 5) -> Tuple[np.ndarray, List[str]]:
+    """Bitmask version of relax_if_needed over a PlantMatrix.
+
+    Args:
+        matrix: Plant matrix the rows refer to
+        eligible_rows: Rows returned by hard_filter_indexed
+        user: User preferences
+        env: Environment dictionary
+        target: Number of candidates wanted
+
+    Returns:
+        Tuple of (candidate rows in relax_if_needed order, relaxation notes)
+    """
+    notes: List[str] = []
+    if len(eligible_rows) >= target:
+        return eligible_rows, notes
+
+    climate_zone = env.get("climate_zone", "temperate")
+    month_now = env.get("month_now", datetime.now().strftime("%B"))
+    try:
+        current_idx = MONTHS.index(month_now)
+        near_months = [MONTHS[(current_idx - 1) % 12], month_now, MONTHS[(current_idx + 1) % 12]]
+    except ValueError:
+        near_months = [month_now]
+
+    included = np.zeros(len(matrix), dtype=bool)
+    included[eligible_rows] = True
+
+    # 1. Include "near" season ±1 month
+    season_rows = np.flatnonzero(matrix.sowable_any(climate_zone, near_months) & ~included)
+    if len(season_rows) > 0:
+        notes.append(f"Relaxed season by ±1 month for {len(season_rows)} items.")
+    rows = np.concatenate([eligible_rows, season_rows])
+    if len(rows) >= target:
+        return rows, notes
+    included[season_rows] = True
+
+    # 2. Allow sun difference up to 2 steps
+    user_sun = user.get("site", {}).get("sun_exposure", "part_sun")
+    if user_sun not in SUN_ORDER:
+        user_sun = "part_sun"
+    sun_rows = np.flatnonzero(matrix.sun_within(user_sun, 2) & ~included)
+    if len(sun_rows) > 0:
+        notes.append(f"Relaxed sun tolerance by up to 2 levels for {len(sun_rows)} items.")
+
+    return np.concatenate([rows, sun_rows]), notes
+
 def score_and_rank(candidates: List[Dict[str, Any]], user: Dict[str, Any], 
-                  env: Dict[str, Any], weights: Dict[str, float]) -> List[Tuple[float, Dict[str, Any], Dict[str, float]]]:
-    """Score and rank candidate plants."""
+                  env: Dict[str, Any], weights: Dict[str, float],
+                  matrix: Optional[PlantMatrix] = None,
+                  rows: Optional[np.ndarray] = None) -> List[Tuple[float, Dict[str, Any], Dict[str, float]]]:
+    """Score and rank candidate plants.
+
+    When a PlantMatrix containing the candidates is supplied, scores are computed
+    in one vectorised pass instead of calling calculate_scores per plant. ``rows``
+    may be given to skip looking the candidates up in the matrix.
+    """
     scored = []
     
-    for plant in candidates:
-        score, breakdown = calculate_scores(plant, user, env)
-        scored.append((score, plant, breakdown))
+    if matrix is not None:
+        if rows is None:
+            rows = matrix.rows_for(candidates)
+        scores, breakdowns = calculate_scores_batch(matrix, user, env, rows)
+        columns = {key: values.tolist() for key, values in breakdowns.items()}
+        for i, (score, plant) in enumerate(zip(scores.tolist(), candidates)):
+            scored.append((score, plant, {key: values[i] for key, values in columns.items()}))
+    else:
+        for plant in candidates:
+            score, breakdown = calculate_scores(plant, user, env)
+            scored.append((score, plant, breakdown))
     
     # scored is a list of tuples like (score, plant_dict, breakdown) OR similar.
     # We normalize by rounding score to 3 decimals for stable ordering.
@@ -339,6 +463,69 @@ def category_diversity(result_list: List[Tuple[float, Dict[str, Any], Dict[str,
     
     return filtered
 
+def select_top_k(rows: np.ndarray, user: Dict[str, Any], env: Dict[str, Any], matrix: PlantMatrix,
+                 n: int, max_per_cat: int = 2) -> List[Tuple[float, Dict[str, Any], Dict[str, float]]]:
+    """Score candidates and pick the final top n in one pass.
+
+    Equivalent to ``category_diversity(score_and_rank(...), max_per_cat, n)[:n]``
+    but without sorting every candidate: duplicates are dropped by canonical_id,
+    and each category keeps only its best ``max_per_cat + n`` plants in a bounded
+    heap. Ties are broken exactly like score_and_rank's stable sort.
+
+    Args:
+        rows: Candidate row numbers in the matrix (in candidate order)
+        user: User preferences
+        env: Environment dictionary
+        matrix: Plant matrix the rows refer to
+        n: Number of recommendations wanted
+        max_per_cat: Diversity cap per plant category
+
+    Returns:
+        Up to n (score, plant, breakdown) tuples, best first
+    """
+    if n <= 0 or len(rows) == 0:
+        return []
+
+    scores, breakdowns = calculate_scores_batch(matrix, user, env, rows)
+    score_list = scores.tolist()
+    row_list = rows.tolist()
+    canonical_ids = matrix.canonical_ids
+    rank_keys = matrix.rank_keys
+
+    # Dedupe: keep the best-ranked entry per canonical id
+    best: Dict[str, Tuple] = {}
+    for position, (row, score) in enumerate(zip(row_list, score_list)):
+        maturity, name = rank_keys[row]
+        key = (-round(score, 3), maturity, name, position)
+        cid = canonical_ids[row]
+        current = best.get(cid)
+        if current is None or key < current:
+            best[cid] = key
+
+    # Bounded selection per category: the capped picks plus enough overflow to fill n
+    by_category: Dict[Any, List[Tuple]] = {}
+    for key in best.values():
+        plant = matrix.plants[row_list[key[3]]]
+        by_category.setdefault(plant.get("plant_category", "unknown"), []).append(key)
+
+    capped = []
+    overflow = []
+    for keys in by_category.values():
+        top = heapq.nsmallest(max_per_cat + n, keys)
+        capped.extend(top[:max_per_cat])
+        overflow.extend(top[max_per_cat:])
+
+    selected = heapq.nsmallest(n, capped)
+    if len(selected) < n:
+        selected.extend(heapq.nsmallest(n - len(selected), overflow))
+
+    result = []
+    for key in selected:
+        position = key[3]
+        breakdown = {name: float(values[position]) for name, values in breakdowns.items()}
+        result.append((score_list[position], matrix.plants[row_list[position]], breakdown))
+    return result
+
 def assemble_output(top: List[Tuple[float, Dict[str, Any], Dict[str, float]]], 
                    user: Dict[str, Any], env: Dict[str, Any], notes: List[str]) -> Dict[str, Any]:
     """Assemble final output."""
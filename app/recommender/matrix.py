@@ -0,0 +1,352 @@
+"""
+Columnar plant matrix for vectorised recommendation scoring.
+
+The scalar scorer in ``scoring.py`` re-derives sun indices, month lookups and
+keyword scans for every plant on every request. ``PlantMatrix`` does that work
+once per plant list and keeps the results as NumPy columns, so a request can
+score the whole catalog with a handful of array operations.
+
+Usage:
+    matrix = PlantMatrix(all_plants)
+    scores, breakdown = calculate_scores_batch(matrix, user_prefs, env)
+"""
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+import numpy as np
+
+from app.recommender.scoring import weights, eco_bonus_score
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+MONTH_BITS = {month: 1 << idx for idx, month in enumerate(MONTHS)}
+
+SUN_ORDER = ["bright_shade", "part_sun", "full_sun"]
+COMPACT_HABITS = ("dwarf", "compact", "groundcover")
+WIND_SENSITIVE_HABITS = ("climber", "upright", "vine")
+
+BREAKDOWN_KEYS = (
+    "season", "sun", "maintainability", "time_to_results",
+    "site_fit", "preferences", "wind_penalty", "eco_bonus"
+)
+
+
+def _sun_rank(value: Any) -> int:
+    """Position of a sun label in SUN_ORDER, or -1 if unknown."""
+    try:
+        return SUN_ORDER.index(value)
+    except ValueError:
+        return -1
+
+
+def _month_mask(months: Any) -> int:
+    """Encode a list of month names as a 12-bit mask (non-month entries are ignored)."""
+    mask = 0
+    for month in months or []:
+        mask |= MONTH_BITS.get(month, 0)
+    return mask
+
+
+class PlantMatrix:
+    """Immutable columnar view over a list of plant dictionaries.
+
+    Row ``i`` of every column describes ``plants[i]``. Columns mirror the inputs
+    of ``calculate_scores`` so the batch scorer reproduces it exactly.
+    """
+
+    def __init__(self, plants: Sequence[Dict[str, Any]]):
+        self.plants: List[Dict[str, Any]] = list(plants)
+        n = len(self.plants)
+
+        self.valid = np.zeros(n, dtype=bool)
+        self.sun_rank = np.full(n, -1, dtype=np.int8)
+        # hard_filter reads sun_need without the "or" fallback, so None stays unknown
+        self.filter_sun_rank = np.full(n, -1, dtype=np.int8)
+        self.maintainability = np.full(n, 0.6, dtype=np.float64)
+        self.maturity_days = np.full(n, np.nan, dtype=np.float64)
+        self.maturity_known = np.zeros(n, dtype=bool)
+        self.indoor_ok = np.zeros(n, dtype=bool)
+        self.container_ok = np.zeros(n, dtype=bool)
+        self.edible = np.zeros(n, dtype=bool)
+        self.fragrant = np.zeros(n, dtype=bool)
+        self.is_flower = np.zeros(n, dtype=bool)
+        self.compact_habit = np.zeros(n, dtype=bool)
+        self.wind_sensitive = np.zeros(n, dtype=bool)
+        self.has_colors = np.zeros(n, dtype=bool)
+        self.eco_bonus = np.zeros(n, dtype=np.float64)
+
+        zone_masks: Dict[str, List[int]] = {}
+        color_rows: List[set] = []
+        self._row_by_key: Dict[Tuple[str, Any], int] = {}
+
+        for i, plant in enumerate(self.plants):
+            self._row_by_key[self._row_key(plant)] = i
+            color_rows.append(set())
+            if not isinstance(plant, dict):
+                continue
+
+            # Scoring treats nameless plants as invalid; filters still see them
+            self.valid[i] = bool(plant) and bool(plant.get("plant_name"))
+            self.sun_rank[i] = _sun_rank(plant.get("sun_need") or "part_sun")
+            self.filter_sun_rank[i] = _sun_rank(plant.get("sun_need", "part_sun"))
+            self.maintainability[i] = plant.get("maintainability_score") or 0.6
+
+            days = plant.get("time_to_maturity_days")
+            if days is not None:
+                self.maturity_days[i] = days
+                self.maturity_known[i] = True
+
+            self.indoor_ok[i] = bool(plant.get("indoor_ok"))
+            self.container_ok[i] = bool(plant.get("container_ok"))
+            self.edible[i] = bool(plant.get("edible"))
+            self.fragrant[i] = bool(plant.get("fragrant"))
+            self.is_flower[i] = plant.get("plant_category", "") == "flower"
+            self.compact_habit[i] = plant.get("habit") in COMPACT_HABITS
+            self.wind_sensitive[i] = plant.get("habit") in WIND_SENSITIVE_HABITS
+
+            plant_colors = plant.get("flower_colors", [])
+            if plant_colors:
+                self.has_colors[i] = True
+                color_rows[i] = set(plant_colors)
+
+            self.eco_bonus[i] = eco_bonus_score(plant)
+
+            sowing_data = plant.get("sowing_months_by_climate") or {}
+            for zone, months in sowing_data.items():
+                zone_masks.setdefault(zone, [0] * n)[i] = _month_mask(months)
+
+        self.sowing_masks: Dict[str, np.ndarray] = {
+            zone: np.array(masks, dtype=np.uint16) for zone, masks in zone_masks.items()
+        }
+
+        self._sowable_index: Dict[Tuple[str, str], np.ndarray] = {}
+        self._canonical_ids: Optional[List[str]] = None
+        self._rank_keys: Optional[List[Tuple[Any, str]]] = None
+
+        # Colour membership as a boolean (plants x colours) matrix
+        vocab = sorted({color for colors in color_rows for color in colors}, key=str)
+        self.color_index: Dict[Any, int] = {color: j for j, color in enumerate(vocab)}
+        self.colors = np.zeros((n, len(vocab)), dtype=bool)
+        for i, colors in enumerate(color_rows):
+            for color in colors:
+                self.colors[i, self.color_index[color]] = True
+
+    def __len__(self) -> int:
+        return len(self.plants)
+
+    @property
+    def canonical_ids(self) -> List[str]:
+        """canonical_id of every row, computed on first use."""
+        if self._canonical_ids is None:
+            from app.recommender.engine import canonical_id
+            self._canonical_ids = [
+                canonical_id(plant) if isinstance(plant, dict) else "" for plant in self.plants
+            ]
+        return self._canonical_ids
+
+    @property
+    def rank_keys(self) -> List[Tuple[Any, str]]:
+        """Per-row (maturity, lower-cased name) tie-breakers of score_and_rank's sort key."""
+        if self._rank_keys is None:
+            self._rank_keys = [
+                (
+                    plant.get("time_to_maturity_days") or 10**9,
+                    str(plant.get("plant_name", "")).lower()
+                ) if isinstance(plant, dict) else (10**9, "")
+                for plant in self.plants
+            ]
+        return self._rank_keys
+
+    @staticmethod
+    def _row_key(plant: Any) -> Tuple[str, Any]:
+        """Stable row key: database id when present, object identity otherwise."""
+        if isinstance(plant, dict) and plant.get("id") is not None:
+            return ("id", plant["id"])
+        return ("obj", id(plant))
+
+    def rows_for(self, plants: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Map plant dictionaries back to their row numbers in this matrix.
+
+        Raises:
+            KeyError: If a plant is not part of the matrix
+        """
+        return np.fromiter(
+            (self._row_by_key[self._row_key(plant)] for plant in plants),
+            dtype=np.intp,
+            count=len(plants)
+        )
+
+    def season_mask_column(self, climate_zone: str) -> np.ndarray:
+        """Month bitmasks for a climate zone (zeros if no plant lists the zone)."""
+        masks = self.sowing_masks.get(climate_zone)
+        if masks is None:
+            return np.zeros(len(self.plants), dtype=np.uint16)
+        return masks
+
+    def sowable(self, climate_zone: str, month: str) -> np.ndarray:
+        """Boolean index of plants sowable in a month, memoised per (zone, month)."""
+        key = (climate_zone, month)
+        index = self._sowable_index.get(key)
+        if index is None:
+            bit = MONTH_BITS.get(month, 0)
+            index = (self.season_mask_column(climate_zone) & bit) != 0
+            index.flags.writeable = False
+            self._sowable_index[key] = index
+        return index
+
+    def sowable_any(self, climate_zone: str, months: Sequence[str]) -> np.ndarray:
+        """Boolean index of plants sowable in any of the given months."""
+        result = np.zeros(len(self.plants), dtype=bool)
+        for month in months:
+            result |= self.sowable(climate_zone, month)
+        return result
+
+    def sun_within(self, user_sun: str, max_steps: int) -> np.ndarray:
+        """Plants whose sun need is within max_steps of the user's exposure.
+
+        Plants with an unknown sun need (and any plant, if the user's exposure is
+        unknown) are included, matching hard_filter's ValueError fallback.
+        """
+        user_rank = _sun_rank(user_sun)
+        if user_rank < 0:
+            return np.ones(len(self.plants), dtype=bool)
+        ranks = self.filter_sun_rank
+        return (ranks < 0) | (np.abs(ranks.astype(np.int16) - user_rank) <= max_steps)
+
+
+def calculate_scores_batch(
+    matrix: PlantMatrix,
+    user: Dict[str, Any],
+    env: Dict[str, Any],
+    rows: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Vectorised equivalent of ``calculate_scores`` for many plants at once.
+
+    Args:
+        matrix: Columnar plant matrix
+        user: User preferences (same shape as for calculate_scores)
+        env: Environment dictionary with climate_zone and month_now
+        rows: Optional row numbers to score; defaults to every plant
+
+    Returns:
+        Tuple of (final scores, breakdown arrays keyed like calculate_scores)
+    """
+    if rows is None:
+        rows = np.arange(len(matrix), dtype=np.intp)
+
+    user_site = user.get("site", {})
+    user_preferences = user.get("preferences", {})
+    climate_zone = env.get("climate_zone", "temperate")
+    month_now = env.get("month_now", datetime.now().strftime("%B"))
+    n = len(rows)
+
+    # Season: exact month, then +-1 month
+    s_season = np.zeros(n, dtype=np.float64)
+    if month_now in MONTH_BITS:
+        idx = MONTHS.index(month_now)
+        near_bits = MONTH_BITS[MONTHS[(idx - 1) % 12]] | MONTH_BITS[MONTHS[(idx + 1) % 12]]
+        masks = matrix.season_mask_column(climate_zone)[rows]
+        s_season = np.where(masks & MONTH_BITS[month_now], 1.0, np.where(masks & near_bits, 0.7, 0.0))
+
+    # Sun: distance between ordinal positions
+    user_rank = _sun_rank(user_site.get("sun_exposure", "part_sun"))
+    if user_rank < 0:
+        s_sun = np.full(n, 0.5)
+    else:
+        plant_rank = matrix.sun_rank[rows]
+        distance = np.abs(plant_rank.astype(np.int16) - user_rank)
+        s_sun = np.select([distance == 0, distance == 1, distance == 2], [1.0, 0.7, 0.3], default=0.5)
+        s_sun = np.where(plant_rank < 0, 0.5, s_sun)
+
+    # Maintainability
+    maint_pref = user_preferences.get("maintainability", "medium")
+    plant_maint = matrix.maintainability[rows]
+    if maint_pref == "medium":
+        s_maintainability = 0.5 + 0.5 * plant_maint
+    elif maint_pref == "high":
+        s_maintainability = 0.7 + 0.3 * plant_maint
+    else:
+        s_maintainability = plant_maint.copy()
+
+    # Time to results (unknown maturity scores 0.6)
+    time_pref = user_preferences.get("time_to_results", "standard")
+    t_days = matrix.maturity_days[rows]
+    if time_pref == "quick":
+        thresholds, values, default = (45, 75, 105), (1.0, 0.8, 0.5), 0.2
+    elif time_pref == "standard":
+        thresholds, values, default = (60, 120, 180), (0.9, 1.0, 0.7), 0.4
+    elif time_pref == "patient":
+        thresholds, values, default = (60, 120, 180), (0.6, 0.8, 1.0), 0.9
+    else:
+        thresholds, values, default = (60, 120), (1.0, 0.8), 0.6
+    with np.errstate(invalid="ignore"):
+        s_time = np.select([t_days <= limit for limit in thresholds], list(values), default=default)
+    s_time = np.where(matrix.maturity_known[rows], s_time, 0.6)
+
+    # Site fit
+    area_m2 = user_site.get("area_m2", 0)
+    container_sizes = user_site.get("container_sizes", [])
+    small_space = area_m2 < 3 or all(size in ["small", "medium"] for size in container_sizes)
+    s_site = np.zeros(n, dtype=np.float64)
+    if user_site.get("location_type") == "indoors":
+        s_site = s_site + np.where(matrix.indoor_ok[rows], 0.2, 0.0)
+    if user_site.get("containers"):
+        s_site = s_site + np.where(matrix.container_ok[rows], 0.2, 0.0)
+    if small_space:
+        s_site = s_site + np.where(matrix.compact_habit[rows], 0.15, 0.0)
+    s_site = np.minimum(1.0, s_site)
+
+    # Preferences
+    s_preferences = np.zeros(n, dtype=np.float64)
+    if user_preferences.get("edible_types", []):
+        s_preferences = s_preferences + np.where(matrix.edible[rows], 0.2, 0.0)
+    if user_preferences.get("ornamental_types", []):
+        s_preferences = s_preferences + np.where(matrix.is_flower[rows], 0.2, 0.0)
+    user_colors = user_preferences.get("colors", [])
+    if user_colors:
+        columns = [matrix.color_index[c] for c in set(user_colors) if c in matrix.color_index]
+        if columns:
+            color_hit = matrix.colors[rows][:, columns].any(axis=1) & matrix.has_colors[rows]
+            s_preferences = s_preferences + np.where(color_hit, 0.15, 0.0)
+    if user_preferences.get("fragrant"):
+        s_preferences = s_preferences + np.where(matrix.fragrant[rows], 0.15, 0.0)
+    s_preferences = np.minimum(1.0, s_preferences)
+
+    # Wind penalty and eco bonus
+    if user_site.get("wind_exposure", "moderate") == "windy":
+        s_wind = np.where(matrix.wind_sensitive[rows], 0.7, 1.0)
+    else:
+        s_wind = np.ones(n, dtype=np.float64)
+    s_eco = np.minimum(1.0, matrix.eco_bonus[rows])
+
+    base = 100.0 * (
+        weights["season"] * s_season +
+        weights["sun"] * s_sun +
+        weights["maintainability"] * s_maintainability +
+        weights["time_to_results"] * s_time +
+        weights["site_fit"] * s_site +
+        weights["preferences"] * s_preferences +
+        weights["eco_bonus"] * s_eco
+    )
+    final = base * (0.85 + 0.15 * s_wind)
+
+    breakdown = {
+        "season": s_season,
+        "sun": s_sun,
+        "maintainability": s_maintainability,
+        "time_to_results": s_time,
+        "site_fit": s_site,
+        "preferences": s_preferences,
+        "wind_penalty": s_wind,
+        "eco_bonus": s_eco
+    }
+
+    # Invalid rows score zero across the board, as in calculate_scores
+    valid = matrix.valid[rows]
+    if not valid.all():
+        final = np.where(valid, final, 0.0)
+        breakdown = {key: np.where(valid, value, 0.0) for key, value in breakdown.items()}
+
+    return final, breakdown
@@ -5,12 +5,17 @@ from typing import Dict, List, Any, Optional
 from datetime import date, datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_, desc, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.database import ClimateData, Suburb, APICache
+from app.utils.cache import invalidate_tags
 
 
 class ClimateRepository:
     """Repository for managing climate data"""
     
+    # Rows per INSERT statement (asyncpg allows at most 32767 bind parameters)
+    BULK_UPSERT_CHUNK = 500
+    
     def __init__(self, db: AsyncSession):
         self.db = db
     
@@ -130,9 +135,68 @@ class ClimateRepository:
         
         await self.db.commit()
         await self.db.refresh(climate_record)
+
+        # Cached environments and recommendations for this suburb are stale
+        suburb = await self.db.get(Suburb, suburb_id)
+        if suburb is not None:
+            await invalidate_tags(f"suburb:{suburb.name}")
         
         return climate_record
     
+    async def bulk_upsert_climate(self, records: List[Dict[str, Any]]) -> int:
+        """Insert or update many suburbs' climate data in one transaction.
+        
+        Uses INSERT ... ON CONFLICT (suburb_id, recorded_date) DO UPDATE, so a
+        whole batch costs one round-trip per statement instead of a SELECT,
+        write, commit and refresh per suburb. Like save_climate_data, only the
+        fields present in a record are overwritten on an existing row.
+        
+        Args:
+            records: Climate data dictionaries, each with a "suburb_id" and
+                optionally a "recorded_date" (defaults to today)
+            
+        Returns:
+            Number of records written
+        """
+        if not records:
+            return 0
+        
+        today = date.today()
+        columns = set(ClimateData.__table__.columns.keys()) - {"id", "created_at"}
+        
+        # Rows in one multi-row INSERT need the same columns, so group them by field set
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for record in records:
+            row = {key: value for key, value in record.items() if key in columns}
+            row.setdefault("recorded_date", today)
+            groups.setdefault(frozenset(row), []).append(row)
+        
+        try:
+            for fields, rows in groups.items():
+                for start in range(0, len(rows), self.BULK_UPSERT_CHUNK):
+                    stmt = pg_insert(ClimateData).values(rows[start:start + self.BULK_UPSERT_CHUNK])
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=["suburb_id", "recorded_date"],
+                        set_={
+                            field: stmt.excluded[field]
+                            for field in fields - {"suburb_id", "recorded_date"}
+                        }
+                    )
+                    await self.db.execute(stmt)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        
+        # Cached environments and recommendations for these suburbs are stale
+        suburb_ids = {record["suburb_id"] for record in records}
+        result = await self.db.execute(select(Suburb.name).where(Suburb.id.in_(suburb_ids)))
+        names = result.scalars().all()
+        if names:
+            await invalidate_tags(*(f"suburb:{name}" for name in names))
+        
+        return len(records)
+    
     async def get_suburb_by_name(self, suburb_name: str) -> Optional[Suburb]:
         """Get a suburb by name.
         
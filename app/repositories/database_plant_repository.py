@@ -1,10 +1,12 @@
 """
 Database-based plant repository using SQLAlchemy
 """
+from datetime import datetime
 from typing import Dict, List, Any, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, or_, and_, func
-from app.models.database import Plant
+from sqlalchemy.dialects.postgresql import insert
+from app.models.database import Plant, PlantBiophysics
 from app.core.config import settings
 
 
@@ -24,9 +26,66 @@ class DatabasePlantRepository:
         plants = result.scalars().all()
 
         # Filter out None or empty dicts, and ensure plant_name exists
-        plant_dicts = [self._plant_to_dict(plant) for plant in plants if plant]
+        plant_dicts = [self.plant_to_dict(plant) for plant in plants if plant]
         return [p for p in plant_dicts if p and p.get("plant_name")]
     
+    async def get_all_plant_objects(self) -> List[Plant]:
+        """Get all Plant objects ordered by ID (used to build the plant catalog).
+
+        Returns:
+            List of Plant SQLAlchemy objects
+        """
+        result = await self.db.execute(select(Plant).order_by(Plant.id))
+        return list(result.scalars().all())
+
+    async def get_catalog_state(self) -> tuple[int, Optional[Any]]:
+        """Get the row count and latest update time of the plants table.
+
+        Cheap change-detection query for the in-memory plant catalog.
+
+        Returns:
+            Tuple of (plant count, max updated_at or None)
+        """
+        result = await self.db.execute(select(func.count(Plant.id), func.max(Plant.updated_at)))
+        row_count, max_updated_at = result.one()
+        return row_count or 0, max_updated_at
+
+    async def get_plant_biophysics(self) -> Dict[int, PlantBiophysics]:
+        """Get the precomputed biophysics rows for all plants.
+
+        Returns:
+            Dictionary mapping plant ID to its PlantBiophysics row
+        """
+        result = await self.db.execute(select(PlantBiophysics))
+        return {row.plant_id: row for row in result.scalars().all()}
+
+    async def save_plant_biophysics(self, rows: List[Dict[str, Any]]) -> int:
+        """Insert or replace precomputed biophysics rows.
+
+        Args:
+            rows: Dictionaries with plant_id and every PlantBiophysics column
+
+        Returns:
+            Number of rows written
+        """
+        if not rows:
+            return 0
+
+        now = datetime.utcnow()
+        values = [dict(row, computed_at=now) for row in rows]
+
+        # Chunk to stay well under the driver's bind parameter limit
+        for start in range(0, len(values), 500):
+            stmt = insert(PlantBiophysics).values(values[start:start + 500])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[PlantBiophysics.plant_id],
+                set_={key: stmt.excluded[key] for key in values[0] if key != "plant_id"}
+            )
+            await self.db.execute(stmt)
+
+        await self.db.commit()
+        return len(values)
+
     async def find_plant_by_name(self, plant_name: str) -> Optional[Dict[str, Any]]:
         """Find a specific plant by name.
 
@@ -51,7 +110,7 @@ class DatabasePlantRepository:
         # Use first() instead of scalar_one_or_none() to handle duplicate plant names
         plant = result.scalars().first()
 
-        return self._plant_to_dict(plant) if plant else None
+        return self.plant_to_dict(plant) if plant else None
 
     async def find_plants_by_names_batch(self, plant_names: List[str]) -> Dict[str, Dict[str, Any]]:
         """Find multiple plants by their names in a single query (batch operation).
@@ -89,7 +148,7 @@ class DatabasePlantRepository:
         plant_map = {}
         for plant in plants:
             if plant:
-                plant_dict = self._plant_to_dict(plant)
+                plant_dict = self.plant_to_dict(plant)
                 # Map by both plant_name and scientific_name (lowercase) for easy lookup
                 plant_name_key = plant.plant_name.lower().strip() if plant.plant_name else ""
                 scientific_name_key = plant.scientific_name.lower().strip() if plant.scientific_name else ""
@@ -141,7 +200,7 @@ class DatabasePlantRepository:
         result = await self.db.execute(query)
         plants = result.scalars().all()
         
-        return [self._plant_to_dict(plant) for plant in plants]
+        return [self.plant_to_dict(plant) for plant in plants]
     
     async def search_plants(
         self,
@@ -195,7 +254,7 @@ class DatabasePlantRepository:
         result = await self.db.execute(query)
         plants = result.scalars().all()
         
-        return [self._plant_to_dict(plant) for plant in plants]
+        return [self.plant_to_dict(plant) for plant in plants]
     
     async def get_plant_by_id(self, plant_id: int) -> Optional[Dict[str, Any]]:
         """Get a plant by its database ID.
@@ -209,7 +268,7 @@ class DatabasePlantRepository:
         result = await self.db.execute(select(Plant).where(Plant.id == plant_id))
         plant = result.scalar_one_or_none()
         
-        return self._plant_to_dict(plant) if plant else None
+        return self.plant_to_dict(plant) if plant else None
     
     async def count_plants_by_category(self) -> Dict[str, int]:
         """Get count of plants per category.
@@ -282,7 +341,7 @@ class DatabasePlantRepository:
         result = await self.db.execute(query)
         plants = result.scalars().all()
 
-        return [self._plant_to_dict(plant) for plant in plants], total_count
+        return [self.plant_to_dict(plant) for plant in plants], total_count
 
     async def count_plants(
         self,
@@ -321,7 +380,7 @@ class DatabasePlantRepository:
         result = await self.db.execute(query)
         return result.scalar() or 0
     
-    def _plant_to_dict(self, plant: Plant) -> Dict[str, Any]:
+    def plant_to_dict(self, plant: Plant) -> Dict[str, Any]:
         """Convert Plant model to dictionary.
         
         Args:
@@ -4,11 +4,14 @@ Australian Radiation Protection and Nuclear Safety Agency
 Provides UV index data for Australian cities
 """
 import aiohttp
+import asyncio
 import xml.etree.ElementTree as ET
 import logging
 from typing import Dict, Optional, Any
 from datetime import datetime
 
+from app.core.http_client import REQUEST_TIMEOUT, UpstreamError, get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -17,33 +20,45 @@ class ARPANSAClient:
     
     BASE_URL = "https://uvdata.arpansa.gov.au/xml/uvvalues.xml"
     
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        Initialize ARPANSA client.
+        
+        Args:
+            session: HTTP session to use (the shared app session by default)
+        """
+        self.session = session
+    
     async def get_uv_index(self) -> Optional[Dict[str, Any]]:
         """
         Fetch current UV index for Melbourne.
         
         Returns:
-            UV data dictionary or None if error
+            UV data dictionary, or None if the feed has no Melbourne reading
+            
+        Raises:
+            UpstreamError: If the request failed
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.BASE_URL, timeout=10) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        # Handle BOM (Byte Order Mark) if present
-                        if content.startswith(b'\xef\xbb\xbf'):
-                            content = content[3:]
-                        xml_text = content.decode('utf-8')
-                        return self._parse_uv_xml(xml_text)
-                    else:
-                        logger.warning(f"ARPANSA API returned status {response.status}")
-                        return None
-                        
-        except aiohttp.ClientTimeout:
+            session = self.session or get_http_session()
+            async with session.get(self.BASE_URL, timeout=REQUEST_TIMEOUT) as response:
+                if response.status != 200:
+                    logger.warning(f"ARPANSA API returned status {response.status}")
+                    raise UpstreamError(f"ARPANSA returned HTTP {response.status}")
+                content = await response.read()
+                    
+        except asyncio.TimeoutError as e:
             logger.error("ARPANSA API request timed out")
-            return None
-        except Exception as e:
+            raise UpstreamError("ARPANSA request timed out") from e
+        except aiohttp.ClientError as e:
             logger.error(f"Error fetching UV data: {e}")
-            return None
+            raise UpstreamError(f"ARPANSA request failed: {e}") from e
+        
+        # Handle BOM (Byte Order Mark) if present
+        if content.startswith(b'\xef\xbb\xbf'):
+            content = content[3:]
+        xml_text = content.decode('utf-8')
+        return self._parse_uv_xml(xml_text)
     
     def _parse_uv_xml(self, xml_content: str) -> Optional[Dict[str, Any]]:
         """
@@ -137,6 +152,9 @@ class ARPANSAClient:
         Convenience method to get Melbourne UV data.
         
         Returns:
-            UV data for Melbourne
+            UV data for Melbourne (None if there is no reading)
+            
+        Raises:
+            UpstreamError: If the request failed
         """
         return await self.get_uv_index()
\ No newline at end of file
@@ -3,10 +3,13 @@ Open-Meteo Weather API Client
 Free weather data API - no key required
 """
 import aiohttp
+import asyncio
 import logging
-from typing import Dict, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 
+from app.core.http_client import REQUEST_TIMEOUT, UpstreamError, get_http_session
+
 logger = logging.getLogger(__name__)
 
 
@@ -14,6 +17,17 @@ class OpenMeteoClient:
     """Client for fetching weather data from Open-Meteo API"""
     
     BASE_URL = "https://api.open-meteo.com/v1/forecast"
+    # Locations per request (keeps the URL well under server limits)
+    MAX_LOCATIONS_PER_REQUEST = 100
+    
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None):
+        """
+        Initialize Open-Meteo client.
+        
+        Args:
+            session: HTTP session to use (the shared app session by default)
+        """
+        self.session = session
     
     async def get_weather(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
         """
@@ -24,44 +38,95 @@ class OpenMeteoClient:
             longitude: Longitude of the location
             
         Returns:
-            Weather data dictionary or None if error
+            Weather data dictionary
+            
+        Raises:
+            UpstreamError: If the request failed
+        """
+        data = await self._request([(latitude, longitude)])
+        return self._parse_weather_data(data[0])
+    
+    async def get_weather_bulk(self, coordinates: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Fetch current weather for many locations with as few requests as possible.
+        
+        Open-Meteo accepts comma-separated coordinate lists and answers with one
+        result per location, so locations are sent MAX_LOCATIONS_PER_REQUEST at a time.
+        
+        Args:
+            coordinates: List of (latitude, longitude) pairs
+            
+        Returns:
+            Weather data per input location, in order (None where a request failed)
+        """
+        chunks = [
+            coordinates[i:i + self.MAX_LOCATIONS_PER_REQUEST]
+            for i in range(0, len(coordinates), self.MAX_LOCATIONS_PER_REQUEST)
+        ]
+        responses = await asyncio.gather(
+            *(self._request(chunk) for chunk in chunks), return_exceptions=True
+        )
+        
+        results: List[Optional[Dict[str, Any]]] = []
+        for chunk, data in zip(chunks, responses):
+            if isinstance(data, Exception) or len(data) != len(chunk):
+                if not isinstance(data, Exception):
+                    logger.warning(f"Open-Meteo returned {len(data)} results for {len(chunk)} locations")
+                results.extend([None] * len(chunk))
+            else:
+                results.extend(self._parse_weather_data(item) for item in data)
+        return results
+    
+    async def _request(self, coordinates: List[Tuple[float, float]]) -> List[Dict[str, Any]]:
+        """
+        Request weather for one or more locations in a single call.
+        
+        Args:
+            coordinates: List of (latitude, longitude) pairs
+            
+        Returns:
+            Raw per-location results in request order
+            
+        Raises:
+            UpstreamError: If the request failed
         """
         params = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "current": [
+            "latitude": ",".join(f"{latitude:.4f}" for latitude, _ in coordinates),
+            "longitude": ",".join(f"{longitude:.4f}" for _, longitude in coordinates),
+            "current": ",".join([
                 "temperature_2m",
                 "relative_humidity_2m",
                 "precipitation",
                 "rain",
                 "weather_code",
                 "wind_speed_10m"
-            ],
-            "daily": [
+            ]),
+            "daily": ",".join([
                 "temperature_2m_max",
                 "temperature_2m_min",
                 "precipitation_sum"
-            ],
+            ]),
             "timezone": "Australia/Melbourne",
             "forecast_days": 1
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.BASE_URL, params=params, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        return self._parse_weather_data(data)
-                    else:
-                        logger.warning(f"Open-Meteo API returned status {response.status}")
-                        return None
-                        
-        except aiohttp.ClientTimeout:
+            session = self.session or get_http_session()
+            async with session.get(self.BASE_URL, params=params, timeout=REQUEST_TIMEOUT) as response:
+                if response.status != 200:
+                    logger.warning(f"Open-Meteo API returned status {response.status}")
+                    raise UpstreamError(f"Open-Meteo returned HTTP {response.status}")
+                data = await response.json()
+                    
+        except asyncio.TimeoutError as e:
             logger.error("Open-Meteo API request timed out")
-            return None
-        except Exception as e:
+            raise UpstreamError("Open-Meteo request timed out") from e
+        except (aiohttp.ClientError, ValueError) as e:
             logger.error(f"Error fetching weather data: {e}")
-            return None
+            raise UpstreamError(f"Open-Meteo request failed: {e}") from e
+        
+        # A single location comes back as an object, several as a list
+        return data if isinstance(data, list) else [data]
     
     def _parse_weather_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -103,22 +168,11 @@ class OpenMeteoClient:
         Returns:
             Dictionary mapping location names to weather data
         """
-        results = {}
-        
-        # Process in batches to avoid overwhelming the API
-        for location in locations:
-            weather_data = await self.get_weather(
-                location["latitude"],
-                location["longitude"]
-            )
-            if weather_data:
-                results[location["name"]] = weather_data
-            
-            # Small delay between requests to be respectful to the free API
-            await asyncio.sleep(0.1)
-        
-        return results
-
-
-# Add asyncio import at the top
-import asyncio
\ No newline at end of file
+        weather = await self.get_weather_bulk(
+            [(location["latitude"], location["longitude"]) for location in locations]
+        )
+        return {
+            location["name"]: weather_data
+            for location, weather_data in zip(locations, weather)
+            if weather_data
+        }
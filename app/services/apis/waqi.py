@@ -3,23 +3,28 @@ World Air Quality Index (WAQI) API Client
 Provides air quality data for cities worldwide
 """
 import aiohttp
+import asyncio
 import logging
 from typing import Dict, Optional, Any, List
 from datetime import datetime
 
+from app.core.http_client import REQUEST_TIMEOUT, UpstreamError, get_http_session
+
 logger = logging.getLogger(__name__)
 
 
 class WAQIClient:
     """Client for fetching air quality data from WAQI"""
     
-    def __init__(self, api_token: Optional[str] = None):
+    def __init__(self, api_token: Optional[str] = None, session: Optional[aiohttp.ClientSession] = None):
         """
         Initialize WAQI client.
         
         Args:
             api_token: WAQI API token (optional, uses default if not provided)
+            session: HTTP session to use (the shared app session by default)
         """
+        self.session = session
         # Use provided token or default token from existing code
         self.api_token = api_token or "8f165ed38392c6e9659cc35b122eedd534fde40d"
         self.base_url = "https://api.waqi.info"
@@ -47,30 +52,34 @@ class WAQIClient:
             longitude: Longitude of the location
             
         Returns:
-            Air quality data dictionary or None if error
+            Air quality data dictionary, or None if the nearest station has no reading
+            
+        Raises:
+            UpstreamError: If the request failed or WAQI answered with an error
         """
         url = f"{self.base_url}/feed/geo:{latitude};{longitude}/?token={self.api_token}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=10) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("status") == "ok":
-                            return self._parse_aqi_data(data.get("data", {}))
-                        else:
-                            logger.warning(f"WAQI API error: {data.get('data', 'Unknown error')}")
-                            return None
-                    else:
-                        logger.warning(f"WAQI API returned status {response.status}")
-                        return None
-                        
-        except aiohttp.ClientTimeout:
+            session = self.session or get_http_session()
+            async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
+                if response.status != 200:
+                    logger.warning(f"WAQI API returned status {response.status}")
+                    raise UpstreamError(f"WAQI returned HTTP {response.status}")
+                data = await response.json()
+                    
+        except asyncio.TimeoutError as e:
             logger.error("WAQI API request timed out")
-            return None
-        except Exception as e:
+            raise UpstreamError("WAQI request timed out") from e
+        except (aiohttp.ClientError, ValueError) as e:
             logger.error(f"Error fetching air quality data: {e}")
-            return None
+            raise UpstreamError(f"WAQI request failed: {e}") from e
+        
+        # Errors such as an invalid token or exceeded quota come back as 200 with status "error"
+        if data.get("status") != "ok":
+            logger.warning(f"WAQI API error: {data.get('data', 'Unknown error')}")
+            raise UpstreamError(f"WAQI error: {data.get('data', 'Unknown error')}")
+        # Stations without a current reading report aqi "-", parsed as None (no data)
+        return self._parse_aqi_data(data.get("data", {}))
     
     async def get_melbourne_stations_aqi(self) -> Dict[str, Dict[str, Any]]:
         """
@@ -80,19 +89,19 @@ class WAQIClient:
             Dictionary mapping station names to air quality data
         """
         results = {}
+        session = self.session or get_http_session()
         
         for station_name, station_id in self.melbourne_stations.items():
             url = f"{self.base_url}/feed/{station_id}/?token={self.api_token}"
             
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, timeout=10) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            if data.get("status") == "ok":
-                                aqi_data = self._parse_aqi_data(data.get("data", {}))
-                                if aqi_data:
-                                    results[station_name] = aqi_data
+                async with session.get(url, timeout=REQUEST_TIMEOUT) as response:
+                    if response.status == 200:
+                        data = await response.json()
+                        if data.get("status") == "ok":
+                            aqi_data = self._parse_aqi_data(data.get("data", {}))
+                            if aqi_data:
+                                results[station_name] = aqi_data
             except Exception as e:
                 logger.error(f"Error fetching data for {station_name}: {e}")
                 continue
@@ -176,7 +185,10 @@ class WAQIClient:
             longitude: Longitude of the location
             
         Returns:
-            Air quality data from nearest station
+            Air quality data from nearest station (None if it has no reading)
+            
+        Raises:
+            UpstreamError: If the request failed
         """
         # For Melbourne suburbs, we'll use coordinate-based search
         # which returns data from the nearest station
@@ -4,34 +4,92 @@ Orchestrates fetching climate data from multiple APIs and storing in database
 """
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional
+import math
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, date
+import aiohttp
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.apis.open_meteo import OpenMeteoClient
 from app.services.apis.arpansa import ARPANSAClient
 from app.services.apis.waqi import WAQIClient
 from app.repositories.climate_repository import ClimateRepository
+from app.core.http_client import UpstreamError
+from app.utils.api_scheduler import APIScheduler, CircuitBreaker, run_workers
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Marks air quality that was not pre-fetched (None means fetched but unavailable)
+_NOT_FETCHED = object()
+
+# APICache status recorded for an upstream whose circuit breaker is open
+CIRCUIT_OPEN_STATUS = "circuit_open"
+
+
+def group_by_grid(suburbs: List[Dict], grid_degrees: float) -> List[Dict[str, Any]]:
+    """
+    Group suburbs into lat/lon grid cells.
+    
+    Suburbs a few hundred metres apart get the same weather and nearest air
+    quality station, so the climate APIs only need to be asked once per cell.
+    
+    Args:
+        suburbs: List of suburb dictionaries with latitude and longitude
+        grid_degrees: Cell size in degrees (0 or less puts every suburb in its own cell)
+        
+    Returns:
+        List of cells with the members' mean "latitude"/"longitude" and their "suburbs"
+    """
+    cells: Dict[Any, List[Dict]] = {}
+    for suburb in suburbs:
+        if grid_degrees > 0:
+            key = (math.floor(suburb["latitude"] / grid_degrees), math.floor(suburb["longitude"] / grid_degrees))
+        else:
+            key = suburb["id"]
+        cells.setdefault(key, []).append(suburb)
+    
+    return [
+        {
+            "id": index,
+            "latitude": sum(member["latitude"] for member in members) / len(members),
+            "longitude": sum(member["longitude"] for member in members) / len(members),
+            "suburbs": members
+        }
+        for index, members in enumerate(cells.values())
+    ]
+
 
 class ClimateUpdateService:
     """Service for updating climate data from multiple sources"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, http_session: Optional[aiohttp.ClientSession] = None):
         """
         Initialize climate update service.
         
         Args:
             db: Database session
+            http_session: HTTP session shared by the API clients (the app's pooled session by default)
         """
         self.db = db
         self.climate_repo = ClimateRepository(db)
-        self.weather_client = OpenMeteoClient()
-        self.uv_client = ARPANSAClient()
-        self.aqi_client = WAQIClient(settings.WAQI_API_TOKEN)
+        self.weather_client = OpenMeteoClient(http_session)
+        self.uv_client = ARPANSAClient(http_session)
+        self.aqi_client = WAQIClient(settings.WAQI_API_TOKEN, http_session)
+        
+        # Every upstream request goes through the scheduler's rate limits and circuit breakers
+        self.scheduler = APIScheduler(
+            {
+                "open_meteo": settings.OPEN_METEO_RATE_LIMIT,
+                "waqi": settings.WAQI_RATE_LIMIT,
+                "arpansa": settings.ARPANSA_RATE_LIMIT
+            },
+            workers=settings.CLIMATE_WORKERS,
+            deadline=settings.CLIMATE_REQUEST_DEADLINE,
+            max_retries=settings.CLIMATE_MAX_RETRIES,
+            failure_threshold=settings.CLIMATE_CIRCUIT_FAILURES,
+            reset_timeout=settings.CLIMATE_CIRCUIT_RESET_SECONDS
+        )
         
         # Statistics for tracking update progress
         self.stats = {
@@ -42,17 +100,28 @@ class ClimateUpdateService:
             "start_time": None,
             "end_time": None
         }
+        
+        # Fetched climate records waiting to be written in one bulk upsert
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
     
-    async def update_all_suburbs(self, batch_size: int = 10) -> Dict[str, Any]:
+    async def update_all_suburbs(self, workers: Optional[int] = None) -> Dict[str, Any]:
         """
         Update climate data for all suburbs.
         
+        Suburbs are worked through by a pool of workers rather than in fixed
+        batches, so the run takes as long as the API rate limits require
+        instead of waiting on the slowest suburb of each batch.
+        
         Args:
-            batch_size: Number of suburbs to process in parallel
+            workers: Number of concurrent workers (CLIMATE_WORKERS by default)
             
         Returns:
             Update statistics
         """
+        if workers:
+            self.scheduler.workers = workers
+        
         self.stats["start_time"] = datetime.utcnow()
         logger.info("Starting climate update for all suburbs")
         
@@ -62,23 +131,30 @@ class ClimateUpdateService:
             total_suburbs = len(suburbs)
             logger.info(f"Found {total_suburbs} suburbs to update")
             
+            # Upstreams that were failing on the last run stay paused until their cool-down ends
+            await self._restore_circuits()
+            
             # Get Melbourne-wide UV data once (same for all suburbs)
-            uv_data = await self.uv_client.get_melbourne_uv()
+            uv_data = await self.scheduler.call("arpansa", self.uv_client.get_melbourne_uv)
             if not uv_data:
                 logger.warning("Failed to fetch UV data from ARPANSA")
             
-            # Process suburbs in batches
-            for i in range(0, total_suburbs, batch_size):
-                batch = suburbs[i:i + batch_size]
-                await self._process_suburb_batch(batch, uv_data)
-                
-                # Log progress
-                processed = min(i + batch_size, total_suburbs)
-                logger.info(f"Progress: {processed}/{total_suburbs} suburbs processed")
-                
-                # Small delay between batches to avoid overwhelming APIs
-                if i + batch_size < total_suburbs:
-                    await asyncio.sleep(1)
+            # Fetch once per grid cell: weather in a handful of multi-location
+            # requests, air quality per (coarser) cell
+            weather_cells = group_by_grid(suburbs, settings.CLIMATE_WEATHER_GRID_DEGREES)
+            aqi_cells = group_by_grid(suburbs, settings.CLIMATE_AQI_GRID_DEGREES)
+            self.stats["weather_locations"] = len(weather_cells)
+            self.stats["air_quality_locations"] = len(aqi_cells)
+            logger.info(
+                f"Fetching weather for {len(weather_cells)} and air quality for "
+                f"{len(aqi_cells)} grid cells covering {total_suburbs} suburbs"
+            )
+            weather_by_id = self._fan_out(weather_cells, await self._fetch_weather_bulk(weather_cells))
+            aqi_by_id = self._fan_out(aqi_cells, await self._fetch_aqi_by_cell(aqi_cells))
+            
+            await self._process_suburbs(suburbs, uv_data, weather_by_id, aqi_by_id)
+            await self._flush_climate()
+            self.stats["api_calls"] = self.scheduler.stats
             
             # Update API cache status
             await self._update_api_cache_status()
@@ -126,54 +202,167 @@ class ClimateUpdateService:
         else:
             return {"success": False, "error": "Failed to fetch climate data"}
     
-    async def _process_suburb_batch(self, suburbs: List[Dict], uv_data: Optional[Dict]) -> None:
+    async def _fetch_weather_bulk(self, locations: List[Dict]) -> Dict[int, Dict[str, Any]]:
+        """
+        Fetch weather for many locations with multi-location Open-Meteo requests.
+        
+        Args:
+            locations: Suburbs or grid cells with id, latitude and longitude
+            
+        Returns:
+            Weather data by location id (locations whose lookup failed are
+            omitted, so their suburbs fall back to a single-location request)
+        """
+        size = self.weather_client.MAX_LOCATIONS_PER_REQUEST
+        chunks = [locations[i:i + size] for i in range(0, len(locations), size)]
+        results = await self.scheduler.map(
+            "open_meteo",
+            self._fetch_weather_chunk,
+            [([(location["latitude"], location["longitude"]) for location in chunk],) for chunk in chunks]
+        )
+        
+        weather_by_id = {
+            location["id"]: weather_data
+            for chunk, weather in zip(chunks, results)
+            for location, weather_data in zip(chunk, weather or [])
+            if weather_data
+        }
+        logger.info(f"Fetched weather for {len(weather_by_id)}/{len(locations)} locations in bulk")
+        return weather_by_id
+    
+    async def _fetch_weather_chunk(self, coordinates: List[Tuple[float, float]]) -> List[Optional[Dict[str, Any]]]:
+        """One multi-location weather request (raises if it failed, so the scheduler retries it)."""
+        weather = await self.weather_client.get_weather_bulk(coordinates)
+        if not any(weather):
+            # A successful Open-Meteo response always has weather for every location
+            raise UpstreamError("Open-Meteo returned no weather")
+        return weather
+    
+    async def _fetch_aqi_by_cell(self, cells: List[Dict]) -> Dict[int, Optional[Dict[str, Any]]]:
         """
-        Process a batch of suburbs in parallel.
+        Fetch air quality once per grid cell.
+        
+        Args:
+            cells: Cells from group_by_grid
+            
+        Returns:
+            Air quality data (None if unavailable) by cell id
+        """
+        results = await self.scheduler.map(
+            "waqi",
+            self.aqi_client.get_nearest_station_aqi,
+            [(cell["latitude"], cell["longitude"]) for cell in cells]
+        )
+        return {cell["id"]: result for cell, result in zip(cells, results)}
+    
+    @staticmethod
+    def _fan_out(cells: List[Dict], results_by_cell: Dict[int, Any]) -> Dict[int, Any]:
+        """Map per-cell results to every member suburb id (cells without a result are left out)."""
+        return {
+            suburb["id"]: results_by_cell[cell["id"]]
+            for cell in cells
+            if cell["id"] in results_by_cell
+            for suburb in cell["suburbs"]
+        }
+    
+    async def _process_suburbs(
+        self,
+        suburbs: List[Dict],
+        uv_data: Optional[Dict],
+        weather_by_id: Optional[Dict[int, Dict[str, Any]]] = None,
+        aqi_by_id: Optional[Dict[int, Optional[Dict[str, Any]]]] = None
+    ) -> None:
+        """
+        Process suburbs with the scheduler's worker pool.
+        
+        Fetched records are buffered and flushed once CLIMATE_UPSERT_BATCH_SIZE
+        have accumulated; suburbs count as succeeded when their record is written.
         
         Args:
             suburbs: List of suburb dictionaries
             uv_data: UV data for Melbourne (same for all suburbs)
+            weather_by_id: Pre-fetched weather data by suburb id
+            aqi_by_id: Pre-fetched air quality data by suburb id
         """
-        tasks = []
-        for suburb in suburbs:
-            task = self._update_suburb_climate(suburb, uv_data)
-            tasks.append(task)
-        
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        weather_by_id = weather_by_id or {}
+        aqi_by_id = aqi_by_id or {}
+        results = await run_workers(
+            self._update_suburb_climate,
+            [
+                (suburb, uv_data, weather_by_id.get(suburb["id"]), aqi_by_id.get(suburb["id"], _NOT_FETCHED))
+                for suburb in suburbs
+            ],
+            self.scheduler.workers
+        )
         
         for suburb, result in zip(suburbs, results):
             if isinstance(result, Exception):
                 logger.error(f"Error updating {suburb['name']}: {result}")
                 self.stats["suburbs_failed"] += 1
                 self.stats["api_errors"].append(f"{suburb['name']}: {str(result)}")
-            elif result:
-                self.stats["suburbs_succeeded"] += 1
-            else:
+            elif not result:
                 self.stats["suburbs_failed"] += 1
             
             self.stats["suburbs_processed"] += 1
+        
+        logger.info(f"Progress: {self.stats['suburbs_processed']} suburbs processed")
     
-    async def _update_suburb_climate(self, suburb: Dict, uv_data: Optional[Dict]) -> bool:
+    async def _flush_climate(self) -> int:
         """
-        Update climate data for a single suburb.
+        Write all buffered climate records with one bulk upsert.
+        
+        Returns:
+            Number of records written
+        """
+        # Workers keep buffering while a flush is running; one flush uses the session at a time
+        async with self._flush_lock:
+            records, self._pending = self._pending, []
+            if not records:
+                return 0
+            
+            try:
+                written = await self.climate_repo.bulk_upsert_climate(records)
+                self.stats["suburbs_succeeded"] += len(records)
+                return written
+            except Exception as e:
+                logger.error(f"Error saving climate data for {len(records)} suburbs: {e}")
+                self.stats["suburbs_failed"] += len(records)
+                self.stats["api_errors"].append(f"bulk upsert: {str(e)}")
+                return 0
+    
+    async def _update_suburb_climate(
+        self,
+        suburb: Dict,
+        uv_data: Optional[Dict],
+        weather: Optional[Dict] = None,
+        aqi: Any = _NOT_FETCHED
+    ) -> bool:
+        """
+        Fetch climate data for a single suburb and buffer it for saving.
         
         Args:
             suburb: Suburb dictionary with id, name, latitude, longitude
             uv_data: UV data for Melbourne
+            weather: Pre-fetched weather data (fetched individually if None)
+            aqi: Pre-fetched air quality data (fetched individually if not given)
             
         Returns:
-            True if successful, False otherwise
+            True if data was fetched, False otherwise
         """
         try:
             climate_data = await self._fetch_climate_for_suburb(
                 suburb["name"],
                 suburb["latitude"],
                 suburb["longitude"],
-                uv_data
+                uv_data,
+                weather,
+                aqi
             )
             
             if climate_data:
-                await self.climate_repo.save_climate_data(suburb["id"], climate_data)
+                self._pending.append({"suburb_id": suburb["id"], **climate_data})
+                if len(self._pending) >= settings.CLIMATE_UPSERT_BATCH_SIZE:
+                    await self._flush_climate()
                 return True
             return False
             
@@ -186,7 +375,9 @@ class ClimateUpdateService:
         suburb_name: str,
         latitude: float,
         longitude: float,
-        uv_data: Optional[Dict] = None
+        uv_data: Optional[Dict] = None,
+        weather: Optional[Dict] = None,
+        aqi: Any = _NOT_FETCHED
     ) -> Optional[Dict[str, Any]]:
         """
         Fetch climate data from all APIs for a suburb.
@@ -196,6 +387,8 @@ class ClimateUpdateService:
             latitude: Suburb latitude
             longitude: Suburb longitude
             uv_data: Optional pre-fetched UV data
+            weather: Optional pre-fetched weather data
+            aqi: Optional pre-fetched air quality data (None = fetched, unavailable)
             
         Returns:
             Combined climate data or None if all APIs fail
@@ -206,7 +399,8 @@ class ClimateUpdateService:
         
         # Fetch weather data from Open-Meteo
         try:
-            weather = await self.weather_client.get_weather(latitude, longitude)
+            if weather is None:
+                weather = await self.scheduler.call("open_meteo", self.weather_client.get_weather, latitude, longitude)
             if weather:
                 climate_data.update({
                     "temperature_current": weather.get("temperature_current"),
@@ -224,7 +418,7 @@ class ClimateUpdateService:
         # Use provided UV data or fetch new
         if uv_data is None:
             try:
-                uv_data = await self.uv_client.get_melbourne_uv()
+                uv_data = await self.scheduler.call("arpansa", self.uv_client.get_melbourne_uv)
             except Exception as e:
                 logger.error(f"Error fetching UV data: {e}")
         
@@ -238,7 +432,8 @@ class ClimateUpdateService:
         
         # Fetch air quality data from WAQI
         try:
-            aqi = await self.aqi_client.get_nearest_station_aqi(latitude, longitude)
+            if aqi is _NOT_FETCHED:
+                aqi = await self.scheduler.call("waqi", self.aqi_client.get_nearest_station_aqi, latitude, longitude)
             if aqi:
                 climate_data.update({
                     "air_quality_index": aqi.get("air_quality_index"),
@@ -260,15 +455,34 @@ class ClimateUpdateService:
         
         return climate_data
     
+    async def _restore_circuits(self) -> None:
+        """Re-open circuit breakers saved as open in APICache whose cool-down has not ended."""
+        try:
+            now = datetime.utcnow()
+            for entry in await self.climate_repo.get_api_cache_status():
+                breaker = self.scheduler.breakers.get(entry["api_name"])
+                if breaker is None or entry["status"] != CIRCUIT_OPEN_STATUS or not entry["last_update"]:
+                    continue
+                elapsed = (now - datetime.fromisoformat(entry["last_update"])).total_seconds()
+                if elapsed < breaker.reset_timeout:
+                    breaker.trip(elapsed)
+                    breaker.last_error = entry["error_message"]
+                    logger.warning(f"Circuit for {entry['api_name']} still open from the previous update")
+        except Exception as e:
+            logger.error(f"Error restoring API circuit state: {e}")
+    
     async def _update_api_cache_status(self) -> None:
-        """Update API cache status in database"""
+        """Update API cache status in database, including each upstream's circuit breaker state"""
         try:
-            # Update cache status for each API
-            for api_name, status in [
-                ("open_meteo", "success" if self.stats["suburbs_succeeded"] > 0 else "error"),
-                ("arpansa", "success" if self.stats["suburbs_succeeded"] > 0 else "error"),
-                ("waqi", "success" if self.stats["suburbs_succeeded"] > 0 else "error")
-            ]:
+            for api_name, breaker in self.scheduler.breakers.items():
+                usage = self.scheduler.stats[api_name]
+                if breaker.state == CircuitBreaker.OPEN:
+                    status = CIRCUIT_OPEN_STATUS
+                elif usage["successes"] or (not usage["failures"] and self.stats["suburbs_succeeded"] > 0):
+                    status = "success"
+                else:
+                    status = "error"
+                
                 duration_ms = None
                 if self.stats["start_time"] and self.stats["end_time"]:
                     duration_ms = int((self.stats["end_time"] - self.stats["start_time"]).total_seconds() * 1000)
@@ -276,6 +490,7 @@ class ClimateUpdateService:
                 await self.climate_repo.update_api_cache(
                     api_name=api_name,
                     status=status,
+                    error_message=breaker.last_error if status != "success" else None,
                     response_time_ms=duration_ms,
                     records_updated=self.stats["suburbs_succeeded"]
                 )
@@ -0,0 +1,366 @@
+"""
+Process-wide plant catalog
+
+Plant reference data only changes when the loader scripts run, yet every
+recommendation, /plants and quantification request used to pull the whole
+``plants`` table over asyncpg. The catalog loads it once (at startup or on
+first use), keeps an immutable, versioned snapshot in memory and swaps in a
+new snapshot when an admin reload is requested or ``plants.updated_at`` moves.
+
+Usage:
+    snapshot = await plant_catalog.ensure_loaded(plant_repository)
+    basil = snapshot.find_by_name("basil")
+"""
+import asyncio
+from dataclasses import dataclass, fields
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from app.recommender.matrix import PlantMatrix
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.quantification_service import QuantificationService
+from app.utils.cache import invalidate_tags
+
+
+@dataclass(frozen=True, slots=True)
+class PlantRecord:
+    """Immutable copy of a ``plants`` row.
+
+    Attribute names match the SQLAlchemy ``Plant`` model so records can be
+    passed anywhere a detached Plant object was used before (e.g. the
+    quantification service).
+    """
+    id: int
+    plant_name: str
+    scientific_name: Optional[str] = None
+    plant_category: Optional[str] = None
+    water_requirements: Optional[str] = None
+    sunlight_requirements: Optional[str] = None
+    soil_type: Optional[str] = None
+    growth_time: Optional[str] = None
+    maintenance_level: Optional[str] = None
+    climate_zone: Optional[str] = None
+    mature_height: Optional[str] = None
+    mature_width: Optional[str] = None
+    flower_color: Optional[str] = None
+    flowering_season: Optional[str] = None
+    description: Optional[str] = None
+    planting_tips: Optional[str] = None
+    care_instructions: Optional[str] = None
+    companion_plants: Optional[str] = None
+    image_url: Optional[str] = None
+    position: Optional[str] = None
+    characteristics: Optional[str] = None
+    plant_type: Optional[str] = None
+    season: Optional[str] = None
+    germination: Optional[str] = None
+    additional_information: Optional[str] = None
+    days_to_maturity: Optional[str] = None
+    plant_spacing: Optional[str] = None
+    sowing_depth: Optional[str] = None
+    hardiness_life_cycle: Optional[str] = None
+    seed_type: Optional[str] = None
+    beneficial_companions: Optional[str] = None
+    harmful_companions: Optional[str] = None
+    neutral_companions: Optional[str] = None
+    cool_climate_sowing_period: Optional[str] = None
+    temperate_climate_sowing_period: Optional[str] = None
+    subtropical_climate_sowing_period: Optional[str] = None
+    tropical_climate_sowing_period: Optional[str] = None
+    arid_climate_sowing_period: Optional[str] = None
+    sun_need: Optional[str] = None
+    indoor_ok: Optional[bool] = None
+    container_ok: Optional[bool] = None
+    edible: Optional[bool] = None
+    sowing_months_by_climate: Optional[Dict[str, List[str]]] = None
+    maintainability_score: Optional[float] = None
+    time_to_maturity_days: Optional[int] = None
+    habit: Optional[str] = None
+    fragrant: Optional[bool] = None
+    flower_colors: Optional[List[str]] = None
+    sowing_depth_mm: Optional[int] = None
+    spacing_cm: Optional[int] = None
+    sowing_method: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    # Precomputed quantification inputs from plant_biophysics (not a plants column)
+    biophysics: Optional[Mapping[str, Any]] = None
+
+    @classmethod
+    def from_model(cls, plant: Any, **overrides: Any) -> "PlantRecord":
+        """Copy every column of a Plant model (or any object with the same attributes)."""
+        values = {f.name: getattr(plant, f.name, None) for f in fields(cls)}
+        values.update(overrides)
+        return cls(**values)
+
+
+class CatalogSnapshot:
+    """One immutable version of the plant catalog with lookup indexes.
+
+    ``records`` are frozen PlantRecords; ``plants`` are the matching plant
+    dictionaries in the repository's ``plant_to_dict`` shape. The dictionaries
+    are shared between requests, so callers that need to modify one must copy
+    it first (see ``PlantCatalog.copy_plants``).
+    """
+
+    def __init__(
+        self,
+        records: List[PlantRecord],
+        plant_dicts: List[Dict[str, Any]],
+        version: int,
+        row_count: int,
+        max_updated_at: Optional[datetime]
+    ):
+        self.version = version
+        self.row_count = row_count
+        self.max_updated_at = max_updated_at
+        self.loaded_at = datetime.utcnow()
+
+        self.records: Tuple[PlantRecord, ...] = tuple(records)
+        self.plants: Tuple[Dict[str, Any], ...] = tuple(plant_dicts)
+
+        by_id: Dict[int, int] = {}
+        by_name: Dict[str, int] = {}
+        by_category: Dict[str, List[int]] = {}
+        search_keys: List[Tuple[str, str]] = []
+
+        for idx, record in enumerate(self.records):
+            by_id[record.id] = idx
+            name_key = (record.plant_name or "").lower().strip()
+            sci_key = (record.scientific_name or "").lower().strip()
+            for key in (name_key, sci_key):
+                if key and key not in by_name:
+                    by_name[key] = idx
+            by_category.setdefault(record.plant_category, []).append(idx)
+            search_keys.append((name_key, sci_key))
+
+        self._by_id = MappingProxyType(by_id)
+        self._by_name = MappingProxyType(by_name)
+        self._by_category: Mapping[str, Tuple[int, ...]] = MappingProxyType(
+            {category: tuple(rows) for category, rows in by_category.items()}
+        )
+        self._search_keys = tuple(search_keys)
+        self._matrix: Optional[PlantMatrix] = None
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def matrix(self) -> PlantMatrix:
+        """Columnar scoring matrix over ``plants``, built on first use."""
+        if self._matrix is None:
+            self._matrix = PlantMatrix(self.plants)
+        return self._matrix
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the plants table state the snapshot was built from.
+
+        Unlike ``version`` (a per-process counter) this is the same in every
+        worker that loaded the same data, so it is safe in shared cache keys.
+        """
+        updated = self.max_updated_at.isoformat() if self.max_updated_at else ""
+        return f"{self.row_count}:{updated}"
+
+    @property
+    def categories(self) -> List[str]:
+        """Categories present in the catalog."""
+        return [category for category in self._by_category if category]
+
+    def get_by_id(self, plant_id: int) -> Optional[PlantRecord]:
+        """Get a plant record by database ID."""
+        idx = self._by_id.get(plant_id)
+        return self.records[idx] if idx is not None else None
+
+    def get_dict_by_id(self, plant_id: int) -> Optional[Dict[str, Any]]:
+        """Get the shared plant dictionary for a database ID."""
+        idx = self._by_id.get(plant_id)
+        return self.plants[idx] if idx is not None else None
+
+    def _find_index(self, plant_name: str) -> Optional[int]:
+        """Exact (case-insensitive) name match first, then a substring match.
+
+        Mirrors ``DatabasePlantRepository.find_plant_by_name``, which matches on
+        plant_name or scientific_name, exactly or by containment.
+        """
+        query = (plant_name or "").lower().strip()
+        if not query:
+            return None
+        idx = self._by_name.get(query)
+        if idx is not None:
+            return idx
+        for idx, (name_key, sci_key) in enumerate(self._search_keys):
+            if query in name_key or query in sci_key:
+                return idx
+        return None
+
+    def find_by_name(self, plant_name: str) -> Optional[PlantRecord]:
+        """Find a plant record by common or scientific name."""
+        idx = self._find_index(plant_name)
+        return self.records[idx] if idx is not None else None
+
+    def find_dict_by_name(self, plant_name: str) -> Optional[Dict[str, Any]]:
+        """Find the shared plant dictionary by common or scientific name."""
+        idx = self._find_index(plant_name)
+        return self.plants[idx] if idx is not None else None
+
+    def find_many_by_names(self, plant_names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Exact-name batch lookup, same contract as ``find_plants_by_names_batch``.
+
+        Returns:
+            Dictionary mapping lowercase plant/scientific names to plant dictionaries
+        """
+        plant_map = {}
+        for name in plant_names:
+            key = (name or "").lower().strip()
+            idx = self._by_name.get(key)
+            if idx is not None:
+                plant_map[key] = self.plants[idx]
+        return plant_map
+
+    def get_by_category(self, category: str) -> List[Dict[str, Any]]:
+        """Get the shared plant dictionaries of one category."""
+        return [self.plants[idx] for idx in self._by_category.get(category, ())]
+
+
+class PlantCatalog:
+    """Holder for the current CatalogSnapshot.
+
+    Readers grab ``snapshot`` once per request and keep using it, so a reload
+    that swaps the snapshot mid-request never mixes two catalog versions.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> Optional[CatalogSnapshot]:
+        """Current snapshot, or None before the first load."""
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot (0 if not loaded)."""
+        return self._snapshot.version if self._snapshot else 0
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._snapshot is not None
+
+    async def load(self, plant_repository: DatabasePlantRepository) -> CatalogSnapshot:
+        """Load all plants from the database and publish a new snapshot.
+
+        Args:
+            plant_repository: Repository bound to an open database session
+
+        Returns:
+            The newly published snapshot
+        """
+        async with self._lock:
+            return await self._load_locked(plant_repository)
+
+    async def _load_locked(self, plant_repository: DatabasePlantRepository) -> CatalogSnapshot:
+        row_count, max_updated_at = await plant_repository.get_catalog_state()
+        plants = await plant_repository.get_all_plant_objects()
+
+        plants = [plant for plant in plants if plant and plant.plant_name]
+        biophysics = await QuantificationService().ensure_biophysics(plant_repository, plants)
+
+        records = []
+        plant_dicts = []
+        for plant in plants:
+            records.append(PlantRecord.from_model(
+                plant, biophysics=MappingProxyType(biophysics[plant.id])
+            ))
+            plant_dicts.append(plant_repository.plant_to_dict(plant))
+
+        self._version += 1
+        snapshot = CatalogSnapshot(records, plant_dicts, self._version, row_count, max_updated_at)
+        self._snapshot = snapshot
+        print(f"Plant catalog v{snapshot.version} loaded with {len(snapshot)} plants")
+
+        # Responses derived from the previous snapshot are now stale
+        if snapshot.version > 1:
+            await invalidate_tags("plant:*")
+
+        return snapshot
+
+    async def ensure_loaded(self, plant_repository: DatabasePlantRepository) -> CatalogSnapshot:
+        """Return the current snapshot, loading it on first use."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        async with self._lock:
+            if self._snapshot is not None:
+                return self._snapshot
+            return await self._load_locked(plant_repository)
+
+    async def refresh_if_stale(self, plant_repository: DatabasePlantRepository) -> bool:
+        """Reload when the plants table changed since the snapshot was taken.
+
+        Change detection compares the row count and ``max(plants.updated_at)``.
+
+        Returns:
+            True if a new snapshot was loaded
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            await self.ensure_loaded(plant_repository)
+            return True
+
+        row_count, max_updated_at = await plant_repository.get_catalog_state()
+        if row_count == snapshot.row_count and max_updated_at == snapshot.max_updated_at:
+            return False
+
+        async with self._lock:
+            if self._snapshot is not snapshot:
+                return False
+            await self._load_locked(plant_repository)
+        return True
+
+    def start_auto_refresh(self, session_factory: Callable, interval_seconds: int) -> None:
+        """Poll the plants table in the background and reload when it changes.
+
+        Args:
+            session_factory: Callable returning an async session context manager
+            interval_seconds: Poll interval; 0 or less disables polling
+        """
+        if interval_seconds <= 0 or self._refresh_task is not None:
+            return
+
+        async def _poll():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    async with session_factory() as session:
+                        await self.refresh_if_stale(DatabasePlantRepository(session))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Warning: plant catalog refresh failed: {e}")
+
+        self._refresh_task = asyncio.create_task(_poll())
+
+    async def stop_auto_refresh(self) -> None:
+        """Cancel the background poll task, if running."""
+        task, self._refresh_task = self._refresh_task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    @staticmethod
+    def copy_plants(plants) -> List[Dict[str, Any]]:
+        """Shallow-copy shared plant dictionaries before a caller modifies them."""
+        return [dict(plant) for plant in plants]
+
+
+# Process-wide catalog instance
+plant_catalog = PlantCatalog()
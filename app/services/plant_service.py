@@ -1,4 +1,6 @@
-from typing import List, Dict, Any, Optional
+from typing import AsyncIterator, List, Dict, Any, Optional
+import asyncio
+import json
 import re
 import math
 
@@ -7,6 +9,10 @@ from app.utils.image_utils import image_to_base64
 from app.utils.cache import cached
 from app.schemas.response import PlantMedia, AllPlantsResponse, PaginatedPlantsResponse
 from app.core.config import settings
+from app.services.plant_catalog import CatalogSnapshot, plant_catalog
+
+# Plants serialized per chunk when streaming the catalog
+STREAM_BATCH_SIZE = 100
 
 
 class PlantService:
@@ -15,40 +21,107 @@ class PlantService:
     def __init__(self, plant_repository: DatabasePlantRepository):
         self.plant_repository = plant_repository
     
-    @cached(ttl=1800, prefix="plants")  # Cache for 30 minutes
-    async def get_all_plants_with_images(self) -> AllPlantsResponse:
-        """Get all plants with base64 encoded images.
+    @cached(ttl=1800, prefix="plants", tags=["plant:*"])  # Cache for 30 minutes
+    async def get_all_plants_with_images(self, include_images: bool = False) -> AllPlantsResponse:
+        """Get all plants with their image URLs.
+
+        Args:
+            include_images: Also inline each local image as base64 (large)
 
         Returns:
             AllPlantsResponse with all plants and images
         """
-        plants = await self.plant_repository.get_all_plants()
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plants = [self.plant_with_media(plant, include_images) for plant in snapshot.plants]
 
-        # Add base64 images and GCS URL to each plant
-        for plant in plants:
-            image_path = plant.get("image_path", "")
-            base64_image = image_to_base64(image_path)
+        return AllPlantsResponse(
+            plants=plants,
+            total_count=len(plants)
+        )
 
-            # Generate GCS image URL with cleaned special characters
-            plant_name = plant.get("plant_name", "")
-            plant_category = plant.get("plant_category", "flower")
-            scientific_name = plant.get("scientific_name", "")
+    def plant_with_media(self, plant: Dict[str, Any], include_images: bool = False) -> Dict[str, Any]:
+        """Copy a shared catalog plant dictionary and add its media block.
 
-            # Use the same method that generates clean URLs
-            image_url = self.get_primary_image_url(plant_name, plant_category, scientific_name)
+        Args:
+            plant: Plant dictionary from the catalog snapshot
+            include_images: Inline the local image as a base64 data URI
 
-            plant["media"] = {
-                "image_url": image_url,  # Add the cleaned URL
-                "image_path": image_path,
-                "image_base64": base64_image,
-                "has_image": bool(base64_image) or bool(image_url)
-            }
+        Returns:
+            New plant dictionary with a "media" entry
+        """
+        plant = dict(plant)
+        image_path = plant.get("image_path", "")
+        base64_image = image_to_base64(image_path) if include_images else ""
+
+        # Generate GCS image URL with cleaned special characters
+        plant_name = plant.get("plant_name", "")
+        plant_category = plant.get("plant_category", "flower")
+        scientific_name = plant.get("scientific_name", "")
+
+        # Use the same method that generates clean URLs
+        image_url = self.get_primary_image_url(plant_name, plant_category, scientific_name)
+
+        plant["media"] = {
+            "image_url": image_url,  # Add the cleaned URL
+            "image_path": image_path,
+            "image_base64": base64_image,
+            "has_image": bool(base64_image) or bool(image_url)
+        }
+        return plant
 
-        return AllPlantsResponse(
-            plants=plants,
-            total_count=len(plants)
+    async def stream_all_plants(
+        self,
+        snapshot: CatalogSnapshot,
+        ndjson: bool = False,
+        include_images: bool = False,
+        batch_size: int = STREAM_BATCH_SIZE
+    ) -> AsyncIterator[bytes]:
+        """Serialize the catalog incrementally for a streaming response.
+
+        The JSON form has the same shape as AllPlantsResponse; NDJSON emits
+        one plant per line. Plants are serialized in batches, so only one
+        batch of media dictionaries (and base64 images) exists at a time.
+
+        Args:
+            snapshot: Catalog snapshot to serialize
+            ndjson: Emit newline-delimited JSON instead of one JSON object
+            include_images: Inline local images as base64
+            batch_size: Plants per yielded chunk
+
+        Yields:
+            Encoded response chunks
+        """
+        plants = snapshot.plants
+        separator = b"\n" if ndjson else b","
+        if not ndjson:
+            yield b'{"plants":['
+
+        for start in range(0, len(plants), batch_size):
+            batch = plants[start:start + batch_size]
+            if include_images:
+                # Reading and encoding image files blocks; keep it off the event loop
+                chunk = await asyncio.to_thread(self._encode_batch, batch, separator, include_images)
+            else:
+                chunk = self._encode_batch(batch, separator, include_images)
+            if ndjson:
+                yield chunk + b"\n"
+            else:
+                yield chunk if start == 0 else b"," + chunk
+
+        if not ndjson:
+            yield b'],"total_count":' + str(len(plants)).encode() + b"}"
+
+    def _encode_batch(self, plants, separator: bytes, include_images: bool) -> bytes:
+        return separator.join(
+            json.dumps(
+                self.plant_with_media(plant, include_images),
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=str
+            ).encode("utf-8")
+            for plant in plants
         )
-    
+
     async def find_plant_with_details(self, plant_name: str) -> Optional[Dict[str, Any]]:
         """Find a plant by name and include all details.
         
@@ -58,9 +131,11 @@ class PlantService:
         Returns:
             Plant dictionary with full details or None
         """
-        plant = await self.plant_repository.find_plant_by_name(plant_name)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plant = snapshot.find_dict_by_name(plant_name)
         
         if plant:
+            plant = dict(plant)
             # Add image data
             image_path = plant.get("image_path", "")
             base64_image = image_to_base64(image_path)
@@ -82,7 +157,8 @@ class PlantService:
         Returns:
             List of plants in the category
         """
-        return await self.plant_repository.get_plants_by_category(category)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        return plant_catalog.copy_plants(snapshot.get_by_category(category))
 
     def generate_gcs_image_urls(self, plant_name: str, plant_category: str, scientific_name: str = None) -> List[str]:
         """Generate GCS image URLs for a plant.
@@ -155,7 +231,8 @@ class PlantService:
         Returns:
             Primary GCS image URL or None if plant not found
         """
-        plant = await self.plant_repository.get_plant_by_id(plant_id)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plant = snapshot.get_dict_by_id(plant_id)
 
         if not plant:
             return None
@@ -180,7 +257,8 @@ class PlantService:
         Returns:
             List of all GCS image URLs or None if plant not found
         """
-        plant = await self.plant_repository.get_plant_by_id(plant_id)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plant = snapshot.get_dict_by_id(plant_id)
 
         if not plant:
             return None
@@ -249,7 +327,7 @@ class PlantService:
             has_previous=has_previous
         )
 
-    @cached(ttl=86400, prefix="companions")  # Cache for 24 hours (static data)
+    @cached(ttl=86400, prefix="companions", tags=["plant:*"])  # Cache for 24 hours (static data)
     async def get_plant_companions(self, plant_id: int) -> Optional[Dict[str, Any]]:
         """Get companion planting information for a specific plant.
 
@@ -259,7 +337,8 @@ class PlantService:
         Returns:
             Dictionary containing companion planting data or None if plant not found
         """
-        plant = await self.plant_repository.get_plant_by_id(plant_id)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plant = snapshot.get_dict_by_id(plant_id)
 
         if not plant:
             return None
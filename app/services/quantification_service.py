@@ -5,9 +5,11 @@ Implements the per-plant quantification framework as specified
 
 import math
 import random
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
 from app.schemas.request import SitePreferences, UserPreferences
 from app.models.database import Plant, Suburb
 
@@ -60,6 +62,23 @@ class QuantificationService:
     CANOPY_MEAN = 0.8
     CANOPY_STD = 0.4
 
+    # Version of derive_static_biophysics; bump when the derivation changes so
+    # stored plant_biophysics rows are recomputed
+    BIOPHYSICS_VERSION = "1.0"
+
+    # Plant-only inputs stored in the plant_biophysics table
+    STATIC_BIOPHYSICS_FIELDS = (
+        'lai_proxy', 'canopy_area', 'transpiration_class', 'growth_speed',
+        'surface_roughness', 'aromatic_bonus', 'biodiversity_score', 'base_water_need',
+        'maintenance_mins_week', 'risk_level', 'confidence_score'
+    )
+
+    # Numeric plant features evaluated as arrays by quantify_many
+    ARRAY_FEATURES = (
+        'lai_proxy', 'canopy_area', 'transpiration_class', 'growth_speed',
+        'surface_roughness', 'aromatic_bonus', 'base_co2', 'yield_baseline', 'base_water_need'
+    )
+
     def __init__(self):
         """Initialize the quantification service"""
         pass
@@ -153,6 +172,264 @@ class QuantificationService:
 
         return impact, metrics, suitability
 
+    def quantify_many(
+        self,
+        plants: List[Plant],
+        site: SitePreferences,
+        preferences: UserPreferences,
+        suburb: Suburb,
+        plant_count: int = 1
+    ) -> List[Tuple[QuantifiedImpact, ImpactMetrics, SuitabilityScore]]:
+        """
+        Quantify the impact of several plants sharing one site, suburb and preferences
+
+        The site context is normalized once for the whole batch and the impact
+        indices and suitability scores are evaluated as array operations over all
+        plants. Results are identical to calling quantify_plant_impact_with_metrics
+        for each plant.
+
+        Args:
+            plants: Plant data (database rows or catalog records)
+            site: Site preferences and constraints
+            preferences: User preferences
+            suburb: Suburb data for UHI context
+            plant_count: Number of plants being installed (per plant)
+
+        Returns:
+            List of (QuantifiedImpact, ImpactMetrics, SuitabilityScore) in plant order
+        """
+        if not plants:
+            return []
+
+        # 1. Normalize site context once
+        context = self._normalize_context(site, suburb, preferences)
+
+        # 2-3. Static plant features, then impact indices over all plants
+        features = [self._plant_features(plant) for plant in plants]
+        columns = {key: np.array([f[key] for f in features], dtype=float) for key in self.ARRAY_FEATURES}
+        metrics_list = self._calculate_impact_indices_batch(features, columns, context)
+
+        # 4. Suitability scores over all plants
+        suitabilities = self._calculate_suitability_scores_batch(metrics_list, preferences)
+
+        results = []
+        for metrics, suitability in zip(metrics_list, suitabilities):
+            # 5-6. User-facing impact and community potential
+            impact = self._convert_to_user_impact(metrics, plant_count)
+            impact.community_impact_potential = self._calculate_community_impact(
+                impact, suburb, plant_count
+            )
+            results.append((impact, metrics, suitability))
+
+        return results
+
+    def derive_static_biophysics(self, plant: Plant) -> Dict[str, Any]:
+        """
+        Derive the plant-only quantification inputs from the free-text plant columns
+
+        These values depend only on the plant row, so they are computed once by
+        the data load scripts and stored in plant_biophysics (see ensure_biophysics).
+
+        Args:
+            plant: Plant data from database
+
+        Returns:
+            Dictionary keyed by STATIC_BIOPHYSICS_FIELDS
+        """
+        biophysics = self._derive_plant_biophysics(plant)
+        biophysics.update(
+            surface_roughness=self._get_surface_roughness(plant),
+            aromatic_bonus=self._get_aromatic_bonus(plant),
+            biodiversity_score=self._calculate_biodiversity_score(plant),
+            base_water_need=self._get_base_water_need(plant),
+            maintenance_mins_week=self._calculate_maintenance_load(plant),
+            risk_level=self._assess_risk(plant),
+            confidence_score=self._calculate_confidence(plant)
+        )
+        return biophysics
+
+    async def ensure_biophysics(
+        self,
+        plant_repository,
+        plants: List[Plant],
+        force: bool = False
+    ) -> Dict[int, Dict[str, Any]]:
+        """
+        Get stored biophysics for plants, computing and storing any that are missing
+
+        Rows are recomputed when absent, derived from an older plant row
+        (plants.updated_at changed) or produced by an older BIOPHYSICS_VERSION.
+        If the table cannot be read or written the values are still returned,
+        just not persisted.
+
+        Args:
+            plant_repository: DatabasePlantRepository bound to an open session
+            plants: Plant rows (or catalog records) to cover
+            force: Recompute and store every plant
+
+        Returns:
+            Dictionary mapping plant ID to its static biophysics
+        """
+        stored = {}
+        can_store = True
+        if not force:
+            try:
+                stored = await plant_repository.get_plant_biophysics()
+            except Exception as e:
+                print(f"Warning: could not read plant biophysics: {e}")
+                can_store = False
+
+        biophysics = {}
+        pending = []
+        for plant in plants:
+            row = stored.get(plant.id)
+            if (
+                row is not None
+                and row.version == self.BIOPHYSICS_VERSION
+                and row.plant_updated_at == plant.updated_at
+            ):
+                biophysics[plant.id] = {field: getattr(row, field) for field in self.STATIC_BIOPHYSICS_FIELDS}
+                continue
+
+            values = self.derive_static_biophysics(plant)
+            biophysics[plant.id] = values
+            pending.append(dict(
+                values,
+                plant_id=plant.id,
+                plant_updated_at=plant.updated_at,
+                version=self.BIOPHYSICS_VERSION
+            ))
+
+        if pending and can_store:
+            try:
+                await plant_repository.save_plant_biophysics(pending)
+            except Exception as e:
+                print(f"Warning: could not store biophysics for {len(pending)} plants: {e}")
+
+        return biophysics
+
+    def _plant_features(self, plant: Plant) -> Dict[str, Any]:
+        """Per-plant inputs to the impact indices that do not depend on the site"""
+        # Catalog records carry the stored biophysics; anything else is parsed here
+        stored = getattr(plant, 'biophysics', None)
+        features = dict(stored) if stored else self.derive_static_biophysics(plant)
+
+        features.update(
+            base_co2=self._get_base_co2_by_type(plant.plant_category),
+            is_edible=plant.plant_category in ['vegetable', 'herb'],
+            yield_baseline={'herb': 30, 'vegetable': 80}.get(plant.plant_category, 0)
+        )
+        return features
+
+    def _calculate_impact_indices_batch(
+        self,
+        features: List[Dict[str, Any]],
+        columns: Dict[str, np.ndarray],
+        context: Dict[str, float]
+    ) -> List[ImpactMetrics]:
+        """Array version of _calculate_impact_indices (same operations, same order)"""
+
+        lai = columns['lai_proxy']
+        canopy = columns['canopy_area']
+        transpiration = columns['transpiration_class']
+        growth = columns['growth_speed']
+
+        sun_factor = context['sun_factor']
+        wind_factor = context['wind_factor']
+        uhi_factor = context['uhi_factor']
+        season_factor = context['season_factor']
+
+        # 1. Cooling Index
+        cooling_raw = lai * canopy * transpiration * sun_factor * season_factor
+        cooling_index = self._zscore(cooling_raw, self.LAI_MEAN * self.CANOPY_MEAN,
+                                     self.LAI_STD * self.CANOPY_STD) * uhi_factor
+        cooling_index = np.clip(cooling_index, 0, 100)
+
+        # 2. Air Quality Index
+        aqi_raw = lai + columns['surface_roughness'] + columns['aromatic_bonus']
+        air_quality_improvement = np.clip(self._zscore(aqi_raw, 3.0, 1.0) * sun_factor, 0, 100)
+
+        # 3. CO2 Uptake
+        co2_uptake_kg_year = columns['base_co2'] * canopy * growth * sun_factor
+
+        # 4. Water Cycling
+        water_cycling_l_week = 7 * transpiration * canopy * sun_factor
+
+        # 6. Edible Yield
+        edible_yield_g_week = columns['yield_baseline'] * growth * sun_factor * (canopy / 0.5)
+
+        # 7. Water Need
+        water_need_l_week = columns['base_water_need'] * season_factor * wind_factor
+
+        return [
+            ImpactMetrics(
+                cooling_index=cooling,
+                air_quality_improvement=aqi,
+                co2_uptake_kg_year=co2,
+                water_cycling_l_week=water,
+                biodiversity_score=f['biodiversity_score'],
+                edible_yield_g_week=edible if f['is_edible'] else None,
+                water_need_l_week=need,
+                maintenance_mins_week=f['maintenance_mins_week'],
+                risk_level=f['risk_level'],
+                confidence_score=f['confidence_score']
+            )
+            for f, cooling, aqi, co2, water, edible, need in zip(
+                features,
+                cooling_index.tolist(),
+                air_quality_improvement.tolist(),
+                co2_uptake_kg_year.tolist(),
+                water_cycling_l_week.tolist(),
+                edible_yield_g_week.tolist(),
+                water_need_l_week.tolist()
+            )
+        ]
+
+    def _calculate_suitability_scores_batch(
+        self,
+        metrics_list: List[ImpactMetrics],
+        preferences: UserPreferences
+    ) -> List[SuitabilityScore]:
+        """Array version of _calculate_suitability_score (same operations, same order)"""
+
+        weights = self._get_suitability_weights(preferences.goal)
+
+        def column(name):
+            return np.array([getattr(m, name) for m in metrics_list], dtype=float)
+
+        risk_values = {'low': 1.0, 'medium': 0.5}
+        normalized = {
+            'cooling': column('cooling_index') / 100,
+            'air_quality': column('air_quality_improvement') / 100,
+            'biodiversity': column('biodiversity_score') / 100,
+            'co2': np.minimum(1.0, column('co2_uptake_kg_year') / 5.0),
+            'maintenance': np.maximum(0, 1.0 - column('maintenance_mins_week') / 30),
+            'water_need': np.maximum(0, 1.0 - column('water_need_l_week') / 10),
+            'risk': np.array([risk_values.get(m.risk_level, 0.0) for m in metrics_list]),
+            'confidence': column('confidence_score') / 100
+        }
+
+        if preferences.goal in ['edible', 'mixed']:
+            yields = np.array([m.edible_yield_g_week or 0.0 for m in metrics_list])
+            normalized['yield'] = np.where(yields != 0, np.minimum(1.0, yields / 100), 0.0)
+        else:
+            normalized['yield'] = np.zeros(len(metrics_list))
+
+        total_score = 0
+        for key in weights.keys():
+            total_score = total_score + weights[key] * normalized[key]
+        final_scores = (total_score * 100).tolist()
+
+        breakdowns = {key: (weights[key] * normalized[key] * 100).tolist() for key in weights.keys()}
+
+        return [
+            SuitabilityScore(
+                total_score=final_score,
+                breakdown={key: values[i] for key, values in breakdowns.items()}
+            )
+            for i, final_score in enumerate(final_scores)
+        ]
+
     def _normalize_context(
         self,
         site: SitePreferences,
@@ -484,6 +761,10 @@ class QuantificationService:
         wind_factor: float
     ) -> float:
         """Calculate water need in L/week"""
+        return self._get_base_water_need(plant) * season_factor * wind_factor
+
+    def _get_base_water_need(self, plant: Plant) -> float:
+        """Get water need in L/week before season and wind (stored in plant_biophysics)"""
         chars = (plant.characteristics or '').lower()
         category = plant.plant_category
 
@@ -494,7 +775,7 @@ class QuantificationService:
         elif 'moist' in chars or category == 'vegetable':
             base_need *= 1.4
 
-        return base_need * season_factor * wind_factor
+        return base_need
 
     def _calculate_maintenance_load(self, plant: Plant) -> float:
         """Calculate maintenance load in minutes/week"""
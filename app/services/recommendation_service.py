@@ -1,10 +1,15 @@
-import json
-import tempfile
-import os
-from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import asdict
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, Callable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.database_plant_repository import DatabasePlantRepository
 from app.repositories.climate_repository import ClimateRepository
+from app.models.database import Suburb
 from app.utils.image_utils import image_to_base64
 from app.utils.cache import cached
 from app.schemas.request import RecommendationRequest, PlantScoreRequest
@@ -15,21 +20,51 @@ from app.schemas.response import (
 )
 from app.services.quantification_service import QuantificationService
 from app.recommender.engine import (
-    load_all_plants, select_environment, get_user_preferences,
-    hard_filter, relax_if_needed, score_and_rank, assemble_output, category_diversity
+    select_environment, merge_user_preferences,
+    hard_filter_indexed, relax_indexed, select_top_k, assemble_output
 )
-from app.recommender.scoring import weights, calculate_scores
+from app.recommender.scoring import calculate_scores
+from app.recommender.matrix import PlantMatrix
+from app.services.plant_catalog import plant_catalog, CatalogSnapshot
 
 
 class RecommendationService:
     """Service for generating plant recommendations"""
 
-    def __init__(self, plant_repository: DatabasePlantRepository, climate_repository: ClimateRepository):
+    def __init__(
+        self,
+        plant_repository: DatabasePlantRepository,
+        climate_repository: ClimateRepository,
+        session_factory: Optional[Callable[[], AsyncSession]] = None
+    ):
+        """
+        Args:
+            plant_repository: Plant repository (request-scoped)
+            climate_repository: Climate repository (request-scoped)
+            session_factory: Opens database sessions for cached computations,
+                which can outlive the request (shared by waiting callers and
+                background refreshes); without one they use the repositories above
+        """
         self.plant_repository = plant_repository
         self.climate_repository = climate_repository
+        self.session_factory = session_factory
         self.quantification_service = QuantificationService()
+
+    @asynccontextmanager
+    async def _own_session(self) -> AsyncIterator["RecommendationService"]:
+        """Service whose repositories use a session owned by the current computation."""
+        if self.session_factory is None:
+            yield self
+            return
+        async with self.session_factory() as session:
+            yield RecommendationService(DatabasePlantRepository(session), ClimateRepository(session))
     
-    @cached(ttl=600, prefix="recommendations")  # Cache for 10 minutes
+    @cached(
+        ttl=600,  # Cache for 10 minutes, serve stale for 2 more while refreshing
+        prefix="recommendations",
+        stale_ttl=120,
+        tags=["plant:*", "suburb:{request.suburb}"]
+    )
     async def generate_recommendations(self, request: RecommendationRequest) -> Dict[str, Any]:
         """Generate plant recommendations based on user preferences.
 
@@ -39,76 +74,271 @@ class RecommendationService:
         Returns:
             Dictionary with recommendations and metadata
         """
-        # Create temporary file for user preferences
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as user_prefs_file:
-            json.dump(request.user_preferences.dict(), user_prefs_file)
-            user_prefs_path = user_prefs_file.name
+        # The computation may outlive this request, so it doesn't use the request's session
+        async with self._own_session() as service:
+            # Load all plants from the in-memory catalog snapshot
+            snapshot = await plant_catalog.ensure_loaded(service.plant_repository)
+            return await service._build_recommendations(request, snapshot)
+
+    async def generate_recommendations_batch(
+        self,
+        requests: List[RecommendationRequest]
+    ) -> List[Dict[str, Any]]:
+        """Generate recommendations for many user profiles.
+
+        Args:
+            requests: Recommendation requests
+
+        Returns:
+            One entry per request, in request order: {"index", "result"} on
+            success or {"index", "error"} if that profile failed
+        """
+        snapshot = await self.prepare_batch(requests)
+        return [item async for item in self.iter_recommendations_batch(requests, snapshot)]
+
+    async def prepare_batch(self, requests: List[RecommendationRequest]) -> CatalogSnapshot:
+        """Load shared inputs for a batch before any profile is scored.
+
+        The catalog snapshot is taken once and each distinct suburb/climate zone
+        is resolved once, so the per-profile loop no longer needs the database.
+
+        Args:
+            requests: Recommendation requests
+
+        Returns:
+            Catalog snapshot to score the whole batch against
+        """
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        month = datetime.now().strftime("%B")
+
+        for suburb, climate_zone in dict.fromkeys((r.suburb, r.climate_zone) for r in requests):
+            try:
+                await self._resolve_environment(suburb, climate_zone, month)
+            except Exception as e:
+                print(f"Warning: Could not resolve environment for {suburb}: {e}")
+
+        return snapshot
+
+    async def iter_recommendations_batch(
+        self,
+        requests: List[RecommendationRequest],
+        snapshot: CatalogSnapshot
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield batch results one profile at a time (used for NDJSON streaming).
+
+        Args:
+            requests: Recommendation requests
+            snapshot: Snapshot returned by prepare_batch
+
+        Yields:
+            {"index", "result"} or {"index", "error"} per request, in order
+        """
+        for index, request in enumerate(requests):
+            try:
+                result = await self._build_recommendations(request, snapshot)
+                yield {"index": index, "result": result}
+            except Exception as e:
+                yield {"index": index, "error": str(e)}
+            # Let other requests run between profiles of a large batch
+            await asyncio.sleep(0)
+
+    async def _build_recommendations(self, request: RecommendationRequest, snapshot: CatalogSnapshot) -> Dict[str, Any]:
+        """Run the recommendation pipeline for one request against a catalog snapshot.
+
+        Args:
+            request: Recommendation request with user preferences
+            snapshot: Catalog snapshot to recommend from
+
+        Returns:
+            Dictionary with recommendations and metadata
+        """
+        matrix = snapshot.matrix
         
-        try:
-            # Load all plants
-            all_plants = await self.plant_repository.get_all_plants()
-            
-            # Get latest climate for suburb or use default
-            climate_entry = await self.climate_repository.get_latest_climate_by_suburb(request.suburb)
-            
-            # Convert to legacy format for compatibility
-            climate_data = {}
-            if climate_entry:
-                climate_data[request.suburb] = {
-                    "temperature": climate_entry.get("weather", {}).get("temperature_current"),
-                    "humidity": climate_entry.get("weather", {}).get("humidity"),
-                    "rainfall": climate_entry.get("weather", {}).get("rainfall"),
-                    "uv_index": climate_entry.get("uv", {}).get("index"),
-                    "air_quality": climate_entry.get("air_quality", {}).get("aqi")
-                }
-            
-            # Select environment
-            env = select_environment(
-                request.suburb, 
-                climate_data, 
-                cli_override_climate_zone=request.climate_zone
-            )
-            
-            # Load user preferences
-            user_prefs = get_user_preferences(user_prefs_path)
-            
-            # Filter plants
-            eligible_plants = hard_filter(all_plants, user_prefs, env)
-            
-            # Relax filters if needed
-            final_candidates = relax_if_needed(
-                eligible_plants, all_plants, user_prefs, env, request.n
-            )
-            
-            # Score and rank
-            scored_plants = score_and_rank(final_candidates, user_prefs, env, weights)
-            
-            # Apply diversity cap
-            diverse_plants = category_diversity(
-                scored_plants, max_per_cat=2, target_count=request.n
-            )
-            
-            # Take top N
-            top_plants = diverse_plants[:request.n]
-            
-            # Assemble output
-            output = assemble_output(top_plants, user_prefs, env, [])
-            
-            # Enhance with images and plant IDs
-            output = await self._enhance_recommendations_with_images(output)
-            
-            # Add metadata
-            output["suburb"] = request.suburb
-            output["climate_zone"] = env["climate_zone"]
-            output["month_now"] = env["month_now"]
-            
-            return output
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(user_prefs_path):
-                os.unlink(user_prefs_path)
-    
+        # Resolve environment (cached per suburb, zone override and month)
+        env = dict(await self._resolve_environment(
+            request.suburb, request.climate_zone, datetime.now().strftime("%B")
+        ))
+        
+        # Load user preferences
+        user_prefs = merge_user_preferences(request.user_preferences.dict())
+        
+        # Hard-filter and relax (cached per filter inputs; only scoring runs per request)
+        user_site = user_prefs.get("site", {})
+        candidate_rows, notes = await self._filter_candidates(
+            matrix,
+            snapshot.fingerprint,
+            env["climate_zone"],
+            env["month_now"],
+            user_site.get("sun_exposure", "part_sun"),
+            bool(user_site.get("containers")),
+            user_site.get("location_type") == "indoors",
+            user_prefs.get("preferences", {}).get("goal", "mixed"),
+            request.n
+        )
+        notes = list(notes)
+        
+        # Score, dedupe and apply the diversity cap in a single top-k pass
+        top_plants = select_top_k(
+            candidate_rows, user_prefs, env, matrix,
+            n=request.n, max_per_cat=settings.DEFAULT_MAX_PER_CATEGORY
+        )
+        
+        # Assemble output
+        output = assemble_output(top_plants, user_prefs, env, notes)
+        
+        # Enhance with images and plant IDs
+        output = await self._enhance_recommendations_with_images(output)
+        
+        # Add metadata
+        output["suburb"] = request.suburb
+        output["climate_zone"] = env["climate_zone"]
+        output["month_now"] = env["month_now"]
+        
+        return output
+
+    @cached(ttl=3600, prefix="recommendations", tags=["suburb:{suburb}"])  # Environment only changes with the month
+    async def _resolve_environment(
+        self,
+        suburb: str,
+        climate_zone_override: Optional[str],
+        month: str
+    ) -> Dict[str, Any]:
+        """Resolve the recommendation environment for a suburb.
+
+        Args:
+            suburb: Suburb name
+            climate_zone_override: Optional climate zone from the request
+            month: Current month name (part of the cache key so entries roll over)
+
+        Returns:
+            Environment dictionary from select_environment
+        """
+        # Get latest climate for suburb or use default
+        climate_entry = await self.climate_repository.get_latest_climate_by_suburb(suburb)
+        
+        # Convert to legacy format for compatibility
+        climate_data = {}
+        if climate_entry:
+            climate_data[suburb] = {
+                "temperature": climate_entry.get("weather", {}).get("temperature_current"),
+                "humidity": climate_entry.get("weather", {}).get("humidity"),
+                "rainfall": climate_entry.get("weather", {}).get("rainfall"),
+                "uv_index": climate_entry.get("uv", {}).get("index"),
+                "air_quality": climate_entry.get("air_quality", {}).get("aqi")
+            }
+        
+        return select_environment(suburb, climate_data, cli_override_climate_zone=climate_zone_override)
+
+    @cached(
+        ttl=3600,
+        prefix="recommendations",
+        key_fields=["catalog_fingerprint", "climate_zone", "month", "sun_exposure",
+                    "containers", "indoors", "goal", "n"],
+        tags=["plant:*"]
+    )
+    async def _filter_candidates(
+        self,
+        matrix: PlantMatrix,
+        catalog_fingerprint: str,
+        climate_zone: str,
+        month: str,
+        sun_exposure: str,
+        containers: bool,
+        indoors: bool,
+        goal: str,
+        n: int
+    ) -> Tuple[np.ndarray, List[str]]:
+        """Run hard_filter and relaxation for one combination of filter inputs.
+
+        The matrix is not part of the cache key; catalog_fingerprint identifies it
+        (it is derived from the plants table, so it also matches across workers
+        sharing an L2 cache).
+
+        Returns:
+            Tuple of (read-only candidate rows, relaxation notes)
+        """
+        user = {
+            "site": {
+                "sun_exposure": sun_exposure,
+                "containers": containers,
+                "location_type": "indoors" if indoors else None
+            },
+            "preferences": {"goal": goal}
+        }
+        env = {"climate_zone": climate_zone, "month_now": month}
+
+        eligible_rows = hard_filter_indexed(matrix, user, env)
+        candidate_rows, notes = relax_indexed(matrix, eligible_rows, user, env, n)
+        candidate_rows.flags.writeable = False
+        return candidate_rows, notes
+
+    @cached(  # Cached alongside the base recommendations
+        ttl=600,
+        prefix="recommendations",
+        tags=["plant:*", "suburb:{request.suburb}"]
+    )
+    async def generate_recommendations_with_impact(self, request: RecommendationRequest) -> Dict[str, Any]:
+        """Generate recommendations with quantified climate impact for each plant.
+
+        Plants are fetched from the catalog by id, the suburb is looked up once
+        and all recommended plants are quantified in a single batch call.
+
+        Args:
+            request: Recommendation request with user preferences
+
+        Returns:
+            Recommendation output where each plant carries a "quantified_impact"
+            entry (plants that cannot be quantified are returned unchanged)
+        """
+        async with self._own_session() as service:
+            return await service._recommendations_with_impact(request)
+
+    async def _recommendations_with_impact(self, request: RecommendationRequest) -> Dict[str, Any]:
+        """Uncached body of generate_recommendations_with_impact."""
+        recommendations = await self.generate_recommendations(request)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+
+        # The base output is cached, so build new dicts instead of mutating it
+        enhanced = [dict(rec) for rec in recommendations.get("recommendations", [])]
+        found = []
+        for rec in enhanced:
+            plant = snapshot.get_by_id(rec["id"]) if rec.get("id") is not None else None
+            if plant is None:
+                plant = snapshot.find_by_name(rec.get("plant_name", ""))
+            if plant is not None:
+                found.append((rec, plant))
+
+        if found:
+            suburb = await self.climate_repository.get_suburb_by_name(request.suburb)
+            if not suburb:
+                # Use default UHI context if the suburb is unknown
+                suburb = Suburb(
+                    name=request.suburb,
+                    suburb_heat_category="Moderate Heat",
+                    suburb_heat_intensity=8.0
+                )
+
+            try:
+                impacts = self.quantification_service.quantify_many(
+                    [plant for _, plant in found],
+                    site=request.user_preferences.site,
+                    preferences=request.user_preferences.preferences,
+                    suburb=suburb,
+                    plant_count=1
+                )
+            except Exception as e:
+                # If quantification fails, return the original recommendations
+                print(f"Warning: Failed to quantify impact for recommendations: {str(e)}")
+                impacts = []
+
+            for (rec, plant), (impact, _, _) in zip(found, impacts):
+                rec["quantified_impact"] = asdict(impact)
+                rec["beneficial_companions"] = plant.beneficial_companions or ""
+                rec["harmful_companions"] = plant.harmful_companions or ""
+                rec["neutral_companions"] = plant.neutral_companions or ""
+
+        return {**recommendations, "recommendations": enhanced}
+
     async def score_plant(self, request: PlantScoreRequest) -> PlantScoreResponse:
         """Score a specific plant based on user preferences.
         
@@ -119,92 +349,66 @@ class RecommendationService:
             PlantScoreResponse with scoring details
         """
         # Find the plant
-        plant = await self.plant_repository.find_plant_by_name(request.plant_name)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plant = snapshot.find_dict_by_name(request.plant_name)
         if not plant:
             raise ValueError(f"Plant '{request.plant_name}' not found")
         
-        # Create temporary file for user preferences
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.json') as user_prefs_file:
-            json.dump(request.user_preferences.dict(), user_prefs_file)
-            user_prefs_path = user_prefs_file.name
+        # Resolve environment (cached per suburb, zone override and month)
+        env = dict(await self._resolve_environment(
+            request.suburb, request.climate_zone, datetime.now().strftime("%B")
+        ))
         
-        try:
-            # Get latest climate for suburb or use default
-            climate_entry = await self.climate_repository.get_latest_climate_by_suburb(request.suburb)
-            
-            # Convert to legacy format for compatibility
-            climate_data = {}
-            if climate_entry:
-                climate_data[request.suburb] = {
-                    "temperature": climate_entry.get("weather", {}).get("temperature_current"),
-                    "humidity": climate_entry.get("weather", {}).get("humidity"),
-                    "rainfall": climate_entry.get("weather", {}).get("rainfall"),
-                    "uv_index": climate_entry.get("uv", {}).get("index"),
-                    "air_quality": climate_entry.get("air_quality", {}).get("aqi")
-                }
-            
-            # Select environment
-            env = select_environment(
-                request.suburb,
-                climate_data,
-                cli_override_climate_zone=request.climate_zone
-            )
-            
-            # Load user preferences
-            user_prefs = get_user_preferences(user_prefs_path)
-            
-            # Calculate score
-            score, breakdown = calculate_scores(plant, user_prefs, env)
-            
-            # Get sowing information
-            sowing_data = plant.get("sowing_months_by_climate")
-            if sowing_data is None:
-                sowing_data = {}
-            sowing_months = sowing_data.get(env["climate_zone"], [])
-            season_label = "Start now" if env["month_now"] in sowing_months else "Plan ahead"
-            
-            # Prepare media
-            image_path = plant.get("image_path", "")
-            image_base64 = image_to_base64(image_path)
-            
-            # Create response
-            return PlantScoreResponse(
-                plant_name=plant.get("plant_name"),
-                scientific_name=plant.get("scientific_name"),
-                plant_category=plant.get("plant_category"),
-                score=round(score, 1),
-                score_breakdown={k: round(v, 3) for k, v in breakdown.items()},
-                fit=PlantFit(
-                    sun_need=plant.get("sun_need"),
-                    time_to_maturity_days=plant.get("time_to_maturity_days"),
-                    maintainability=plant.get("maintainability"),
-                    container_ok=plant.get("container_ok"),
-                    indoor_ok=plant.get("indoor_ok"),
-                    habit=plant.get("habit")
-                ),
-                sowing=PlantSowing(
-                    climate_zone=env["climate_zone"],
-                    months=sowing_months,
-                    method=plant.get("sowing_method"),
-                    depth_mm=plant.get("sowing_depth_mm"),
-                    spacing_cm=plant.get("spacing_cm"),
-                    season_label=season_label
-                ),
-                media=PlantMedia(
-                    image_path=image_path,
-                    image_base64=image_base64,
-                    has_image=bool(image_base64)
-                ),
-                suburb=request.suburb,
+        # Load user preferences
+        user_prefs = merge_user_preferences(request.user_preferences.dict())
+        
+        # Calculate score
+        score, breakdown = calculate_scores(plant, user_prefs, env)
+        
+        # Get sowing information
+        sowing_data = plant.get("sowing_months_by_climate")
+        if sowing_data is None:
+            sowing_data = {}
+        sowing_months = sowing_data.get(env["climate_zone"], [])
+        season_label = "Start now" if env["month_now"] in sowing_months else "Plan ahead"
+        
+        # Prepare media
+        image_path = plant.get("image_path", "")
+        image_base64 = image_to_base64(image_path)
+        
+        # Create response
+        return PlantScoreResponse(
+            plant_name=plant.get("plant_name"),
+            scientific_name=plant.get("scientific_name"),
+            plant_category=plant.get("plant_category"),
+            score=round(score, 1),
+            score_breakdown={k: round(v, 3) for k, v in breakdown.items()},
+            fit=PlantFit(
+                sun_need=plant.get("sun_need"),
+                time_to_maturity_days=plant.get("time_to_maturity_days"),
+                maintainability=plant.get("maintainability"),
+                container_ok=plant.get("container_ok"),
+                indoor_ok=plant.get("indoor_ok"),
+                habit=plant.get("habit")
+            ),
+            sowing=PlantSowing(
                 climate_zone=env["climate_zone"],
-                month_now=env["month_now"]
-            )
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(user_prefs_path):
-                os.unlink(user_prefs_path)
-    
+                months=sowing_months,
+                method=plant.get("sowing_method"),
+                depth_mm=plant.get("sowing_depth_mm"),
+                spacing_cm=plant.get("spacing_cm"),
+                season_label=season_label
+            ),
+            media=PlantMedia(
+                image_path=image_path,
+                image_base64=image_base64,
+                has_image=bool(image_base64)
+            ),
+            suburb=request.suburb,
+            climate_zone=env["climate_zone"],
+            month_now=env["month_now"]
+        )
+
     async def _enhance_recommendations_with_images(self, output: Dict[str, Any]) -> Dict[str, Any]:
         """Add GCS image URLs, plant database IDs, and companion planting data to recommendations.
 
@@ -216,9 +420,10 @@ class RecommendationService:
         """
         recommendations = output.get("recommendations", [])
 
-        # PERFORMANCE OPTIMIZATION: Batch fetch all plants in a single query (fixes N+1 problem)
+        # Look up all plants in the in-memory catalog (no database round trip)
         plant_names = [rec.get("plant_name", "") for rec in recommendations]
-        plants_map = await self.plant_repository.find_plants_by_names_batch(plant_names)
+        snapshot = await plant_catalog.ensure_loaded(self.plant_repository)
+        plants_map = snapshot.find_many_by_names(plant_names)
 
         # Now iterate through recommendations and use the pre-fetched data
         for recommendation in recommendations:
@@ -226,7 +431,7 @@ class RecommendationService:
             plant_category = recommendation.get("plant_category", "flower")
             scientific_name = recommendation.get("scientific_name", "")
 
-            # Look up plant from batch-fetched map (no DB query!)
+            # Look up plant from the catalog map
             plant = plants_map.get(plant_name.lower().strip())
             if plant:
                 recommendation["id"] = plant.get("id")  # Add database ID
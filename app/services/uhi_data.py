@@ -0,0 +1,212 @@
+"""
+Urban heat island (UHI) dataset, loaded once per worker
+
+``melbourne_heat_data.json`` is read and sanitized (inf/NaN become null) once,
+indexed by suburb id, name and heat intensity, and the whole-dataset responses
+(``/uhi/data`` and ``/uhi/metadata``) are prebuilt as bytes with gzip
+variants. Requests only stat the file; it is reloaded when it changes.
+"""
+import json
+import math
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.utils.http_cache import EncodedBody, encode_body, file_version, files_last_modified
+from app.utils.text_search import NameIndex, RangeIndex
+
+# Project root is where the app/ folder lives
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+UHI_DATA_PATH = PROJECT_ROOT / "app" / "static" / "uhi"
+HEAT_DATA_FILE = UHI_DATA_PATH / "melbourne_heat_data.json"
+
+
+def sanitize(obj: Any) -> Any:
+    """Recursively replace inf/NaN floats (not valid JSON) with None"""
+    if isinstance(obj, dict):
+        return {k: sanitize(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [sanitize(item) for item in obj]
+    if isinstance(obj, float) and (math.isinf(obj) or math.isnan(obj)):
+        return None
+    return obj
+
+
+def _hottest_first(suburb: Dict[str, Any]) -> Tuple[bool, float]:
+    """Sort key: highest intensity first, suburbs without one (e.g. sanitized NaN) last"""
+    intensity = suburb["heat"]["intensity"]
+    return (intensity is None, -intensity if intensity is not None else 0.0)
+
+
+def _json_bytes(content: Any) -> bytes:
+    return json.dumps(content, allow_nan=False, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+@dataclass(frozen=True)
+class UHISnapshot:
+    """Immutable, indexed view of one version of the heat dataset."""
+    version: str
+    last_modified: Optional[datetime]
+    data: Dict[str, Any]
+    suburbs: Tuple[Dict[str, Any], ...]
+    by_id: Dict[str, Dict[str, Any]]
+    # Suburbs hottest first (stable for equal intensity), overall and per lower-cased category
+    by_intensity: Tuple[Dict[str, Any], ...]
+    by_category: Dict[str, Tuple[Dict[str, Any], ...]]
+    names: NameIndex = field(repr=False)
+    intensities: RangeIndex = field(repr=False)
+    data_body: EncodedBody = field(repr=False)
+    metadata_body: EncodedBody = field(repr=False)
+
+    @property
+    def heat_categories(self) -> Dict[str, Any]:
+        return self.data.get("heat_categories", {})
+
+    def hottest(self, category: Optional[str] = None, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Suburbs sorted by heat intensity, optionally within one heat category
+
+        Args:
+            category: Heat category label (case-insensitive), e.g. "High Heat"
+            limit: Maximum number of suburbs
+
+        Returns:
+            List of suburb dictionaries, hottest first
+        """
+        ranked = self.by_category.get(category.lower(), ()) if category else self.by_intensity
+        return list(ranked[:limit])
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Suburbs whose name contains the query, or similar names if none do
+
+        Args:
+            query: Search text (case-insensitive)
+            limit: Maximum number of suburbs
+            fuzzy: Whether to fall back to similar names (typos)
+
+        Returns:
+            Tuple of (suburbs, whether the fuzzy fallback was used)
+        """
+        return self.names.search(query, limit, fuzzy)
+
+    def in_heat_range(
+        self,
+        min_intensity: Optional[float] = None,
+        max_intensity: Optional[float] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Suburbs with heat intensity within inclusive bounds, hottest first
+
+        Args:
+            min_intensity: Lower bound in degrees Celsius (unbounded when None)
+            max_intensity: Upper bound in degrees Celsius (unbounded when None)
+            limit: Maximum number of suburbs
+
+        Returns:
+            List of suburb dictionaries
+        """
+        hottest_first = self.intensities.between(min_intensity, max_intensity)[::-1]
+        return hottest_first if limit is None else hottest_first[:limit]
+
+
+def build_snapshot(raw: Dict[str, Any], version: str, last_modified: Optional[datetime] = None) -> UHISnapshot:
+    """
+    Sanitize, index and pre-serialize a parsed heat dataset
+
+    Args:
+        raw: Parsed melbourne_heat_data.json
+        version: Version identifier of the source file
+        last_modified: Source file modification time
+
+    Returns:
+        UHISnapshot: Indexed dataset with prebuilt response bodies
+    """
+    data = sanitize(raw)
+    suburbs = tuple(data.get("suburbs", []))
+
+    by_intensity = tuple(sorted(suburbs, key=_hottest_first))
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for suburb in by_intensity:
+        by_category.setdefault(suburb["heat"]["category"].lower(), []).append(suburb)
+
+    metadata = {
+        "metadata": data.get("metadata", {}),
+        "statistics": data.get("statistics", {}),
+        "heat_categories": data.get("heat_categories", {})
+    }
+
+    return UHISnapshot(
+        version=version,
+        last_modified=last_modified,
+        data=data,
+        suburbs=suburbs,
+        by_id={suburb["id"]: suburb for suburb in suburbs},
+        by_intensity=by_intensity,
+        by_category={name: tuple(items) for name, items in by_category.items()},
+        names=NameIndex(suburbs, [suburb["name"] for suburb in suburbs]),
+        intensities=RangeIndex(suburbs, [suburb["heat"]["intensity"] for suburb in suburbs]),
+        data_body=encode_body(_json_bytes(data), last_modified=last_modified),
+        metadata_body=encode_body(_json_bytes(metadata), last_modified=last_modified)
+    )
+
+
+class UHIDataStore:
+    """Holds the current UHISnapshot for a data file."""
+
+    def __init__(self, path: Path = HEAT_DATA_FILE):
+        self.path = path
+        self._snapshot: Optional[UHISnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def snapshot(self) -> Optional[UHISnapshot]:
+        return self._snapshot
+
+    def load(self) -> UHISnapshot:
+        """
+        Read, sanitize and index the data file
+
+        Returns:
+            UHISnapshot: The new snapshot
+
+        Raises:
+            FileNotFoundError: If the data file does not exist
+        """
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self) -> UHISnapshot:
+        version = file_version([self.path])
+        with open(self.path, "r") as f:
+            raw = json.load(f)
+        snapshot = build_snapshot(raw, version, files_last_modified([self.path]))
+        self._snapshot = snapshot
+        print(f"UHI data loaded: {len(snapshot.suburbs)} suburbs from {self.path.name}")
+        return snapshot
+
+    def get(self) -> UHISnapshot:
+        """
+        Current snapshot, (re)loading it if the file is new or changed
+
+        Raises:
+            FileNotFoundError: If the data file does not exist
+        """
+        if not self.path.exists():
+            raise FileNotFoundError(f"UHI data not found at {self.path.absolute()}")
+
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == file_version([self.path]):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.version == file_version([self.path]):
+                return snapshot
+            return self._load_locked()
+
+
+# Process-wide store (one per worker)
+uhi_data = UHIDataStore()
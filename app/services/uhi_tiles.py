@@ -0,0 +1,253 @@
+"""
+Suburb boundary tiles for the UHI heatmap
+
+Tiles (per-zoom simplified GeoJSON with heat values joined in) are built
+from the boundaries GeoJSON and melbourne_heat_data.json by
+``build_tile_pack`` - at deploy by ``scripts/build_uhi_tiles.py`` and at
+startup when the pack is missing or out of date - and served from a
+memory-mapped pack, reopened only when the pack file changes.
+
+The pack header records a digest of both source files, so a pack built
+from older data is refused instead of serving stale heat values.
+"""
+import hashlib
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.services.uhi_data import HEAT_DATA_FILE, UHI_DATA_PATH, sanitize
+from app.utils.geo_tiles import (
+    TilePack,
+    clip_geometry,
+    feature_collection_bytes,
+    geometry_bounds,
+    pixel_tolerance,
+    simplify_geometry,
+    tile_bounds,
+    tiles_for_bounds,
+    write_tile_pack,
+)
+from app.utils.http_cache import file_version
+
+BOUNDARIES_FILE = UHI_DATA_PATH / "melbourne_suburbs_simplified.geojson"
+TILES_FILE = UHI_DATA_PATH / "tiles" / "melbourne_suburbs.tiles"
+SOURCE_FILES = (BOUNDARIES_FILE, HEAT_DATA_FILE)
+
+DEFAULT_MIN_ZOOM = 9
+DEFAULT_MAX_ZOOM = 13
+# Clip buffer around each tile, as a fraction of the tile width
+TILE_BUFFER = 1 / 64
+
+
+class StaleTilesError(RuntimeError):
+    """The tile pack was built from different source files than the current ones"""
+
+
+def source_digest(*paths: Path) -> str:
+    """Content hash of the source files, recorded in the pack header"""
+    digest = hashlib.blake2b(digest_size=12)
+    for path in paths:
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def load_heat_lookup(heat_file: Path = HEAT_DATA_FILE) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """Heat data per lower-cased suburb name, plus category colors"""
+    with open(heat_file, "r") as f:
+        data = sanitize(json.load(f))
+
+    colors = {category["label"]: category.get("color") for category in data.get("heat_categories", {}).values()}
+    lookup = {}
+    for suburb in data["suburbs"]:
+        # Some names appear twice; the first entry matches the GeoJSON feature
+        lookup.setdefault(suburb["name"].lower(), suburb)
+    return lookup, colors
+
+
+def feature_properties(properties: Dict[str, Any], lookup: Dict[str, Dict], colors: Dict[str, str]) -> Dict[str, Any]:
+    """Compact properties with the heat values the map colors by"""
+    name = properties.get("SUBURB_NAME", "")
+    suburb = lookup.get(name.lower())
+    if suburb is None:
+        intensity = properties.get("AVG_HEAT")
+        category = properties.get("HEAT_CATEGORY")
+        return {
+            "id": None,
+            "name": name,
+            "heat_intensity": round(intensity, 2) if isinstance(intensity, float) and math.isfinite(intensity) else None,
+            "heat_category": category,
+            "color": colors.get(category)
+        }
+    return {
+        "id": suburb["id"],
+        "name": suburb["name"],
+        "heat_intensity": suburb["heat"]["intensity"],
+        "heat_category": suburb["heat"]["category"],
+        "heat_rank": suburb["heat"].get("rank"),
+        "vegetation_total": suburb.get("vegetation", {}).get("total"),
+        "color": colors.get(suburb["heat"]["category"])
+    }
+
+
+def build_tiles(features: List[Dict[str, Any]], min_zoom: int, max_zoom: int) -> Dict[Tuple[int, int, int], bytes]:
+    """Simplify features per zoom and bucket them into tiles"""
+    tiles = {}
+    for zoom in range(min_zoom, max_zoom + 1):
+        tolerance = pixel_tolerance(zoom)
+        # Enough decimals to resolve a tenth of a pixel
+        precision = max(0, math.ceil(-math.log10(tolerance / 10)))
+
+        buckets = defaultdict(list)
+        for feature in features:
+            geometry = simplify_geometry(feature["geometry"], tolerance, precision)
+            if geometry is None:
+                continue
+            for x, y in tiles_for_bounds(geometry_bounds(geometry), zoom):
+                # Clip with a small buffer so polygon edges don't show at tile seams
+                west, south, east, north = tile_bounds(zoom, x, y)
+                buffer = (east - west) * TILE_BUFFER
+                clipped = clip_geometry(geometry, (west - buffer, south - buffer, east + buffer, north + buffer), precision)
+                if clipped is not None:
+                    buckets[(x, y)].append({"type": "Feature", "geometry": clipped, "properties": feature["properties"]})
+
+        size = 0
+        for (x, y), tile_features in buckets.items():
+            body = feature_collection_bytes(tile_features)
+            tiles[(zoom, x, y)] = body
+            size += len(body)
+        print(f"  zoom {zoom}: {len(buckets)} tiles, {size / 1024:.0f} KB (tolerance {tolerance:.6f} deg)")
+    return tiles
+
+
+def build_tile_pack(
+    path: Path = TILES_FILE,
+    min_zoom: int = DEFAULT_MIN_ZOOM,
+    max_zoom: int = DEFAULT_MAX_ZOOM,
+    sources: Sequence[Path] = SOURCE_FILES
+) -> Dict[str, Any]:
+    """
+    Join heat data into the suburb boundaries and write every z/x/y tile to a pack
+
+    Args:
+        path: Pack file to write
+        min_zoom: Lowest zoom level
+        max_zoom: Highest zoom level
+        sources: Boundaries GeoJSON and heat data files
+
+    Returns:
+        The pack header that was written
+    """
+    boundaries_file, heat_file = sources
+    started = time.time()
+    with open(boundaries_file, "r") as f:
+        boundaries = json.load(f)
+
+    lookup, colors = load_heat_lookup(heat_file)
+    features = []
+    unmatched = 0
+    for feature in boundaries["features"]:
+        properties = feature_properties(feature.get("properties") or {}, lookup, colors)
+        unmatched += properties["id"] is None
+        features.append({"geometry": feature["geometry"], "properties": properties})
+    print(f"Joined heat data for {len(features) - unmatched}/{len(features)} suburbs")
+
+    bounds = [math.inf, math.inf, -math.inf, -math.inf]
+    for feature in features:
+        west, south, east, north = geometry_bounds(feature["geometry"])
+        bounds = [min(bounds[0], west), min(bounds[1], south), max(bounds[2], east), max(bounds[3], north)]
+
+    print(f"Building zoom levels {min_zoom}-{max_zoom}...")
+    tiles = build_tiles(features, min_zoom, max_zoom)
+
+    header = write_tile_pack(path, tiles, {
+        "source_version": source_digest(*sources),
+        "min_zoom": min_zoom,
+        "max_zoom": max_zoom,
+        "bounds": bounds,
+        "features": len(features),
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    })
+    print(f"Wrote {len(tiles)} tiles to {path} ({path.stat().st_size / 1024:.0f} KB) "
+          f"in {time.time() - started:.1f}s")
+    return header
+
+
+class TileStore:
+    """Holds the open TilePack for a pack file."""
+
+    def __init__(self, path: Path = TILES_FILE, sources: Sequence[Path] = SOURCE_FILES):
+        self.path = path
+        self.sources = tuple(sources)
+        self._pack: Optional[TilePack] = None
+        self._version: Optional[str] = None
+        self._stale: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def is_current(self) -> bool:
+        """Whether the pack exists and was built from the current source files."""
+        if not self.path.exists():
+            return False
+        pack = TilePack(self.path)
+        try:
+            return pack.header.get("source_version") == source_digest(*self.sources)
+        finally:
+            pack.close()
+
+    def ensure_current(self) -> None:
+        """Build the pack if it is missing or out of date (app startup)."""
+        if not self.is_current():
+            print(f"UHI tiles missing or out of date, building {self.path.name}")
+            build_tile_pack(self.path, sources=self.sources)
+
+    def get(self) -> TilePack:
+        """
+        Current tile pack, (re)opening it if the pack or its sources changed
+
+        Raises:
+            FileNotFoundError: If the pack has not been generated
+            StaleTilesError: If the pack was built from other source files
+        """
+        if not self.path.exists():
+            raise FileNotFoundError(
+                f"Boundary tiles not found at {self.path}; run scripts/build_uhi_tiles.py"
+            )
+
+        # Stats only; the sources are hashed again only when one of them changes
+        version = file_version([self.path, *self.sources])
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._open(version)
+        if self._stale:
+            raise StaleTilesError(self._stale)
+        return self._pack
+
+    def _open(self, version: str) -> None:
+        """Open the pack and check it against the sources (caller holds the lock)."""
+        pack = TilePack(self.path)
+        expected = source_digest(*self.sources)
+        if pack.header.get("source_version") != expected:
+            pack.close()
+            self._stale = (
+                f"Boundary tiles at {self.path} were built from other heat or boundary "
+                f"data; run scripts/build_uhi_tiles.py"
+            )
+            print(f"Warning: {self._stale}")
+        else:
+            self._stale = None
+            print(f"UHI tiles loaded: {len(pack)} tiles, zoom {pack.min_zoom}-{pack.max_zoom}")
+
+        # Bodies already handed out keep their own bytes, so the old map can
+        # be closed right away
+        previous, self._pack = self._pack, (None if self._stale else pack)
+        self._version = version
+        if previous is not None:
+            previous.close()
+
+
+# Process-wide store (one per worker)
+uhi_tiles = TileStore()
@@ -0,0 +1,287 @@
+"""
+Rate-limited scheduler for calls to upstream APIs
+
+Each upstream gets a token bucket (its request rate) and a circuit breaker
+(stop calling it after repeated failures, probe again after a cool-down).
+Calls run with a per-attempt deadline and are retried with jittered
+exponential backoff, and ``map`` spreads many calls over a bounded pool of
+workers. A slow or failing upstream therefore only delays its own calls,
+and a bulk job finishes as fast as the rate limits allow.
+
+Usage:
+    from app.utils.api_scheduler import APIScheduler
+
+    scheduler = APIScheduler({"waqi": 5.0}, workers=10, deadline=15.0)
+    aqi = await scheduler.call("waqi", client.get_air_quality_by_coords, lat, lon)
+    results = await scheduler.map("waqi", client.get_air_quality_by_coords, [(lat, lon), ...])
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+async def run_workers(
+    func: Callable[..., Awaitable[Any]],
+    items: Sequence[Tuple],
+    workers: int
+) -> List[Any]:
+    """
+    Await func(*item) for every item using at most `workers` concurrent tasks.
+
+    Args:
+        func: Coroutine function to call
+        items: Argument tuples, one per call
+        workers: Maximum number of calls in flight
+
+    Returns:
+        Results in item order (exceptions are returned, not raised, as with
+        asyncio.gather(..., return_exceptions=True))
+    """
+    results: List[Any] = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def worker() -> None:
+        # Workers pull from one shared iterator, so a slow call only holds up its own worker
+        for index, args in pending:
+            try:
+                results[index] = await func(*args)
+            except Exception as e:
+                results[index] = e
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, len(items))))))
+    return results
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: Tokens added per second (0 or less = unlimited)
+            capacity: Largest burst (defaults to one second's worth, at least 1)
+            clock: Monotonic time source
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it."""
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CircuitBreaker:
+    """Stops calls to an upstream after consecutive failures"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before letting a probe through
+            clock: Monotonic time source
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        """Current state (an open circuit turns half-open once reset_timeout has passed)."""
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        Whether a call may be made now.
+
+        A half-open circuit lets one probe through and rejects other callers
+        until that probe is recorded as a success or failure (or released).
+        """
+        state = self.state
+        if state == self.OPEN:
+            return False
+        if state == self.HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release_probe(self) -> None:
+        """Let another probe through when one ended without a result (e.g. cancelled)."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        """Close the circuit and reset the failure count."""
+        self.failures = 0
+        self._state = self.CLOSED
+        self._probing = False
+
+    def record_failure(self, error: str) -> None:
+        """
+        Count a failure, opening the circuit at the threshold or on a failed probe.
+
+        Args:
+            error: Description of the failure
+        """
+        self.failures += 1
+        self.last_error = error
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip()
+        self._probing = False
+
+    def trip(self, elapsed: float = 0.0) -> None:
+        """
+        Open the circuit.
+
+        Args:
+            elapsed: Seconds the circuit has already been open (when restoring saved state)
+        """
+        self._state = self.OPEN
+        self._opened_at = self._clock() - elapsed
+        self._probing = False
+
+
+class APIScheduler:
+    """Token buckets, circuit breakers, deadlines and retries per upstream API"""
+
+    # Longest wait between retries, in seconds
+    MAX_BACKOFF = 30.0
+
+    def __init__(
+        self,
+        rate_limits: Dict[str, float],
+        workers: int = 10,
+        deadline: float = 15.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        failure_threshold: int = 5,
+        reset_timeout: float = 300.0
+    ):
+        """
+        Args:
+            rate_limits: Requests per second allowed for each upstream
+            workers: Concurrent calls made by map()
+            deadline: Seconds allowed for each attempt
+            max_retries: Retries after the first attempt
+            backoff_base: Upper bound of the first retry delay (doubles each retry)
+            failure_threshold: Consecutive failures that open an upstream's circuit
+            reset_timeout: Seconds an open circuit waits before probing again
+        """
+        self.workers = workers
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.buckets = {api: TokenBucket(rate) for api, rate in rate_limits.items()}
+        self.breakers = {api: CircuitBreaker(failure_threshold, reset_timeout) for api in rate_limits}
+        self.stats = {
+            api: {"requests": 0, "successes": 0, "failures": 0, "retries": 0, "rejected": 0}
+            for api in rate_limits
+        }
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Delay before a retry ("full jitter": uniform up to the exponential bound).
+
+        Args:
+            attempt: Retry number, starting at 1
+
+        Returns:
+            Seconds to wait
+        """
+        return random.uniform(0, min(self.MAX_BACKOFF, self.backoff_base * 2 ** (attempt - 1)))
+
+    async def call(self, api: str, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """
+        Call an upstream through its rate limit and circuit breaker.
+
+        Exceptions (the API clients raise UpstreamError) and attempts past
+        the deadline count as failures. None is a successful answer with no
+        data and is returned without a retry.
+
+        Args:
+            api: Upstream name (a key of rate_limits)
+            func: Coroutine function making the request
+            *args: Arguments for func
+
+        Returns:
+            The result, or None if every attempt failed or the circuit is open
+        """
+        breaker = self.breakers[api]
+        stats = self.stats[api]
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                stats["retries"] += 1
+                await asyncio.sleep(self.backoff(attempt))
+            if not breaker.allow_request():
+                stats["rejected"] += 1
+                logger.debug(f"Circuit open for {api}, skipping request")
+                return None
+
+            try:
+                # Inside the try: a half-open probe may be cancelled while it waits for a token
+                await self.buckets[api].acquire()
+                stats["requests"] += 1
+                result = await asyncio.wait_for(func(*args), timeout=self.deadline)
+            except asyncio.TimeoutError:
+                error = f"no response within {self.deadline}s"
+            except Exception as e:
+                error = str(e) or type(e).__name__
+            except BaseException:
+                # Cancelled: no verdict on the upstream, so free the probe slot
+                breaker.release_probe()
+                raise
+            else:
+                stats["successes"] += 1
+                breaker.record_success()
+                return result
+
+            stats["failures"] += 1
+            breaker.record_failure(error)
+            if breaker.state == CircuitBreaker.OPEN:
+                logger.warning(f"Circuit opened for {api} after {breaker.failures} failures: {error}")
+
+        return None
+
+    async def map(self, api: str, func: Callable[..., Awaitable[Any]], items: Sequence[Tuple]) -> List[Any]:
+        """
+        Call an upstream once per argument tuple using the worker pool.
+
+        Args:
+            api: Upstream name
+            func: Coroutine function making the request
+            items: Argument tuples, one per call
+
+        Returns:
+            Results in item order (None where a call failed)
+        """
+        return await run_workers(lambda *args: self.call(api, func, *args), items, self.workers)
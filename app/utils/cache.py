@@ -1,16 +1,19 @@
 """
-In-memory caching utility for API responses (100% FREE - no Redis needed!)
+Caching utility for API responses (100% FREE - no Redis needed!)
 
-This module provides a simple, production-ready caching solution using Python's
-cachetools library. Perfect for single-server deployments where you want fast
-caching without the overhead of running Redis or Memcached.
+Results are kept in a per-worker in-memory LRU (L1). Optionally a shared L2
+(a SQLite file on the host, or any Redis-protocol server) lets every uvicorn
+worker reuse results computed by the others; see app.utils.cache_backends.
 
 Features:
-- TTL (Time To Live) support per cache entry
-- Automatic eviction of old entries
-- Thread-safe with async support
-- Cache invalidation patterns
-- Performance monitoring
+- TTL (Time To Live) support per cache entry, expired eagerly
+- Memory budget in bytes as well as items
+- Per-prefix maxsize and TTL overrides from settings
+- Single-flight: concurrent misses for one key share a single computation
+- Optional stale-while-revalidate (serve expired entries while refreshing)
+- Optional shared L2 tier across workers
+- Cache invalidation patterns, and tags invalidated when the data changes
+- Per-prefix performance monitoring
 
 Usage:
     from app.utils.cache import cached
@@ -20,106 +23,318 @@ Usage:
         # Expensive database operation
         return data  # Cached for 10 minutes
 """
-import json
 import hashlib
+import inspect
 import time
 import logging
-from typing import Optional, Any, Callable
+from datetime import date, time as dt_time
+from decimal import Decimal
+from enum import Enum
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Sequence, Tuple
 from functools import wraps
-from cachetools import TTLCache
+from uuid import UUID
 import asyncio
 
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.utils.cache_backends import (
+    CacheEntry, MemoryBackend, SQLiteBackend, RedisBackend, TieredCache
+)
+
 logger = logging.getLogger(__name__)
 
-# In-memory cache (singleton) - stores data in application memory
-_cache_store: Optional[TTLCache] = None
-_cache_lock = asyncio.Lock()
+# Process-wide cache (singleton), built from settings on first use
+_cache_store: Optional[TieredCache] = None
+
+# Background L2 invalidations started from synchronous callers
+_pending_tasks: set = set()
 
-# Cache statistics
-_cache_stats = {
-    "hits": 0,
-    "misses": 0,
-    "evictions": 0
-}
+# In-flight computations per cache key (single-flight)
+_inflight: Dict[str, asyncio.Task] = {}
 
+# Cache key derivation cost per prefix: [computations, seconds]
+_key_timings: Dict[str, List[float]] = {}
 
-def get_cache() -> TTLCache:
+
+def build_cache() -> TieredCache:
     """
-    Get in-memory cache instance (lazy initialization)
+    Build the cache tiers described by settings
 
     Returns:
-        TTLCache: Shared cache instance with 1000 item capacity
+        TieredCache: L1 memory cache plus the configured L2 (if any)
+    """
+    l1 = MemoryBackend(
+        settings.CACHE_L1_MAXSIZE,
+        settings.CACHE_PREFIX_MAXSIZE,
+        max_bytes=settings.CACHE_L1_MAX_BYTES,
+        prefix_max_bytes=settings.CACHE_PREFIX_MAX_BYTES
+    )
+
+    l2 = None
+    try:
+        if settings.CACHE_L2_BACKEND == "sqlite":
+            l2 = SQLiteBackend(settings.CACHE_SQLITE_PATH)
+        elif settings.CACHE_L2_BACKEND == "redis":
+            l2 = RedisBackend(settings.CACHE_REDIS_URL)
+        elif settings.CACHE_L2_BACKEND:
+            logger.warning(f"Unknown CACHE_L2_BACKEND '{settings.CACHE_L2_BACKEND}', using memory only")
+    except Exception as e:
+        # A missing L2 must never take the API down; fall back to L1 only
+        logger.warning(f"Could not initialise {settings.CACHE_L2_BACKEND} cache backend: {e}")
+        l2 = None
+
+    logger.info(
+        f"Initialized cache: L1 memory (maxsize={settings.CACHE_L1_MAXSIZE} per prefix, "
+        f"budget={settings.CACHE_L1_MAX_BYTES} bytes), "
+        f"L2 {l2.name if l2 else 'none'}"
+    )
+    return TieredCache(
+        l1, l2,
+        l1_max_ttl=settings.CACHE_L1_MAX_TTL,
+        invalidation_poll=settings.CACHE_INVALIDATION_POLL_SECONDS
+    )
+
+
+def get_cache() -> TieredCache:
+    """
+    Get the cache instance (lazy initialization)
+
+    Returns:
+        TieredCache: Shared cache instance
     """
     global _cache_store
     if _cache_store is None:
-        # Create cache with max 1000 items
-        # TTL is managed per-item in the decorator
-        _cache_store = TTLCache(maxsize=1000, ttl=3600)
-        logger.info("Initialized in-memory cache with maxsize=1000")
+        _cache_store = build_cache()
     return _cache_store
 
 
+def configure_cache(cache: Optional[TieredCache]) -> None:
+    """
+    Replace the cache instance (None rebuilds it from settings on next use)
+
+    Key timing statistics start over with the new instance.
+
+    Args:
+        cache: Cache to use from now on
+    """
+    global _cache_store
+    _cache_store = cache
+    _key_timings.clear()
+
+
+async def close_cache() -> None:
+    """Close L2 connections (called on application shutdown)"""
+    if _cache_store is not None:
+        await _cache_store.close()
+
+
+def _key_material(value: Any) -> str:
+    """
+    Canonical string for one key argument
+
+    Raises:
+        TypeError: For objects without a canonical form (sessions, matrices, ...)
+    """
+    if isinstance(value, BaseModel):
+        # Serialized by pydantic-core in declaration order, so it is canonical
+        return f"{type(value).__qualname__}{value.model_dump_json()}"
+    # Before str/int: their repr names the member, so str- and int-valued enums stay distinct
+    if isinstance(value, (Enum, date, dt_time, UUID, Decimal)):
+        return repr(value)
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(map(_key_material, value)) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(map(_key_material, value))) + "}"
+    if isinstance(value, dict):
+        items = sorted(value.items(), key=lambda item: str(item[0]))
+        return "{" + ",".join(f"{k!r}:{_key_material(v)}" for k, v in items) + "}"
+    raise TypeError(
+        f"Cannot derive a cache key from {type(value).__name__}; "
+        f"pass key= or key_fields= to @cached to choose the identifying arguments"
+    )
+
+
 def cache_key(*args, **kwargs) -> str:
     """
     Generate a unique cache key from function arguments
 
+    Pydantic models are hashed from their JSON dump; dates, enums, UUIDs
+    and decimals from their repr. Any other object raises TypeError rather
+    than being left out, which would let different calls share a key.
+
     Args:
-        *args: Positional arguments
+        *args: Positional arguments (without self/cls)
         **kwargs: Keyword arguments
 
     Returns:
-        str: MD5 hash of arguments
+        str: BLAKE2b hash of the arguments
+
+    Raises:
+        TypeError: If an argument has no canonical form
     """
-    # Filter out self/cls from args for class methods
-    filtered_args = []
-    for arg in args:
-        # Skip service/repository instances (self, cls)
-        if hasattr(arg, '__class__'):
-            class_name = arg.__class__.__name__
-            # Skip class instances like RecommendationService, DatabasePlantRepository, etc.
-            if 'Service' in class_name or 'Repository' in class_name:
-                continue
-
-        # Handle Pydantic models (convert to dict for proper serialization)
-        if hasattr(arg, 'dict') and callable(arg.dict):
-            try:
-                filtered_args.append(arg.dict())
-                continue
-            except Exception:
-                pass
-
-        # Handle Pydantic v2 models (model_dump instead of dict)
-        if hasattr(arg, 'model_dump') and callable(arg.model_dump):
-            try:
-                filtered_args.append(arg.model_dump())
-                continue
-            except Exception:
-                pass
-
-        # Include primitive types and collections
-        if isinstance(arg, (str, int, float, bool, list, dict, tuple, type(None))):
-            filtered_args.append(arg)
-
-    # Create a deterministic string representation
-    try:
-        key_data = json.dumps({
-            "args": filtered_args,
-            "kwargs": kwargs
-        }, sort_keys=True, default=str)
-    except Exception:
-        # Fallback for non-serializable objects
-        key_data = f"{filtered_args}:{kwargs}"
+    parts = list(map(_key_material, args))
+    parts.extend(f"{name}={_key_material(kwargs[name])}" for name in sorted(kwargs))
+
+    return hashlib.blake2b("|".join(parts).encode(), digest_size=16).hexdigest()
+
+
+def _record_key_time(prefix: str, seconds: float) -> None:
+    timing = _key_timings.get(prefix)
+    if timing is None:
+        timing = _key_timings[prefix] = [0, 0.0]
+    timing[0] += 1
+    timing[1] += seconds
+
+
+def _key_time_stats(count: int, seconds: float) -> dict:
+    return {
+        "key_computations": count,
+        "key_time_ms": seconds * 1000,
+        "key_time_avg_us": seconds / count * 1e6 if count else 0
+    }
+
+
+def _tag_builder(func: Callable, tags: Optional[Sequence[str]]) -> Callable[[tuple, dict], Tuple[str, ...]]:
+    """
+    Build the function rendering a call's cache tags
+
+    Args:
+        func: Decorated function
+        tags: Tag templates formatted with the call's arguments, e.g. "suburb:{request.suburb}"
+
+    Returns:
+        Callable taking (args, kwargs) and returning the lower-cased tags
+    """
+    static = tuple(tag.lower() for tag in tags or () if "{" not in tag)
+    templates = [tag for tag in tags or () if "{" in tag]
+    if not templates:
+        return lambda args, kwargs: static
+
+    signature = inspect.signature(func)
 
-    return hashlib.md5(key_data.encode()).hexdigest()
+    def build(args: tuple, kwargs: dict) -> Tuple[str, ...]:
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return static + tuple(template.format(**bound.arguments).lower() for template in templates)
+    return build
 
 
-def cached(ttl: int = 300, prefix: str = ""):
+def _key_builder(
+    func: Callable,
+    key: Optional[Callable[..., Any]],
+    key_fields: Optional[Sequence[str]]
+) -> Callable[[tuple, dict], str]:
     """
-    Decorator for caching async function results in memory
+    Build the function deriving a cache key hash from a call's arguments
 
     Args:
-        ttl: Time to live in seconds (default 5 minutes)
+        func: Decorated function
+        key: Optional callable returning the key material from the arguments
+        key_fields: Optional parameter names (dotted for attributes) forming the key
+
+    Returns:
+        Callable taking (args, kwargs) and returning the key hash
+    """
+    signature = inspect.signature(func)
+    parameters = list(signature.parameters)
+    # Methods: the instance is never part of the key
+    skip_first = bool(parameters) and parameters[0] in ("self", "cls")
+
+    if key is not None:
+        def build(args: tuple, kwargs: dict) -> str:
+            return cache_key(key(*(args[1:] if skip_first else args), **kwargs))
+        return build
+
+    if key_fields is not None:
+        fields = [field.split(".") for field in key_fields]
+        unknown = [path[0] for path in fields if path[0] not in signature.parameters]
+        if unknown:
+            raise ValueError(f"key_fields {unknown} are not parameters of {func.__name__}")
+
+        def build(args: tuple, kwargs: dict) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            values = []
+            for path in fields:
+                value = bound.arguments[path[0]]
+                for attribute in path[1:]:
+                    value = getattr(value, attribute)
+                values.append(value)
+            return cache_key(*values)
+        return build
+
+    def build(args: tuple, kwargs: dict) -> str:
+        return cache_key(*(args[1:] if skip_first else args), **kwargs)
+    return build
+
+
+def _compute_done(key: str, task: asyncio.Task) -> None:
+    if _inflight.get(key) is task:
+        del _inflight[key]
+    # Retrieve the exception so refreshes nobody awaited don't warn at exit
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Cache computation failed for {key}: {task.exception()}")
+
+
+def _start_compute(key: str, compute: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+    """
+    Start computing a key unless a computation is already in flight
+
+    The computation runs as its own task so a caller being cancelled (e.g. a
+    client disconnecting) does not cancel it for the other waiters.
+
+    Args:
+        key: Cache key being computed
+        compute: Coroutine function producing (and storing) the value
+
+    Returns:
+        asyncio.Task: The in-flight computation for this key
+    """
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(compute())
+        _inflight[key] = task
+        task.add_done_callback(lambda t, key=key: _compute_done(key, t))
+    return task
+
+
+def cached(
+    ttl: int = 300,
+    prefix: str = "",
+    stale_ttl: int = 0,
+    key: Optional[Callable[..., Any]] = None,
+    key_fields: Optional[Sequence[str]] = None,
+    tags: Optional[Sequence[str]] = None
+):
+    """
+    Decorator for caching async function results
+
+    Concurrent misses for the same key are coalesced: the first caller
+    computes and the others await the same result. With ``stale_ttl`` an
+    expired entry is still served for that many seconds while a single
+    background task refreshes it.
+
+    The computation runs in its own task with the first caller's arguments
+    and can outlive that caller's request, so the wrapped function must not
+    use request-scoped state such as the request's database session. Open a
+    session inside the function instead (see RecommendationService).
+
+    Args:
+        ttl: Time to live in seconds (default 5 minutes); settings.CACHE_PREFIX_TTL
+             overrides it per prefix
         prefix: Cache key prefix for organization
+        stale_ttl: Seconds an expired entry may be served while it is refreshed
+                   (default 0, disabled); settings.CACHE_PREFIX_STALE_TTL
+                   overrides it per prefix
+        key: Optional callable taking the function's arguments (without self)
+             and returning the values that identify the result
+        key_fields: Optional parameter names forming the key, with dotted
+                    attribute access (e.g. ["request.suburb", "month"])
+        tags: Optional data dependencies, formatted with the arguments
+              (e.g. ["plant:*", "suburb:{request.suburb}"]); see invalidate_tags
 
     Returns:
         Decorated function with caching support
@@ -130,57 +345,63 @@ def cached(ttl: int = 300, prefix: str = ""):
             # Expensive operation
             return data  # Cached for 10 minutes
 
+        @cached(ttl=600, prefix="plants", key_fields=["plant_id"])
+        async def get_plant(self, plant_id: int, session: AsyncSession):
+            ...
+
     Notes:
-        - Cache is cleared on application restart (expected behavior)
-        - Works best for single-server deployments
-        - For multi-server, each server has its own cache (still beneficial)
+        - L1 is cleared on application restart (expected behavior)
+        - With an L2 configured, workers share results (and survive restarts)
+        - Results of None are not cached
+        - Exceptions reach every coalesced caller and are not cached
     """
     def decorator(func: Callable):
+        build_key = _key_builder(func, key, key_fields)
+        build_tags = _tag_builder(func, tags)
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
-            global _cache_stats
-
             # Generate cache key
-            key = f"{prefix}:{func.__name__}:{cache_key(*args, **kwargs)}"
+            started = time.perf_counter()
+            cache_id = f"{prefix}:{func.__name__}:{build_key(args, kwargs)}"
+            _record_key_time(prefix, time.perf_counter() - started)
+            cache = get_cache()
+
+            async def compute():
+                result = await func(*args, **kwargs)
+
+                if result is not None:
+                    entry_ttl = settings.CACHE_PREFIX_TTL.get(prefix, ttl)
+                    entry_stale_ttl = settings.CACHE_PREFIX_STALE_TTL.get(prefix, stale_ttl)
+                    now = time.time()
+                    stale_until = now + entry_ttl + entry_stale_ttl if entry_stale_ttl else None
+                    try:
+                        entry_tags = build_tags(args, kwargs)
+                        await cache.set(cache_id, CacheEntry(result, now + entry_ttl, stale_until, entry_tags))
+                        logger.debug(f"Cached result for {entry_ttl}s: {cache_id}")
+                    except Exception as e:
+                        # Cache full or other error - not critical
+                        logger.warning(f"Failed to cache result: {e}")
+
+                return result
 
             # Try to get from cache
-            cache = get_cache()
-            cached_result = None
-            is_valid = False
-
-            async with _cache_lock:
-                if key in cache:
-                    cached_result, cached_time = cache[key]
-                    # Check if still valid
-                    if time.time() - cached_time < ttl:
-                        is_valid = True
-                        _cache_stats["hits"] += 1
-                    else:
-                        # Expired, remove it
-                        del cache[key]
-                        _cache_stats["evictions"] += 1
-                        logger.debug(f"Cache evicted (expired): {key}")
-
-            if is_valid and cached_result is not None:
-                logger.debug(f"Cache hit: {key}")
-                return cached_result
-
-            # Cache miss - call function
-            _cache_stats["misses"] += 1
-            logger.debug(f"Cache miss: {key}")
-
-            result = await func(*args, **kwargs)
-
-            # Store in cache with timestamp
-            async with _cache_lock:
-                try:
-                    cache[key] = (result, time.time())
-                    logger.debug(f"Cached result for {ttl}s: {key}")
-                except Exception as e:
-                    # Cache full or other error - not critical
-                    logger.warning(f"Failed to cache result: {e}")
-
-            return result
+            entry = await cache.get(cache_id)
+            if entry is not None and entry.value is not None:
+                if entry.is_stale():
+                    # Serve the stale value; one background task refreshes it
+                    logger.debug(f"Serving stale entry: {cache_id}")
+                    cache.record(cache_id, "stale_hits")
+                    _start_compute(cache_id, compute)
+                else:
+                    logger.debug(f"Cache hit: {cache_id}")
+                return entry.value
+
+            # Cache miss - compute once, however many callers are waiting
+            logger.debug(f"Cache miss: {cache_id}")
+            if cache_id in _inflight:
+                cache.record(cache_id, "coalesced")
+            return await asyncio.shield(_start_compute(cache_id, compute))
 
         # Add cache invalidation method to the function
         wrapper.invalidate_cache = lambda: invalidate_cache(f"{prefix}:{func.__name__}:*")
@@ -192,10 +413,35 @@ def cached(ttl: int = 300, prefix: str = ""):
     return decorator
 
 
+def _run_in_background(coro) -> None:
+    """Run a coroutine from synchronous code: as a task if a loop is running, else to completion"""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(coro)
+        return
+    task = loop.create_task(coro)
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+
+
+async def _invalidate_l2(cache: TieredCache, prefix: Optional[str]) -> None:
+    try:
+        if prefix is None:
+            await cache.l2.clear()
+        else:
+            await cache.l2.delete_prefix(prefix)
+    except Exception as e:
+        logger.warning(f"L2 cache invalidation failed: {e}")
+
+
 def invalidate_cache(pattern: str = None):
     """
     Invalidate cache entries matching pattern
 
+    L1 entries are removed immediately; a shared L2 is invalidated in the
+    background when called from a running event loop.
+
     Args:
         pattern: Pattern to match (e.g., "plants:*" for all plant cache)
                  None to clear entire cache
@@ -208,22 +454,43 @@ def invalidate_cache(pattern: str = None):
         invalidate_cache()
     """
     cache = get_cache()
+    prefix = pattern.replace("*", "") if pattern is not None else None
 
-    if pattern is None:
+    if prefix is None:
         # Clear entire cache
-        cache.clear()
+        cache.l1.clear_nowait()
         logger.info("Cleared entire cache")
-        return
+    else:
+        # Remove keys matching pattern
+        removed = cache.l1.delete_prefix_nowait(prefix)
+        if removed:
+            logger.info(f"Invalidated {removed} cache entries matching: {pattern}")
 
-    # Remove keys matching pattern
-    prefix = pattern.replace("*", "")
-    keys_to_delete = [k for k in list(cache.keys()) if k.startswith(prefix)]
+    if cache.l2 is not None:
+        _run_in_background(_invalidate_l2(cache, prefix))
 
-    for key in keys_to_delete:
-        cache.pop(key, None)
 
-    if keys_to_delete:
-        logger.info(f"Invalidated {len(keys_to_delete)} cache entries matching: {pattern}")
+async def invalidate_tags(*tags: str) -> int:
+    """
+    Invalidate every cache entry depending on the given data
+
+    Called by repositories and loaders after writes. Only entries carrying
+    the tags are touched; with a shared L2 the other workers drop their L1
+    copies on their next cache read.
+
+    Args:
+        *tags: Changed data, e.g. "suburb:Richmond", "plant:12" or "plant:*"
+
+    Returns:
+        int: Number of entries removed
+
+    Example:
+        await invalidate_tags(f"suburb:{suburb.name}")
+    """
+    removed = await get_cache().delete_tags(tags)
+    if removed:
+        logger.info(f"Invalidated {removed} cache entries tagged {', '.join(tags)}")
+    return removed
 
 
 def get_cache_stats() -> dict:
@@ -231,37 +498,56 @@ def get_cache_stats() -> dict:
     Get cache performance statistics
 
     Returns:
-        dict: Statistics including hits, misses, size, hit rate
+        dict: Statistics including hits, misses, size, hit rate, plus
+              per-prefix counters and the state of each tier
 
     Example:
         stats = get_cache_stats()
         print(f"Hit rate: {stats['hit_rate']:.2%}")
     """
-    global _cache_stats
     cache = get_cache()
+    tier_stats = cache.stats()
+    totals = tier_stats["totals"]
 
-    total_requests = _cache_stats["hits"] + _cache_stats["misses"]
-    hit_rate = _cache_stats["hits"] / total_requests if total_requests > 0 else 0
+    prefixes = tier_stats["prefixes"]
+    for prefix, (count, seconds) in _key_timings.items():
+        prefixes.setdefault(prefix, {}).update(_key_time_stats(count, seconds))
+    key_count = sum(timing[0] for timing in _key_timings.values())
+    key_seconds = sum(timing[1] for timing in _key_timings.values())
+
+    hits = totals["l1_hits"] + totals["l2_hits"]
+    total_requests = hits + totals["misses"]
+    hit_rate = hits / total_requests if total_requests > 0 else 0
 
     return {
-        "size": len(cache),
-        "max_size": cache.maxsize,
-        "hits": _cache_stats["hits"],
-        "misses": _cache_stats["misses"],
-        "evictions": _cache_stats["evictions"],
+        "size": len(cache.l1),
+        "max_size": cache.l1.default_maxsize,
+        "hits": hits,
+        "misses": totals["misses"],
+        "bytes": cache.l1.bytes,
+        "max_bytes": cache.l1.max_bytes,
+        "evictions": cache.l1.evictions,
+        "expirations": cache.l1.expirations,
         "hit_rate": hit_rate,
-        "total_requests": total_requests
+        "total_requests": total_requests,
+        "l1_hits": totals["l1_hits"],
+        "l2_hits": totals["l2_hits"],
+        "l2_errors": totals["l2_errors"],
+        "stale_hits": totals["stale_hits"],
+        "coalesced": totals["coalesced"],
+        "in_flight": len(_inflight),
+        **_key_time_stats(key_count, key_seconds),
+        "invalidations": tier_stats["invalidations"],
+        "prefixes": prefixes,
+        "l1": tier_stats["l1"],
+        "l2": tier_stats["l2"]
     }
 
 
 def reset_cache_stats():
     """Reset cache statistics (useful for testing)"""
-    global _cache_stats
-    _cache_stats = {
-        "hits": 0,
-        "misses": 0,
-        "evictions": 0
-    }
+    get_cache().reset_stats()
+    _key_timings.clear()
     logger.info("Reset cache statistics")
 
 
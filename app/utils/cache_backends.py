@@ -0,0 +1,772 @@
+"""
+Storage backends for the response cache in app.utils.cache
+
+The ``cached`` decorator talks to a ``TieredCache``: an in-process LRU (L1)
+checked first, plus an optional shared L2 that every uvicorn worker can read.
+An L2 hit is promoted into the worker's L1, so one worker's work warms all of
+them.
+
+L2 options (``settings.CACHE_L2_BACKEND``):
+- ``sqlite``: a WAL-mode SQLite file shared by the workers on one host
+- ``redis``: any Redis-protocol server (needs the optional ``redis`` package)
+
+Values written to an L2 are pickled, so only cache data the app itself produces.
+
+Entries can be tagged with the data they depend on (``plant:*``,
+``suburb:richmond``, ``plant:12``). Each tier indexes keys by tag, so
+invalidating a tag touches only the entries carrying it, and an L2 keeps a
+log of invalidated tags that the other workers replay against their L1.
+Invalidating ``ns:x`` also drops entries tagged ``ns:*`` (they depend on
+every ``ns`` item); invalidating ``ns:*`` drops every tag in ``ns``.
+"""
+import asyncio
+import logging
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.utils.expiring_cache import ExpiringLRUCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheEntry:
+    """A cached value and its absolute expiry times (epoch seconds).
+
+    ``expires_at`` ends the fresh period. With stale-while-revalidate,
+    ``stale_until`` keeps the entry in the backends a while longer so it can
+    be served while a refresh runs. ``size`` is the pickled size in bytes
+    when a tier already serialized the entry, so L1 doesn't pickle it again
+    just to measure it.
+    """
+    value: Any
+    expires_at: float
+    stale_until: Optional[float] = None
+    tags: Tuple[str, ...] = ()
+    size: Optional[int] = field(default=None, compare=False, repr=False)
+
+    @property
+    def evict_at(self) -> float:
+        """When backends may drop the entry."""
+        return max(self.expires_at, self.stale_until or 0)
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        """True once the entry can no longer be served at all."""
+        return (time.time() if now is None else now) >= self.evict_at
+
+    def is_stale(self, now: Optional[float] = None) -> bool:
+        """True once the fresh period is over."""
+        return (time.time() if now is None else now) >= self.expires_at
+
+
+def key_prefix(key: str) -> str:
+    """Prefix part of a ``"{prefix}:{function}:{hash}"`` cache key."""
+    return key.split(":", 1)[0]
+
+
+def matching_tags(tag: str, known: Iterable[str]) -> Set[str]:
+    """
+    Tags among ``known`` that an invalidation of ``tag`` covers
+
+    Args:
+        tag: Invalidated tag (``ns:x`` or ``ns:*``)
+        known: Tags currently in use
+
+    Returns:
+        Set of affected tags
+    """
+    namespace = tag.split(":", 1)[0] + ":"
+    if tag.endswith(":*"):
+        return {candidate for candidate in known if candidate.startswith(namespace)}
+    return {candidate for candidate in (tag, namespace + "*") if candidate in known}
+
+
+def _tag_conditions(tags: Iterable[str]) -> Tuple[str, list]:
+    """SQL condition on a ``tag`` column matching the invalidation of tags."""
+    clauses, params = [], []
+    for tag in tags:
+        namespace = tag.split(":", 1)[0] + ":"
+        if tag.endswith(":*"):
+            clauses.append("(tag >= ? AND tag < ?)")
+            params += [namespace, namespace + "\U0010ffff"]
+        else:
+            clauses.append("tag IN (?, ?)")
+            params += [tag, namespace + "*"]
+    return " OR ".join(clauses) or "0", params
+
+
+class CacheBackend:
+    """Interface implemented by every cache tier."""
+
+    name = "base"
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the live entry for key, or None."""
+        raise NotImplementedError
+
+    async def set(self, key: str, entry: CacheEntry, blob: Optional[bytes] = None) -> None:
+        """Store an entry, replacing any existing one (blob: the entry already pickled)."""
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> bool:
+        """Remove one key. Returns True if it existed."""
+        raise NotImplementedError
+
+    async def delete_prefix(self, prefix: str) -> int:
+        """Remove every key starting with prefix. Returns the number removed."""
+        raise NotImplementedError
+
+    async def clear(self) -> None:
+        """Remove every entry."""
+        raise NotImplementedError
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        """Remove every entry carrying one of the tags. Returns the number removed."""
+        return 0
+
+    async def publish_invalidation(self, tags: Iterable[str]) -> List[int]:
+        """Record invalidated tags for other workers. Returns the log ids written."""
+        return []
+
+    async def invalidations_since(self, cursor: Optional[int]) -> Tuple[List[Tuple[int, str]], Optional[int]]:
+        """
+        Tags invalidated after cursor
+
+        Args:
+            cursor: Last log id seen; None to start from the current end of the log
+
+        Returns:
+            Tuple of ([(log id, tag)], new cursor)
+        """
+        return [], cursor
+
+    async def close(self) -> None:
+        """Release connections held by the backend."""
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name}
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process LRU with one segment per key prefix.
+
+    Each prefix gets its own ExpiringLRUCache with its own maxsize and byte
+    budget, so a burst of recommendation keys cannot push the static plant
+    data out of memory. An overall byte budget is enforced on top by
+    evicting from whichever segment is largest.
+    """
+
+    name = "memory"
+
+    def __init__(
+        self,
+        default_maxsize: int = 1000,
+        prefix_maxsize: Optional[Dict[str, int]] = None,
+        max_bytes: Optional[int] = None,
+        prefix_max_bytes: Optional[Dict[str, int]] = None
+    ):
+        self.default_maxsize = default_maxsize
+        self.prefix_maxsize = dict(prefix_maxsize or {})
+        self.max_bytes = max_bytes or None
+        self.prefix_max_bytes = dict(prefix_max_bytes or {})
+        self._segments: Dict[str, ExpiringLRUCache] = {}
+        # tag -> keys; keys evicted or expired since are pruned periodically
+        self._tags: Dict[str, Set[str]] = {}
+        self._tagged_writes = 0
+
+    def maxsize_for(self, prefix: str) -> int:
+        return self.prefix_maxsize.get(prefix, self.default_maxsize)
+
+    def _segment(self, prefix: str) -> ExpiringLRUCache:
+        segment = self._segments.get(prefix)
+        if segment is None:
+            segment = self._segments[prefix] = ExpiringLRUCache(
+                self.maxsize_for(prefix),
+                self.prefix_max_bytes.get(prefix, self.max_bytes)
+            )
+        return segment
+
+    def __len__(self) -> int:
+        return sum(len(segment) for segment in self._segments.values())
+
+    @property
+    def bytes(self) -> int:
+        return sum(segment.bytes for segment in self._segments.values())
+
+    @property
+    def evictions(self) -> int:
+        return sum(segment.evictions for segment in self._segments.values())
+
+    @property
+    def expirations(self) -> int:
+        return sum(segment.expirations for segment in self._segments.values())
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return self._segment(key_prefix(key)).get(key)
+
+    # Drop index references to evicted/expired keys every this many tagged writes
+    PRUNE_TAGS_EVERY = 1024
+
+    async def set(self, key: str, entry: CacheEntry, blob: Optional[bytes] = None) -> None:
+        size = len(blob) if blob is not None else entry.size
+        self._segment(key_prefix(key)).set(key, entry, entry.evict_at, size=size)
+
+        if entry.tags:
+            for tag in entry.tags:
+                self._tags.setdefault(tag, set()).add(key)
+            self._tagged_writes += 1
+            if self._tagged_writes % self.PRUNE_TAGS_EVERY == 0:
+                self._prune_tags()
+
+        if self.max_bytes is not None:
+            total = self.bytes
+            while total > self.max_bytes:
+                largest = max(self._segments.values(), key=lambda segment: segment.bytes)
+                before = largest.bytes
+                if not largest.evict_lru():
+                    break
+                total -= before - largest.bytes
+
+    async def delete(self, key: str) -> bool:
+        segment = self._segments.get(key_prefix(key))
+        return segment is not None and segment.pop(key)
+
+    async def delete_prefix(self, prefix: str) -> int:
+        return self.delete_prefix_nowait(prefix)
+
+    def delete_prefix_nowait(self, prefix: str) -> int:
+        """Synchronous delete_prefix (the memory tier never blocks)."""
+        removed = 0
+        for name, segment in self._segments.items():
+            # Only scan segments the prefix can match
+            if not (name.startswith(prefix) or prefix.startswith(name + ":")):
+                continue
+            removed += segment.delete_prefix(prefix)
+        return removed
+
+    async def clear(self) -> None:
+        self.clear_nowait()
+
+    def clear_nowait(self) -> None:
+        for segment in self._segments.values():
+            segment.clear()
+        self._tags.clear()
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        return self.delete_tags_nowait(tags)
+
+    def delete_tags_nowait(self, tags: Iterable[str]) -> int:
+        """Synchronous delete_tags: only the keys indexed under the tags are touched."""
+        affected = set()
+        for tag in tags:
+            affected |= matching_tags(tag, self._tags)
+
+        removed = 0
+        for tag in affected:
+            for key in self._tags.pop(tag, ()):
+                segment = self._segments.get(key_prefix(key))
+                if segment is not None and segment.pop(key):
+                    removed += 1
+        return removed
+
+    def _prune_tags(self) -> None:
+        for tag in list(self._tags):
+            keys = {key for key in self._tags[tag] if key in self._segment(key_prefix(key))}
+            if keys:
+                self._tags[tag] = keys
+            else:
+                del self._tags[tag]
+
+    def expire(self) -> int:
+        """Drop expired entries from every segment. Returns the number removed."""
+        return sum(segment.expire() for segment in self._segments.values())
+
+    def reset_stats(self) -> None:
+        for segment in self._segments.values():
+            segment.reset_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "size": len(self),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "tags": len(self._tags),
+            "segments": {name: segment.stats() for name, segment in self._segments.items()}
+        }
+
+
+class SQLiteBackend(CacheBackend):
+    """Cache table in a local SQLite file, shared by all workers on a host.
+
+    WAL mode lets readers in other processes proceed while one process writes.
+    Queries run in a worker thread so the event loop never blocks on disk.
+    """
+
+    name = "sqlite"
+
+    # Purge expired rows every this many writes
+    PURGE_EVERY = 256
+
+    # Invalidation log rows are kept this long (seconds) for lagging workers
+    INVALIDATION_LOG_RETENTION = 3600
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires ON cache_entries (expires_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_tags ("
+            "tag TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (tag, key)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_tags_key ON cache_tags (key)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_invalidations ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._writes = 0
+
+    def _execute(self, sql: str, params: tuple = ()) -> Tuple[list, int]:
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            return cursor.fetchall(), cursor.rowcount
+
+    async def _run(self, sql: str, params: tuple = ()) -> Tuple[list, int]:
+        return await asyncio.to_thread(self._execute, sql, params)
+
+    def _execute_transaction(self, statements: List[Tuple[str, tuple]]) -> List[Tuple[list, int]]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                results = []
+                for sql, params in statements:
+                    cursor = self._conn.execute(sql, params)
+                    results.append((cursor.fetchall(), cursor.rowcount))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return results
+
+    async def _run_transaction(self, statements: List[Tuple[str, tuple]]) -> List[Tuple[list, int]]:
+        return await asyncio.to_thread(self._execute_transaction, statements)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        rows, _ = await self._run("SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,))
+        if not rows:
+            return None
+        value, evict_at = rows[0]
+        if evict_at <= time.time():
+            return None
+        entry = pickle.loads(value)
+        entry.size = len(value)
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry, blob: Optional[bytes] = None) -> None:
+        if blob is None:
+            blob = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        upsert = (
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, blob, entry.evict_at)
+        )
+        if entry.tags:
+            await self._run_transaction([upsert, ("DELETE FROM cache_tags WHERE key = ?", (key,))] + [
+                ("INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)", (tag, key))
+                for tag in entry.tags
+            ])
+        else:
+            await self._run(*upsert)
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            now = time.time()
+            await self._run_transaction([
+                ("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)),
+                ("DELETE FROM cache_tags WHERE key NOT IN (SELECT key FROM cache_entries)", ()),
+                ("DELETE FROM cache_invalidations WHERE created_at < ?", (now - self.INVALIDATION_LOG_RETENTION,))
+            ])
+
+    async def delete(self, key: str) -> bool:
+        _, removed = await self._run("DELETE FROM cache_entries WHERE key = ?", (key,))
+        return removed > 0
+
+    async def delete_prefix(self, prefix: str) -> int:
+        if not prefix:
+            _, removed = await self._run("DELETE FROM cache_entries")
+        else:
+            # Key range scan on the primary key instead of a LIKE over every row
+            _, removed = await self._run(
+                "DELETE FROM cache_entries WHERE key >= ? AND key < ?",
+                (prefix, prefix + "\U0010ffff")
+            )
+        return removed
+
+    async def clear(self) -> None:
+        await self._run_transaction([("DELETE FROM cache_entries", ()), ("DELETE FROM cache_tags", ())])
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        condition, params = _tag_conditions(tags)
+        (_, removed), _ = await self._run_transaction([
+            (f"DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE {condition})", tuple(params)),
+            (f"DELETE FROM cache_tags WHERE {condition}", tuple(params))
+        ])
+        return removed
+
+    async def publish_invalidation(self, tags: Iterable[str]) -> List[int]:
+        tags = list(tags)
+        now = time.time()
+        # The write lock is held for the whole transaction, so the newest ids are ours
+        results = await self._run_transaction([
+            ("INSERT INTO cache_invalidations (tag, created_at) VALUES (?, ?)", (tag, now))
+            for tag in tags
+        ] + [("SELECT id FROM cache_invalidations ORDER BY id DESC LIMIT ?", (len(tags),))])
+        return [row[0] for row in results[-1][0]]
+
+    async def invalidations_since(self, cursor: Optional[int]) -> Tuple[List[Tuple[int, str]], Optional[int]]:
+        if cursor is None:
+            rows, _ = await self._run("SELECT COALESCE(MAX(id), 0) FROM cache_invalidations")
+            return [], rows[0][0]
+        rows, _ = await self._run("SELECT id, tag FROM cache_invalidations WHERE id > ? ORDER BY id", (cursor,))
+        return [(row[0], row[1]) for row in rows], rows[-1][0] if rows else cursor
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "path": self.path}
+
+
+class RedisBackend(CacheBackend):
+    """Any Redis-protocol server (Redis, Valkey, KeyDB, Dragonfly...)."""
+
+    name = "redis"
+
+    # Tag sets outlive the longest cache TTL; stale members are harmless
+    TAG_SET_TTL = 2 * 86400
+
+    # Invalidation log entries kept for lagging workers
+    INVALIDATION_LOG_LENGTH = 1000
+
+    def __init__(self, url: str, namespace: str = "plantopia:cache:"):
+        try:
+            import redis.asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("CACHE_L2_BACKEND=redis requires the 'redis' package") from e
+        self.url = url
+        self.namespace = namespace
+        self._client = redis_asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        raw = await self._client.get(self.namespace + key)
+        if raw is None:
+            return None
+        entry = pickle.loads(raw)
+        entry.size = len(raw)
+        return None if entry.is_expired() else entry
+
+    async def set(self, key: str, entry: CacheEntry, blob: Optional[bytes] = None) -> None:
+        ttl_ms = int((entry.evict_at - time.time()) * 1000)
+        if ttl_ms <= 0:
+            return
+        if blob is None:
+            blob = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        if not entry.tags:
+            await self._client.set(self.namespace + key, blob, px=ttl_ms)
+            return
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.set(self.namespace + key, blob, px=ttl_ms)
+            for tag in entry.tags:
+                pipe.sadd(self._tag_key(tag), key)
+                pipe.expire(self._tag_key(tag), self.TAG_SET_TTL)
+            await pipe.execute()
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.namespace}tag:{tag}"
+
+    async def delete(self, key: str) -> bool:
+        return bool(await self._client.delete(self.namespace + key))
+
+    async def delete_prefix(self, prefix: str) -> int:
+        pattern = self.namespace + re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        removed = 0
+        batch = []
+        async for key in self._client.scan_iter(match=pattern, count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                removed += await self._client.delete(*batch)
+                batch = []
+        if batch:
+            removed += await self._client.delete(*batch)
+        return removed
+
+    async def clear(self) -> None:
+        await self.delete_prefix("")
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        tag_keys = set()
+        for tag in tags:
+            namespace = tag.split(":", 1)[0] + ":"
+            if tag.endswith(":*"):
+                pattern = self._tag_key(re.sub(r"([*?\[\]\\])", r"\\\1", namespace)) + "*"
+                async for tag_key in self._client.scan_iter(match=pattern, count=500):
+                    tag_keys.add(tag_key)
+            else:
+                tag_keys.update((self._tag_key(tag), self._tag_key(namespace + "*")))
+
+        removed = 0
+        for tag_key in tag_keys:
+            members = await self._client.smembers(tag_key)
+            if members:
+                removed += await self._client.delete(*(self.namespace + member.decode() for member in members))
+            await self._client.delete(tag_key)
+        return removed
+
+    async def publish_invalidation(self, tags: Iterable[str]) -> List[int]:
+        tags = list(tags)
+        log_key = self.namespace + "invalidations"
+        last_id = await self._client.incrby(self.namespace + "invalidations:seq", len(tags))
+        ids = list(range(last_id - len(tags) + 1, last_id + 1))
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.zadd(log_key, {f"{log_id}:{tag}": log_id for log_id, tag in zip(ids, tags)})
+            pipe.zremrangebyscore(log_key, "-inf", last_id - self.INVALIDATION_LOG_LENGTH)
+            await pipe.execute()
+        return ids
+
+    async def invalidations_since(self, cursor: Optional[int]) -> Tuple[List[Tuple[int, str]], Optional[int]]:
+        if cursor is None:
+            return [], int(await self._client.get(self.namespace + "invalidations:seq") or 0)
+        members = await self._client.zrangebyscore(self.namespace + "invalidations", f"({cursor}", "+inf")
+        events = []
+        for member in members:
+            log_id, tag = member.decode().split(":", 1)
+            events.append((int(log_id), tag))
+        return events, events[-1][0] if events else cursor
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.name, "url": self.url}
+
+
+class TieredCache(CacheBackend):
+    """L1 memory cache in front of an optional shared L2, with per-prefix metrics.
+
+    L2 failures are logged and counted but never fail the request: the cache
+    degrades to L1 only. Tag invalidations are published to the L2 log and
+    replayed from it (at most every ``invalidation_poll`` seconds) so every
+    worker drops its L1 copies.
+    """
+
+    name = "tiered"
+
+    COUNTERS = ("l1_hits", "l2_hits", "misses", "sets", "l2_errors", "stale_hits", "coalesced")
+
+    def __init__(
+        self,
+        l1: MemoryBackend,
+        l2: Optional[CacheBackend] = None,
+        l1_max_ttl: Optional[float] = None,
+        invalidation_poll: float = 1.0
+    ):
+        self.l1 = l1
+        self.l2 = l2
+        # With a shared L2, keep L1 copies short-lived so workers converge on
+        # writes and invalidations made elsewhere
+        self.l1_max_ttl = l1_max_ttl if l2 is not None else None
+        self.invalidation_poll = invalidation_poll
+        self._prefix_stats: Dict[str, Dict[str, int]] = {}
+        self._invalidation_stats = {"local_tags": 0, "remote_tags": 0, "keys": 0}
+        self._invalidation_cursor: Optional[int] = None
+        self._next_poll = 0.0
+        # Log ids this worker published (already applied locally)
+        self._published: Set[int] = set()
+
+    def record(self, key: str, counter: str) -> None:
+        """Increment a per-prefix counter (also used by the decorator)."""
+        stats = self._prefix_stats.get(key_prefix(key))
+        if stats is None:
+            stats = self._prefix_stats[key_prefix(key)] = dict.fromkeys(self.COUNTERS, 0)
+        stats[counter] += 1
+
+    def _l1_entry(self, entry: CacheEntry) -> CacheEntry:
+        if self.l1_max_ttl is None:
+            return entry
+        cap = time.time() + self.l1_max_ttl
+        if entry.evict_at <= cap:
+            return entry
+        return replace(
+            entry,
+            expires_at=min(entry.expires_at, cap),
+            stale_until=min(entry.stale_until, cap) if entry.stale_until else None
+        )
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        if self.l2 is not None:
+            await self.poll_invalidations()
+
+        entry = await self.l1.get(key)
+        if entry is not None:
+            self.record(key, "l1_hits")
+            return entry
+
+        if self.l2 is not None:
+            try:
+                entry = await self.l2.get(key)
+            except Exception as e:
+                self.record(key, "l2_errors")
+                logger.warning(f"L2 cache read failed for {key}: {e}")
+                entry = None
+            if entry is not None:
+                self.record(key, "l2_hits")
+                await self.l1.set(key, self._l1_entry(entry))
+                return entry
+
+        self.record(key, "misses")
+        return None
+
+    async def set(self, key: str, entry: CacheEntry, blob: Optional[bytes] = None) -> None:
+        self.record(key, "sets")
+        if self.l2 is None:
+            await self.l1.set(key, self._l1_entry(entry), blob)
+            return
+
+        # Pickle once: the L2 stores the bytes and L1 takes its size from them
+        try:
+            if blob is None:
+                blob = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            self.record(key, "l2_errors")
+            logger.warning(f"L2 cache write failed for {key}: {e}")
+            await self.l1.set(key, self._l1_entry(entry))
+            return
+
+        await self.l1.set(key, self._l1_entry(entry), blob)
+        try:
+            await self.l2.set(key, entry, blob)
+        except Exception as e:
+            self.record(key, "l2_errors")
+            logger.warning(f"L2 cache write failed for {key}: {e}")
+
+    async def delete(self, key: str) -> bool:
+        removed = await self.l1.delete(key)
+        if self.l2 is not None:
+            removed = await self.l2.delete(key) or removed
+        return removed
+
+    async def delete_prefix(self, prefix: str) -> int:
+        removed = await self.l1.delete_prefix(prefix)
+        if self.l2 is not None:
+            removed = max(removed, await self.l2.delete_prefix(prefix))
+        return removed
+
+    async def clear(self) -> None:
+        await self.l1.clear()
+        if self.l2 is not None:
+            await self.l2.clear()
+
+    async def delete_tags(self, tags: Iterable[str]) -> int:
+        """
+        Invalidate tags in every tier and tell the other workers
+
+        Args:
+            tags: Tags whose entries are stale
+
+        Returns:
+            int: Number of entries removed (the larger of the L1 and L2 counts)
+        """
+        tags = sorted({tag.lower() for tag in tags})
+        removed = self.l1.delete_tags_nowait(tags)
+        self._invalidation_stats["local_tags"] += len(tags)
+
+        if self.l2 is not None:
+            try:
+                removed = max(removed, await self.l2.delete_tags(tags))
+                self._published.update(await self.l2.publish_invalidation(tags))
+            except Exception as e:
+                self.record("invalidations", "l2_errors")
+                logger.warning(f"L2 cache invalidation failed for {tags}: {e}")
+
+        self._invalidation_stats["keys"] += removed
+        return removed
+
+    async def poll_invalidations(self, force: bool = False) -> int:
+        """
+        Apply tag invalidations published by other workers to L1
+
+        Args:
+            force: Poll even if the last poll was under invalidation_poll seconds ago
+
+        Returns:
+            int: Number of L1 entries removed
+        """
+        now = time.monotonic()
+        if self.l2 is None or (not force and now < self._next_poll):
+            return 0
+        self._next_poll = now + self.invalidation_poll
+
+        try:
+            events, self._invalidation_cursor = await self.l2.invalidations_since(self._invalidation_cursor)
+        except Exception as e:
+            self.record("invalidations", "l2_errors")
+            logger.warning(f"Reading cache invalidations failed: {e}")
+            return 0
+
+        tags = set()
+        for log_id, tag in events:
+            if log_id in self._published:
+                self._published.discard(log_id)
+            else:
+                tags.add(tag)
+        if not tags:
+            return 0
+
+        removed = self.l1.delete_tags_nowait(tags)
+        self._invalidation_stats["remote_tags"] += len(tags)
+        self._invalidation_stats["keys"] += removed
+        return removed
+
+    async def close(self) -> None:
+        if self.l2 is not None:
+            await self.l2.close()
+
+    def reset_stats(self) -> None:
+        self._prefix_stats.clear()
+        self._invalidation_stats = dict.fromkeys(self._invalidation_stats, 0)
+        self.l1.reset_stats()
+
+    def stats(self) -> Dict[str, Any]:
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        prefixes = {}
+        for prefix, counters in self._prefix_stats.items():
+            for counter, value in counters.items():
+                totals[counter] += value
+            lookups = counters["l1_hits"] + counters["l2_hits"] + counters["misses"]
+            prefixes[prefix] = dict(
+                counters,
+                hit_rate=(counters["l1_hits"] + counters["l2_hits"]) / lookups if lookups else 0
+            )
+
+        return {
+            "totals": totals,
+            "prefixes": prefixes,
+            "invalidations": dict(self._invalidation_stats),
+            "l1": self.l1.stats(),
+            "l2": self.l2.stats() if self.l2 is not None else None
+        }
@@ -0,0 +1,220 @@
+"""
+Expiring LRU cache with per-entry TTLs and byte accounting
+
+ExpiringLRUCache is the storage behind the in-memory cache tier. Every entry
+carries its own expiry time and a min-heap of expiry times lets lapsed
+entries be dropped as soon as the cache is touched, instead of lingering
+until LRU pressure pushes them out. Entries are also sized in bytes, so
+memory can be budgeted directly rather than guessed at as an item count.
+"""
+import heapq
+import itertools
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate the memory footprint of a cached value
+
+    Args:
+        value: Value to size
+
+    Returns:
+        int: Pickled size in bytes (shallow sys.getsizeof if it can't be pickled)
+    """
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class ExpiringLRUCache:
+    """LRU mapping with per-entry expiry, an item limit and a byte budget.
+
+    Counters (hits, misses, evictions, expirations, oversized) are exact:
+    evictions are only entries pushed out by the item or byte limits, and
+    expirations are only entries whose own TTL lapsed.
+    """
+
+    # Rebuild the expiry heap once superseded items outnumber live entries
+    HEAP_COMPACT_RATIO = 2
+
+    def __init__(
+        self,
+        maxsize: int = 1000,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = estimate_size,
+        clock: Callable[[], float] = time.time
+    ):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes or None
+        self.sizeof = sizeof
+        self.clock = clock
+
+        # key -> (value, expires_at, size, sequence number)
+        self._data: "OrderedDict[str, Tuple[Any, float, int, int]]" = OrderedDict()
+        # (expires_at, sequence number, key); items whose sequence number no
+        # longer matches _data were overwritten or removed and are skipped
+        self._heap: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.oversized = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._data))
+
+    def __contains__(self, key: str) -> bool:
+        return self.peek(key) is not None
+
+    def __getitem__(self, key: str) -> Any:
+        """Value for key without counting a hit or refreshing its recency."""
+        return self._data[key][0]
+
+    def peek(self, key: str) -> Optional[Any]:
+        """Live value for key without touching counters or recency."""
+        item = self._data.get(key)
+        if item is None or item[1] <= self.clock():
+            return None
+        return item[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a key, marking it most recently used
+
+        Args:
+            key: Key to look up
+
+        Returns:
+            The stored value, or None if absent or expired
+        """
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        if item[1] <= self.clock():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return item[0]
+
+    def set(self, key: str, value: Any, expires_at: float, size: Optional[int] = None) -> bool:
+        """
+        Store a value until an absolute expiry time
+
+        Args:
+            key: Key to store under
+            value: Value to store
+            expires_at: Epoch seconds after which the entry is dropped
+            size: Size in bytes; when omitted it is estimated with sizeof if
+                a byte budget is set, and not tracked (0) otherwise
+
+        Returns:
+            bool: False if the value alone exceeds the byte budget and was not stored
+        """
+        if size is None:
+            # Sizing may serialize the whole value, so only pay for it when a budget needs it
+            size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Storing it would flush everything else for a single entry
+            self.oversized += 1
+            return False
+
+        sequence = next(self._sequence)
+        self._data[key] = (value, expires_at, size, sequence)
+        self.bytes += size
+        heapq.heappush(self._heap, (expires_at, sequence, key))
+
+        self.expire()
+        while len(self._data) > self.maxsize or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            self.evict_lru()
+        return True
+
+    def pop(self, key: str) -> bool:
+        """Remove a key. Returns True if it was present."""
+        return self._remove(key)
+
+    def evict_lru(self) -> bool:
+        """Evict the least recently used entry. Returns False if empty."""
+        if not self._data:
+            return False
+        key = next(iter(self._data))
+        self._remove(key)
+        self.evictions += 1
+        return True
+
+    def expire(self) -> int:
+        """
+        Drop every entry whose expiry time has passed
+
+        Returns:
+            int: Number of entries removed
+        """
+        now = self.clock()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, sequence, key = heapq.heappop(self._heap)
+            item = self._data.get(key)
+            if item is not None and item[3] == sequence:
+                self._remove(key)
+                removed += 1
+        self.expirations += removed
+
+        if len(self._heap) > self.HEAP_COMPACT_RATIO * len(self._data) + 64:
+            self._heap = [(item[1], item[3], key) for key, item in self._data.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def delete_prefix(self, prefix: str) -> int:
+        """Remove every key starting with prefix. Returns the number removed."""
+        keys = [key for key in self._data if key.startswith(prefix)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        """Remove every entry (counters are kept)."""
+        self._data.clear()
+        self._heap.clear()
+        self.bytes = 0
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.evictions = self.expirations = self.oversized = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "oversized": self.oversized
+        }
+
+    def _remove(self, key: str) -> bool:
+        item = self._data.pop(key, None)
+        if item is None:
+            return False
+        self.bytes -= item[2]
+        return True
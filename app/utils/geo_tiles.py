@@ -0,0 +1,343 @@
+"""
+Per-zoom simplified GeoJSON tiles packed into one memory-mapped file
+
+``app.services.uhi_tiles.build_tile_pack`` simplifies the suburb boundaries for each
+zoom level (Douglas-Peucker with a one-pixel tolerance), cuts them into
+Web Mercator z/x/y tiles and writes every tile body, plus its gzip variant,
+into a single pack file. The API maps the pack and serves tiles as slices
+of it, so boundary tiles never sit on the Python heap.
+
+Pack layout:
+    MAGIC | 4-byte big-endian header length | JSON header | tile bodies
+
+The header holds pack metadata and, per tile, ``[etag, offset, length,
+gzip_offset, gzip_length]`` with offsets relative to the start of the
+bodies (gzip_length is 0 for bodies too small to compress).
+"""
+import gzip
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.utils.http_cache import MIN_COMPRESS_SIZE, EncodedBody
+
+MAGIC = b"PLTILES1"
+TILE_SIZE = 256
+
+Point = Sequence[float]
+TileKey = Tuple[int, int, int]
+
+
+def pixel_tolerance(zoom: int) -> float:
+    """Width of one tile pixel in degrees of longitude at a zoom level."""
+    return 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def simplify_line(points: Sequence[Point], tolerance: float) -> List[Point]:
+    """
+    Douglas-Peucker simplification of a polyline
+
+    Args:
+        points: Sequence of (lon, lat) points
+        tolerance: Maximum distance (degrees) a removed point may lie from the result
+
+    Returns:
+        List of retained points (first and last always kept)
+    """
+    if len(points) < 3 or tolerance <= 0:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        x1, y1 = points[first][0], points[first][1]
+        x2, y2 = points[last][0], points[last][1]
+        dx, dy = x2 - x1, y2 - y1
+        length = math.hypot(dx, dy)
+
+        max_distance, index = -1.0, first
+        for i in range(first + 1, last):
+            px, py = points[i][0], points[i][1]
+            if length == 0:
+                distance = math.hypot(px - x1, py - y1)
+            else:
+                distance = abs(dy * px - dx * py + x2 * y1 - y2 * x1) / length
+            if distance > max_distance:
+                max_distance, index = distance, i
+
+        if max_distance > tolerance:
+            keep[index] = True
+            stack.append((first, index))
+            stack.append((index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+def simplify_ring(ring: Sequence[Point], tolerance: float) -> Optional[List[Point]]:
+    """
+    Simplify a closed linear ring
+
+    Returns:
+        The simplified ring, or None if it collapses below a triangle
+    """
+    simplified = simplify_line(ring, tolerance)
+    if len(simplified) < 4:
+        return None
+    return simplified
+
+
+def simplify_geometry(geometry: Dict[str, Any], tolerance: float, precision: int) -> Optional[Dict[str, Any]]:
+    """
+    Simplify a Polygon or MultiPolygon and round its coordinates
+
+    Holes that collapse are dropped; a polygon whose outer ring collapses
+    keeps its original outline so no suburb disappears from the map.
+
+    Args:
+        geometry: GeoJSON geometry
+        tolerance: Douglas-Peucker tolerance in degrees
+        precision: Decimal places to keep
+
+    Returns:
+        Simplified geometry, or None for unsupported geometry types
+    """
+    def polygon(rings):
+        outer = simplify_ring(rings[0], tolerance) or list(rings[0])
+        holes = [hole for hole in (simplify_ring(r, tolerance) for r in rings[1:]) if hole]
+        return [[[round(x, precision), round(y, precision)] for x, y, *_ in ring] for ring in [outer] + holes]
+
+    if geometry["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": polygon(geometry["coordinates"])}
+    if geometry["type"] == "MultiPolygon":
+        return {"type": "MultiPolygon", "coordinates": [polygon(p) for p in geometry["coordinates"]]}
+    return None
+
+
+def clip_ring(ring: Sequence[Point], bounds: Tuple[float, float, float, float]) -> Optional[List[Point]]:
+    """
+    Clip a closed ring to a rectangle (Sutherland-Hodgman)
+
+    Parts outside the rectangle become segments along its edges, which
+    renderers draw as part of the neighbouring tile's fill.
+
+    Args:
+        ring: Closed ring of (lon, lat) points
+        bounds: (west, south, east, north) to clip to
+
+    Returns:
+        The clipped, closed ring, or None if nothing remains
+    """
+    west, south, east, north = bounds
+    points = [(point[0], point[1]) for point in ring[:-1]]
+    edges = (
+        (lambda p: p[0] >= west, lambda a, b: (west, a[1] + (b[1] - a[1]) * (west - a[0]) / (b[0] - a[0]))),
+        (lambda p: p[0] <= east, lambda a, b: (east, a[1] + (b[1] - a[1]) * (east - a[0]) / (b[0] - a[0]))),
+        (lambda p: p[1] >= south, lambda a, b: (a[0] + (b[0] - a[0]) * (south - a[1]) / (b[1] - a[1]), south)),
+        (lambda p: p[1] <= north, lambda a, b: (a[0] + (b[0] - a[0]) * (north - a[1]) / (b[1] - a[1]), north)),
+    )
+    for inside, intersect in edges:
+        if not points:
+            return None
+        clipped = []
+        previous = points[-1]
+        for current in points:
+            if inside(current):
+                if not inside(previous):
+                    clipped.append(intersect(previous, current))
+                clipped.append(current)
+            elif inside(previous):
+                clipped.append(intersect(previous, current))
+            previous = current
+        points = clipped
+    if len(points) < 3:
+        return None
+    return points + [points[0]]
+
+
+def clip_geometry(geometry: Dict[str, Any], bounds: Tuple[float, float, float, float], precision: int) -> Optional[Dict[str, Any]]:
+    """
+    Clip a Polygon or MultiPolygon to a rectangle
+
+    Args:
+        geometry: GeoJSON geometry
+        bounds: (west, south, east, north) to clip to
+        precision: Decimal places to keep
+
+    Returns:
+        The clipped geometry, or None if it lies outside the rectangle
+    """
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    clipped = []
+    for rings in polygons:
+        outer = clip_ring(rings[0], bounds)
+        if outer is None:
+            continue
+        holes = [hole for hole in (clip_ring(ring, bounds) for ring in rings[1:]) if hole]
+        clipped.append([[[round(x, precision), round(y, precision)] for x, y in ring] for ring in [outer] + holes])
+
+    if not clipped:
+        return None
+    if len(clipped) == 1:
+        return {"type": "Polygon", "coordinates": clipped[0]}
+    return {"type": "MultiPolygon", "coordinates": clipped}
+
+
+def geometry_bounds(geometry: Dict[str, Any]) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a Polygon or MultiPolygon."""
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    xs = [point[0] for rings in polygons for ring in rings for point in ring]
+    ys = [point[1] for rings in polygons for ring in rings for point in ring]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def lonlat_to_tile(lon: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator (slippy map) tile containing a point."""
+    n = 2 ** zoom
+    lat = max(min(lat, 85.0511), -85.0511)
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(zoom: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(west, south, east, north) of a tile in degrees."""
+    n = 2 ** zoom
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def tiles_for_bounds(bounds: Tuple[float, float, float, float], zoom: int) -> Iterable[Tuple[int, int]]:
+    """Every (x, y) tile at a zoom level that a bounding box touches."""
+    west, south, east, north = bounds
+    min_x, min_y = lonlat_to_tile(west, north, zoom)
+    max_x, max_y = lonlat_to_tile(east, south, zoom)
+    for x in range(min_x, max_x + 1):
+        for y in range(min_y, max_y + 1):
+            yield x, y
+
+
+def feature_collection_bytes(features: List[Dict[str, Any]]) -> bytes:
+    return json.dumps(
+        {"type": "FeatureCollection", "features": features},
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def write_tile_pack(path: Path, tiles: Dict[TileKey, bytes], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Write tile bodies and their gzip variants into one pack file
+
+    Args:
+        path: Output file
+        tiles: Body per (zoom, x, y)
+        metadata: Pack metadata stored in the header (zoom range, bounds, version...)
+
+    Returns:
+        The header that was written
+    """
+    blob = bytearray()
+    index = {}
+
+    def append(body: bytes) -> List[Any]:
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        offset = len(blob)
+        blob.extend(body)
+        gzip_offset, gzip_length = len(blob), 0
+        if len(body) >= MIN_COMPRESS_SIZE:
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            blob.extend(compressed)
+            gzip_length = len(compressed)
+        return [etag, offset, len(body), gzip_offset, gzip_length]
+
+    for (zoom, x, y) in sorted(tiles):
+        index[f"{zoom}/{x}/{y}"] = append(tiles[(zoom, x, y)])
+
+    header = dict(metadata, empty=append(feature_collection_bytes([])), tiles=index)
+    encoded = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    # Write beside the target and swap it in: servers may have the old pack
+    # mapped, and truncating a mapped file crashes them on the next read.
+    # Per-process name: several workers may rebuild the pack at startup
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(f"{path.name}.{os.getpid()}.partial")
+    with open(partial, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack(">I", len(encoded)))
+        f.write(encoded)
+        f.write(blob)
+    os.replace(partial, path)
+    return header
+
+
+class TilePack:
+    """Read-only, memory-mapped view of a tile pack."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a tile pack")
+        (header_length,) = struct.unpack(">I", self._mmap[len(MAGIC):len(MAGIC) + 4])
+        start = len(MAGIC) + 4
+        self.header: Dict[str, Any] = json.loads(self._mmap[start:start + header_length])
+        self._data_start = start + header_length
+
+        modified = path.stat().st_mtime
+        self.last_modified = datetime.fromtimestamp(modified, tz=timezone.utc).replace(microsecond=0)
+
+    @property
+    def min_zoom(self) -> int:
+        return self.header["min_zoom"]
+
+    @property
+    def max_zoom(self) -> int:
+        return self.header["max_zoom"]
+
+    def __len__(self) -> int:
+        return len(self.header["tiles"])
+
+    def tile(self, zoom: int, x: int, y: int) -> Optional[EncodedBody]:
+        """
+        Encoded body of one tile
+
+        Args:
+            zoom: Zoom level
+            x: Tile column
+            y: Tile row
+
+        Returns:
+            EncodedBody (an empty FeatureCollection for tiles without
+            suburbs), or None when the zoom level is outside the pack
+        """
+        if not self.min_zoom <= zoom <= self.max_zoom or not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+            return None
+        entry = self.header["tiles"].get(f"{zoom}/{x}/{y}", self.header["empty"])
+        etag, offset, length, gzip_offset, gzip_length = entry
+        base = self._data_start
+        return EncodedBody(
+            etag=etag,
+            identity=self._mmap[base + offset:base + offset + length],
+            gzip=self._mmap[base + gzip_offset:base + gzip_offset + gzip_length] if gzip_length else None,
+            br=None,
+            media_type="application/geo+json",
+            last_modified=self.last_modified
+        )
+
+    def close(self) -> None:
+        self._mmap.close()
@@ -0,0 +1,383 @@
+"""
+Conditional, precompressed responses for static reference endpoints
+
+Reference data (plants, UHI heat data, markdown guides) changes at most
+daily, but the frontend requests it on every page load. Routes using
+``conditional_response`` serialize each (route, query params, dataset
+version) once, keep the body precompressed with gzip (and brotli when the
+optional ``brotli`` package is installed), and answer ``If-None-Match`` /
+``If-Modified-Since`` with 304 Not Modified. Compression runs in a worker
+thread. Bodies too large for the cache, and routes that opt out, are served
+uncompressed with a version-based ETag, and GZipMiddleware compresses them.
+
+Usage:
+    from app.utils.http_cache import conditional_response
+
+    @router.get("/plants")
+    async def get_all_plants(request: Request, ...):
+        version = snapshot.fingerprint
+        return await conditional_response(request, version, lambda: service.get_all())
+
+Responses carry ``Content-Encoding`` when compressed, so GZipMiddleware
+passes them through untouched.
+"""
+import asyncio
+import gzip
+import hashlib
+import inspect
+import json
+import logging
+import math
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.utils.expiring_cache import ExpiringLRUCache
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Bodies smaller than this are not worth compressing (matches GZipMiddleware)
+MIN_COMPRESS_SIZE = 1000
+
+# Moderate levels: nearly the ratio of the maximum settings at a fraction of the CPU
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class EncodedBody:
+    """One serialized response body with its precompressed variants."""
+    etag: str
+    identity: bytes
+    gzip: Optional[bytes]
+    br: Optional[bytes]
+    media_type: str
+    last_modified: Optional[datetime]
+
+    def variant(self, encoding: str) -> bytes:
+        return {"br": self.br, "gzip": self.gzip}.get(encoding) or self.identity
+
+
+def render_body(content: Any) -> bytes:
+    """
+    Serialize endpoint content the way JSONResponse would
+
+    Args:
+        content: Pydantic model, bytes/str, or JSON-compatible data
+
+    Returns:
+        bytes: Response body
+    """
+    if isinstance(content, bytes):
+        return content
+    if isinstance(content, str):
+        return content.encode("utf-8")
+    if isinstance(content, BaseModel):
+        return content.model_dump_json().encode("utf-8")
+    return json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+def encode_body(
+    body: bytes,
+    media_type: str = "application/json",
+    last_modified: Optional[datetime] = None
+) -> EncodedBody:
+    """
+    Compute the strong ETag and compressed variants of a body
+
+    Args:
+        body: Uncompressed response body
+        media_type: Content type of the body
+        last_modified: When the underlying data last changed
+
+    Returns:
+        EncodedBody: Body, validators and gzip/brotli variants
+    """
+    etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+    compress = len(body) >= MIN_COMPRESS_SIZE
+    return EncodedBody(
+        etag=etag,
+        identity=body,
+        gzip=gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0) if compress else None,
+        br=brotli.compress(body, quality=BROTLI_QUALITY) if compress and brotli is not None else None,
+        media_type=media_type,
+        last_modified=_as_utc(last_modified)
+    )
+
+
+def _as_utc(moment: Optional[datetime]) -> Optional[datetime]:
+    """HTTP dates have second precision; naive datetimes are taken as UTC."""
+    if moment is None:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.replace(microsecond=0)
+
+
+def file_version(paths: Iterable[Path]) -> str:
+    """
+    Cheap dataset version for files on disk (names, sizes and mtimes)
+
+    Args:
+        paths: Files the response is built from
+
+    Returns:
+        str: Version string that changes whenever any file changes
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    for path in sorted(paths):
+        try:
+            stat = os.stat(path)
+            digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+        except OSError:
+            digest.update(f"{path}:missing;".encode())
+    return digest.hexdigest()
+
+
+def files_last_modified(paths: Iterable[Path]) -> Optional[datetime]:
+    """Latest mtime among files, as an aware UTC datetime (None if none exist)."""
+    mtimes = []
+    for path in paths:
+        try:
+            mtimes.append(os.stat(path).st_mtime)
+        except OSError:
+            continue
+    return datetime.fromtimestamp(max(mtimes), tz=timezone.utc) if mtimes else None
+
+
+class ResponseCache:
+    """Encoded bodies keyed by (route, query params, dataset version)."""
+
+    def __init__(self, max_bytes: Optional[int] = None, maxsize: int = 512):
+        self._store = ExpiringLRUCache(maxsize=maxsize, max_bytes=max_bytes)
+        self.not_modified = 0
+        self.served = {"identity": 0, "gzip": 0, "br": 0}
+        # Bodies served without being stored (too large, or the route opted out)
+        self.uncached = 0
+
+    @staticmethod
+    def key_for(request: Request, version: str) -> str:
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        return f"{request.url.path}?{params}#{version}"
+
+    def get(self, key: str) -> Optional[EncodedBody]:
+        return self._store.get(key)
+
+    def fits(self, size: int) -> bool:
+        """Whether a body of this many bytes can be stored at all."""
+        return self._store.max_bytes is None or size <= self._store.max_bytes
+
+    def set(self, key: str, body: EncodedBody) -> None:
+        size = len(body.identity) + len(body.gzip or b"") + len(body.br or b"")
+        self._store.set(key, body, math.inf, size=size)
+
+    def clear(self) -> None:
+        self._store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self._store.stats(),
+            not_modified=self.not_modified,
+            served=dict(self.served),
+            uncached=self.uncached
+        )
+
+
+response_cache = ResponseCache(max_bytes=settings.HTTP_CACHE_MAX_BYTES)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110 13.1.2), ignoring our per-encoding suffixes."""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        for suffix in ("-gzip", "-br"):
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: Optional[datetime]) -> bool:
+    if last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """
+    Whether the client's cached copy is current
+
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+
+    Args:
+        request: Incoming request
+        etag: Current entity tag (without quotes or encoding suffix)
+        last_modified: When the underlying data last changed
+
+    Returns:
+        bool: True if a 304 Not Modified can be sent
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return _etag_matches(if_none_match, etag)
+    return _not_modified_since(request.headers.get("if-modified-since", ""), _as_utc(last_modified))
+
+
+def _negotiate(accept_encoding: str, body: EncodedBody) -> str:
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in ("br", "gzip"):
+        if getattr(body, encoding) is not None and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None, max_age: Optional[int] = None) -> Dict[str, str]:
+    """
+    ETag, Last-Modified and Cache-Control headers for a cacheable response
+
+    Args:
+        etag: Entity tag (without quotes)
+        last_modified: When the underlying data last changed
+        max_age: Cache-Control max-age in seconds (settings.HTTP_CACHE_MAX_AGE by default)
+
+    Returns:
+        Dict of response headers
+    """
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"public, max-age={settings.HTTP_CACHE_MAX_AGE if max_age is None else max_age}",
+        "Vary": "Accept-Encoding"
+    }
+    last_modified = _as_utc(last_modified)
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def respond(request: Request, body: EncodedBody, max_age: Optional[int] = None) -> Response:
+    """
+    Build the 200 or 304 response for an encoded body
+
+    Args:
+        request: Incoming request (conditional and Accept-Encoding headers)
+        body: Encoded body to serve
+        max_age: Cache-Control max-age in seconds (settings.HTTP_CACHE_MAX_AGE by default)
+
+    Returns:
+        Response: 304 Not Modified, or the body in the best accepted encoding
+    """
+    encoding = _negotiate(request.headers.get("accept-encoding", ""), body)
+    etag = body.etag if encoding == "identity" else f"{body.etag}-{encoding}"
+    headers = cache_headers(etag, body.last_modified, max_age)
+
+    if is_not_modified(request, body.etag, body.last_modified):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    response_cache.served[encoding] += 1
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body.variant(encoding), media_type=body.media_type, headers=headers)
+
+
+async def conditional_response(
+    request: Request,
+    version: str,
+    build: Callable[[], Any],
+    media_type: str = "application/json",
+    last_modified: Optional[datetime] = None,
+    max_age: Optional[int] = None,
+    cache: bool = True
+) -> Response:
+    """
+    Serve a versioned dataset with ETag/304 support and precompressed bodies
+
+    ``build`` only runs when (route, query params, version) has not been
+    encoded yet in this worker. Bodies larger than the cache budget, and all
+    bodies when ``cache`` is False, are neither stored nor precompressed.
+    They carry a weak ETag derived from the key, so a matching request gets
+    a 304 without ``build`` running.
+
+    Args:
+        request: Incoming request
+        version: Identifier of the data the response is built from
+        build: Callable (sync or async) returning the content to serialize
+        media_type: Content type of the response
+        last_modified: When the underlying data last changed (for If-Modified-Since)
+        max_age: Cache-Control max-age in seconds
+        cache: Store and precompress the body (False for large opt-in variants)
+
+    Returns:
+        Response: 304 Not Modified or the full (possibly compressed) body
+    """
+    key = response_cache.key_for(request, version)
+    body = response_cache.get(key) if cache else None
+    if body is not None:
+        return respond(request, body, max_age)
+
+    version_etag = hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+    headers = cache_headers(version_etag, last_modified, max_age)
+    headers["ETag"] = f'W/{headers["ETag"]}'
+    if is_not_modified(request, version_etag, last_modified):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+
+    content = build()
+    if inspect.isawaitable(content):
+        content = await content
+    raw = render_body(content)
+
+    if not cache or not response_cache.fits(len(raw)):
+        response_cache.uncached += 1
+        return Response(content=raw, media_type=media_type, headers=headers)
+
+    body = await asyncio.to_thread(encode_body, raw, media_type, last_modified)
+    response_cache.set(key, body)
+    logger.debug(f"Encoded response {key} ({len(body.identity)} bytes)")
+    return respond(request, body, max_age)
+
+
+def get_http_cache_stats() -> Dict[str, Any]:
+    """Response cache size, 304 count and bodies served per encoding"""
+    return dict(response_cache.stats(), brotli_available=brotli is not None)
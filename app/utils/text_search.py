@@ -0,0 +1,132 @@
+"""
+In-memory indexes for small, read-only reference datasets
+
+NameIndex answers case-insensitive substring queries from a suffix array
+(a bisect per query instead of a scan over every name), with a difflib
+fallback for misspelled queries. RangeIndex answers numeric range queries
+over a sorted array with two bisects. Both are built once per dataset
+version and never mutated.
+"""
+import difflib
+from bisect import bisect_left, bisect_right
+from typing import Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Upper bound for any character, used to close bisect ranges on a prefix
+_MAX_CHAR = "\U0010ffff"
+
+
+class NameIndex(Generic[T]):
+    """Substring and fuzzy search over item names.
+
+    Results keep the ordering the UHI search endpoint always used: names
+    starting with the query first, then the other matches, each group
+    sorted by name (ties in dataset order).
+    """
+
+    def __init__(self, items: Sequence[T], names: Sequence[str]):
+        self._items = list(items)
+        self._names = list(names)
+        self._lower = [name.lower() for name in self._names]
+        # Every suffix of every name, sorted: names containing q are exactly
+        # the suffixes starting with q, which form one contiguous run
+        self._suffixes: List[Tuple[str, int]] = sorted(
+            (name[start:], position)
+            for position, name in enumerate(self._lower)
+            for start in range(len(name))
+        )
+        self._suffix_keys = [suffix for suffix, _ in self._suffixes]
+        self._distinct = sorted(set(self._lower))
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def contains(self, query: str) -> List[T]:
+        """
+        Items whose name contains the query (case-insensitive)
+
+        Args:
+            query: Text to look for
+
+        Returns:
+            List of matching items, prefix matches first
+        """
+        query = query.lower()
+        if not query:
+            positions = range(len(self._items))
+        else:
+            lo = bisect_left(self._suffix_keys, query)
+            hi = bisect_right(self._suffix_keys, query + _MAX_CHAR, lo)
+            positions = sorted({position for _, position in self._suffixes[lo:hi]})
+        ranked = sorted(
+            positions,
+            key=lambda position: (not self._lower[position].startswith(query), self._names[position])
+        )
+        return [self._items[position] for position in ranked]
+
+    def closest(self, query: str, limit: int = 10, cutoff: float = 0.6) -> List[T]:
+        """
+        Items whose name is similar to the query, most similar first
+
+        Args:
+            query: Possibly misspelled name
+            limit: Maximum number of distinct names to match
+            cutoff: Minimum difflib similarity ratio (0-1)
+
+        Returns:
+            List of matching items
+        """
+        names = difflib.get_close_matches(query.lower(), self._distinct, n=max(limit, 0), cutoff=cutoff)
+        order = {name: rank for rank, name in enumerate(names)}
+        matches = [position for position, name in enumerate(self._lower) if name in order]
+        matches.sort(key=lambda position: order[self._lower[position]])
+        return [self._items[position] for position in matches]
+
+    def search(self, query: str, limit: int = 10, fuzzy: bool = True) -> Tuple[List[T], bool]:
+        """
+        Substring search, falling back to fuzzy matching when nothing contains the query
+
+        Args:
+            query: Search text
+            limit: Maximum number of results
+            fuzzy: Whether to fall back to similar names
+
+        Returns:
+            Tuple of (items, whether the fuzzy fallback was used)
+        """
+        matches = self.contains(query)
+        if matches or not fuzzy or not query.strip():
+            return matches[:limit], False
+        return self.closest(query, limit)[:limit], True
+
+
+class RangeIndex(Generic[T]):
+    """Items sorted by a numeric key for bisect range queries."""
+
+    def __init__(self, items: Sequence[T], keys: Sequence[Optional[float]]):
+        # Items without a key cannot fall in any range
+        pairs = sorted(
+            ((key, position) for position, key in enumerate(keys) if key is not None),
+            key=lambda pair: pair[0]
+        )
+        self._keys = [key for key, _ in pairs]
+        self._items = [items[position] for _, position in pairs]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def between(self, low: Optional[float] = None, high: Optional[float] = None) -> List[T]:
+        """
+        Items with low <= key <= high, in ascending key order
+
+        Args:
+            low: Inclusive lower bound (unbounded when None)
+            high: Inclusive upper bound (unbounded when None)
+
+        Returns:
+            List of items in range
+        """
+        lo = 0 if low is None else bisect_left(self._keys, low)
+        hi = len(self._keys) if high is None else bisect_right(self._keys, high)
+        return self._items[lo:hi]
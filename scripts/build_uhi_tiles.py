@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Build per-zoom suburb boundary tiles for the UHI heatmap
+
+Reads app/static/uhi/melbourne_suburbs_simplified.geojson, joins each
+suburb with its heat data from melbourne_heat_data.json, simplifies the
+boundaries once per zoom level and writes every z/x/y tile into
+app/static/uhi/tiles/melbourne_suburbs.tiles (served by /api/v1/uhi/tiles).
+
+Usage:
+    python scripts/build_uhi_tiles.py [--min-zoom 9] [--max-zoom 13]
+
+Run on deploy; the app also rebuilds a missing or out-of-date pack at
+startup. The pack is generated, so it is not committed.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.uhi_tiles import (
+    BOUNDARIES_FILE,
+    DEFAULT_MAX_ZOOM,
+    DEFAULT_MIN_ZOOM,
+    TILES_FILE,
+    build_tile_pack,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build UHI boundary tiles")
+    parser.add_argument("--min-zoom", type=int, default=DEFAULT_MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=DEFAULT_MAX_ZOOM)
+    args = parser.parse_args()
+
+    print(f"Reading {BOUNDARIES_FILE.name}...")
+    build_tile_pack(TILES_FILE, args.min_zoom, args.max_zoom)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from sqlalchemy import select, update
 from app.core.database import AsyncSessionLocal
 from app.models.database import Plant
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.quantification_service import QuantificationService
+from app.utils.cache import close_cache, invalidate_tags
 from app.core.config import settings
 
 
@@ -308,6 +311,18 @@ async def enrich_plants():
         # Commit all changes
         await session.commit()
         print("\n✅ Plant data enrichment complete!")
+
+        # Recompute biophysics from the enriched rows
+        result = await session.execute(select(Plant))
+        plants = result.scalars().all()
+        biophysics = await QuantificationService().ensure_biophysics(
+            DatabasePlantRepository(session), plants, force=True
+        )
+        print(f"🧪 Stored biophysics for {len(biophysics)} plants")
+
+        # Cached plant responses are stale (shared cache L2 only)
+        await invalidate_tags("plant:*")
+        await close_cache()
         
         # Show sample of enriched data
         print("\n📊 Sample enriched plant:")
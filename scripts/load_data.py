@@ -17,6 +17,9 @@ from app.core.database import AsyncSessionLocal, async_engine
 from app.models.database import Plant, Suburb, Base
 from app.core.config import settings
 from app.repositories.climate_repository import ClimateRepository
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.quantification_service import QuantificationService
+from app.utils.cache import close_cache, invalidate_tags
 
 
 # Comprehensive list of Melbourne suburbs with coordinates
@@ -419,6 +422,19 @@ async def load_plants_from_csv(session: AsyncSession):
     return total_plants
 
 
+async def compute_plant_biophysics(session: AsyncSession):
+    """Precompute quantification biophysics for every plant"""
+    print("\n🧪 Computing plant biophysics...")
+
+    result = await session.execute(select(Plant))
+    plants = result.scalars().all()
+
+    biophysics = await QuantificationService().ensure_biophysics(
+        DatabasePlantRepository(session), plants, force=True
+    )
+    print(f"  ✓ Stored biophysics for {len(biophysics)} plants")
+
+
 async def verify_data(session: AsyncSession):
     """Verify data was loaded correctly"""
     print("\n🔍 Verifying data...")
@@ -462,6 +478,13 @@ async def main():
             
             # Load plants
             await load_plants_from_csv(session)
+
+            # Precompute plant biophysics for the quantification service
+            await compute_plant_biophysics(session)
+
+            # Drop cached responses built from the old data (reaches running
+            # API workers when a shared cache L2 is configured)
+            await invalidate_tags("plant:*", "suburb:*")
             
             # Verify data
             await verify_data(session)
@@ -479,6 +502,7 @@ async def main():
     
     # Close the engine
     await async_engine.dispose()
+    await close_cache()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,283 @@
+"""
+Unit tests for the upstream API scheduler and its use by the climate updater
+"""
+import asyncio
+import time
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.http_client import UpstreamError
+from app.services.climate_updater import CIRCUIT_OPEN_STATUS, ClimateUpdateService
+from app.utils.api_scheduler import APIScheduler, CircuitBreaker, TokenBucket, run_workers
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def scheduler():
+    """Scheduler for one upstream with instant retries"""
+    return APIScheduler({"api": 0}, workers=2, deadline=0.05, max_retries=2, backoff_base=0, failure_threshold=3)
+
+
+class TestRunWorkers:
+    """Bounded worker pool"""
+
+    @pytest.mark.asyncio
+    async def test_bounded_concurrency_in_order(self):
+        running = peak = 0
+
+        async def work(value):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001 * (5 - value))
+            running -= 1
+            if value == 3:
+                raise ValueError("bad item")
+            return value * 10
+
+        results = await run_workers(work, [(i,) for i in range(5)], workers=2)
+
+        assert peak == 2
+        assert results[:3] == [0, 10, 20] and results[4] == 40
+        assert isinstance(results[3], ValueError)
+
+
+class TestTokenBucket:
+    """Request rate limiting"""
+
+    @pytest.mark.asyncio
+    async def test_waits_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=50, capacity=2)
+
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire()
+
+        # Two tokens up front, then 2 more at 50/s
+        assert time.monotonic() - start >= 0.035
+
+
+class TestCircuitBreaker:
+    """Closed -> open -> half-open transitions"""
+
+    def test_opens_after_threshold_and_probes_after_timeout(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, clock=clock)
+
+        breaker.record_failure("boom")
+        assert breaker.allow_request()
+        breaker.record_failure("boom")
+        assert breaker.state == CircuitBreaker.OPEN and not breaker.allow_request()
+
+        clock.now += 60
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+        breaker.record_failure("still down")
+        assert breaker.state == CircuitBreaker.OPEN
+
+        clock.now += 60
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0
+
+    def test_restored_circuit_keeps_remaining_cool_down(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60, clock=clock)
+
+        breaker.trip(elapsed=50)
+
+        assert breaker.state == CircuitBreaker.OPEN
+        clock.now += 10
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    def test_half_open_lets_one_probe_through(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+        breaker.trip()
+        clock.now += 60
+
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+
+        breaker.record_failure("still down")
+        clock.now += 60
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.allow_request() and breaker.allow_request()
+
+
+class TestAPIScheduler:
+    """Deadlines, retries and circuit breaking"""
+
+    @pytest.mark.asyncio
+    async def test_retries_failures_until_success(self, scheduler):
+        func = AsyncMock(side_effect=[UpstreamError("HTTP 429"), RuntimeError("503"), {"ok": True}])
+
+        assert await scheduler.call("api", func, 1) == {"ok": True}
+        assert func.await_count == 3
+        assert scheduler.stats["api"]["retries"] == 2
+        assert scheduler.breakers["api"].failures == 0
+
+    @pytest.mark.asyncio
+    async def test_no_data_is_not_a_failure(self, scheduler):
+        func = AsyncMock(return_value=None)
+
+        for _ in range(5):
+            assert await scheduler.call("api", func) is None
+
+        assert func.await_count == 5
+        assert scheduler.stats["api"]["retries"] == 0
+        assert scheduler.breakers["api"].state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_slow_attempts_hit_the_deadline(self, scheduler):
+        async def slow():
+            await asyncio.sleep(1)
+
+        start = time.monotonic()
+        assert await scheduler.call("api", slow) is None
+        assert time.monotonic() - start < 0.5
+        assert "no response" in scheduler.breakers["api"].last_error
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_skips_calls(self, scheduler):
+        func = AsyncMock(side_effect=UpstreamError("HTTP 503"))
+
+        await scheduler.call("api", func)
+        assert scheduler.breakers["api"].state == CircuitBreaker.OPEN
+
+        assert await scheduler.call("api", func) is None
+        assert func.await_count == 3
+        assert scheduler.stats["api"]["rejected"] == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_send_one_probe_when_half_open(self, scheduler):
+        breaker = scheduler.breakers["api"]
+        breaker.trip(elapsed=breaker.reset_timeout)
+        probe_started = asyncio.Event()
+        release = asyncio.Event()
+        calls = 0
+
+        async def probe():
+            nonlocal calls
+            calls += 1
+            probe_started.set()
+            await release.wait()
+            return {"ok": True}
+
+        tasks = [asyncio.create_task(scheduler.call("api", probe)) for _ in range(10)]
+        await probe_started.wait()
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert calls == 1
+        assert results.count({"ok": True}) == 1
+        assert scheduler.stats["api"]["rejected"] == 9
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_frees_the_slot(self, scheduler):
+        breaker = scheduler.breakers["api"]
+        breaker.trip(elapsed=breaker.reset_timeout)
+
+        task = asyncio.create_task(scheduler.call("api", asyncio.sleep, 1))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert breaker.allow_request()
+
+    @pytest.mark.asyncio
+    async def test_probe_cancelled_while_waiting_for_a_token_frees_the_slot(self):
+        scheduler = APIScheduler({"api": 0.5}, deadline=1, max_retries=0)
+        breaker = scheduler.breakers["api"]
+        await scheduler.buckets["api"].acquire()
+        breaker.trip(elapsed=breaker.reset_timeout)
+        func = AsyncMock(return_value={"ok": True})
+
+        task = asyncio.create_task(scheduler.call("api", func))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        func.assert_not_awaited()
+        assert breaker.allow_request()
+
+    def test_backoff_is_jittered_and_capped(self, scheduler):
+        scheduler.backoff_base = 1.0
+
+        delays = [scheduler.backoff(10) for _ in range(50)]
+
+        assert all(0 <= d <= APIScheduler.MAX_BACKOFF for d in delays)
+        assert len(set(delays)) > 1
+
+    @pytest.mark.asyncio
+    async def test_map_returns_none_for_failed_items(self, scheduler):
+        async def lookup(value):
+            if value == 2:
+                raise UpstreamError("HTTP 500")
+            return value
+
+        assert await scheduler.map("api", lookup, [(1,), (2,), (3,)]) == [1, None, 3]
+
+
+class TestClimateCircuitState:
+    """Circuit breaker state kept in APICache"""
+
+    @pytest.fixture
+    def service(self):
+        service = ClimateUpdateService(AsyncMock(), http_session=MagicMock())
+        service.climate_repo.update_api_cache = AsyncMock()
+        return service
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_is_saved(self, service):
+        waqi = service.scheduler.breakers["waqi"]
+        for _ in range(waqi.failure_threshold):
+            waqi.record_failure("HTTP 429")
+        service.scheduler.stats["open_meteo"]["successes"] = 1
+
+        await service._update_api_cache_status()
+
+        saved = {call.kwargs["api_name"]: call.kwargs for call in service.climate_repo.update_api_cache.await_args_list}
+        assert saved["waqi"]["status"] == CIRCUIT_OPEN_STATUS
+        assert saved["waqi"]["error_message"] == "HTTP 429"
+        assert saved["open_meteo"]["status"] == "success"
+
+    @pytest.mark.asyncio
+    async def test_cells_without_readings_keep_the_circuit_closed(self, service):
+        service.aqi_client.get_nearest_station_aqi = AsyncMock(return_value=None)
+        service.scheduler.buckets["waqi"].rate = 0
+        cells = [{"id": i, "latitude": -37.8, "longitude": 144.9 + i / 100} for i in range(10)]
+
+        results = await service._fetch_aqi_by_cell(cells)
+
+        assert results == {i: None for i in range(10)}
+        assert service.aqi_client.get_nearest_station_aqi.await_count == 10
+        assert service.scheduler.breakers["waqi"].state == CircuitBreaker.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_recently_opened_circuit_is_restored(self, service):
+        service.climate_repo.get_api_cache_status = AsyncMock(return_value=[
+            {"api_name": "waqi", "status": CIRCUIT_OPEN_STATUS, "error_message": "HTTP 429",
+             "last_update": (datetime.utcnow() - timedelta(seconds=10)).isoformat()},
+            {"api_name": "arpansa", "status": CIRCUIT_OPEN_STATUS, "error_message": "timeout",
+             "last_update": (datetime.utcnow() - timedelta(days=1)).isoformat()},
+        ])
+
+        await service._restore_circuits()
+
+        assert service.scheduler.breakers["waqi"].state == CircuitBreaker.OPEN
+        assert service.scheduler.breakers["arpansa"].state == CircuitBreaker.CLOSED
@@ -0,0 +1,512 @@
+"""
+Unit tests for the response cache and its backends
+"""
+import asyncio
+import pickle
+import time
+import pytest
+from datetime import date
+from decimal import Decimal
+from enum import Enum
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import UUID
+
+from app.utils import cache as cache_module
+from app.schemas.request import RecommendationRequest
+from app.utils.cache import cache_key, cached, configure_cache, get_cache_stats, invalidate_cache, invalidate_tags
+from app.utils.cache_backends import CacheEntry, MemoryBackend, SQLiteBackend, TieredCache, matching_tags
+from app.utils.expiring_cache import ExpiringLRUCache
+
+
+def entry(value, ttl=60):
+    return CacheEntry(value, time.time() + ttl)
+
+
+@pytest.fixture
+def memory_cache():
+    """Memory-only cache installed for the decorator"""
+    cache = TieredCache(MemoryBackend(default_maxsize=10))
+    configure_cache(cache)
+    yield cache
+    configure_cache(None)
+
+
+@pytest.fixture
+def sqlite_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+class FakeClock:
+    """Controllable time source"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestExpiringLRUCache:
+    """Per-entry expiry, byte budget and exact counters"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_each_entry_expires_on_its_own_ttl(self, clock):
+        cache = ExpiringLRUCache(maxsize=10, clock=clock)
+        cache.set("short", "a", clock.now + 10, size=1)
+        cache.set("long", "b", clock.now + 7200, size=1)
+
+        clock.now += 11
+        assert cache.get("short") is None
+        assert cache.get("long") == "b"
+
+        clock.now += 7200
+        assert cache.expire() == 1
+        assert len(cache) == 0
+        assert (cache.expirations, cache.evictions) == (2, 0)
+
+    def test_expired_entries_dropped_on_write_without_being_read(self, clock):
+        cache = ExpiringLRUCache(maxsize=10, clock=clock)
+        cache.set("a", 1, clock.now + 5, size=10)
+
+        clock.now += 6
+        cache.set("b", 2, clock.now + 5, size=10)
+
+        assert list(cache) == ["b"]
+        assert cache.bytes == 10
+        assert cache.expirations == 1
+
+    def test_byte_budget_evicts_least_recently_used(self, clock):
+        cache = ExpiringLRUCache(maxsize=100, max_bytes=100, clock=clock)
+        cache.set("a", 1, clock.now + 60, size=40)
+        cache.set("b", 2, clock.now + 60, size=40)
+        cache.get("a")
+        cache.set("c", 3, clock.now + 60, size=40)
+
+        assert list(cache) == ["a", "c"]
+        assert cache.bytes == 80
+        assert cache.evictions == 1
+
+    def test_oversized_values_are_not_stored(self, clock):
+        cache = ExpiringLRUCache(max_bytes=100, clock=clock)
+        cache.set("a", 1, clock.now + 60, size=40)
+
+        assert cache.set("huge", 2, clock.now + 60, size=500) is False
+        assert list(cache) == ["a"]
+        assert cache.oversized == 1
+
+    def test_overwrite_replaces_size_and_expiry(self, clock):
+        cache = ExpiringLRUCache(clock=clock)
+        cache.set("a", 1, clock.now + 5, size=40)
+        cache.set("a", 2, clock.now + 60, size=10)
+
+        clock.now += 10
+        assert cache.expire() == 0
+        assert cache.get("a") == 2
+        assert cache.bytes == 10
+
+    def test_sizes_estimated_from_value(self, clock):
+        cache = ExpiringLRUCache(max_bytes=10 ** 6, clock=clock)
+        cache.set("small", "x", clock.now + 60)
+        cache.set("large", "x" * 10000, clock.now + 60)
+
+        assert cache.bytes > 10000
+
+    def test_values_not_sized_without_budget(self, clock):
+        sizeof = Mock(return_value=100)
+        cache = ExpiringLRUCache(sizeof=sizeof, clock=clock)
+
+        cache.set("large", "x" * 10000, clock.now + 60)
+
+        sizeof.assert_not_called()
+        assert cache.get("large") == "x" * 10000
+
+
+class TestMemoryBackend:
+    """Per-prefix LRU segments"""
+
+    @pytest.mark.asyncio
+    async def test_prefix_maxsize_evicts_least_recently_used(self):
+        backend = MemoryBackend(default_maxsize=2, prefix_maxsize={"plants": 1})
+        await backend.set("recommendations:f:1", entry(1))
+        await backend.set("recommendations:f:2", entry(2))
+        await backend.get("recommendations:f:1")
+        await backend.set("recommendations:f:3", entry(3))
+        await backend.set("plants:f:1", entry("a"))
+        await backend.set("plants:f:2", entry("b"))
+
+        assert await backend.get("recommendations:f:2") is None
+        assert (await backend.get("recommendations:f:1")).value == 1
+        assert await backend.get("plants:f:1") is None
+        assert backend.evictions == 2
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_not_returned(self):
+        backend = MemoryBackend()
+        await backend.set("plants:f:1", CacheEntry("old", time.time() - 1))
+
+        assert await backend.get("plants:f:1") is None
+        assert backend.expirations == 1
+
+    @pytest.mark.asyncio
+    async def test_global_byte_budget_evicts_from_largest_segment(self):
+        backend = MemoryBackend(max_bytes=30000, prefix_max_bytes={"plants": 50000})
+        await backend.set("plants:f:1", entry("p" * 10000))
+        await backend.set("plants:f:2", entry("p" * 10000))
+        await backend.set("companions:f:1", entry("c" * 5000))
+        await backend.set("companions:f:2", entry("c" * 5000))
+
+        assert backend.bytes <= 30000
+        assert await backend.get("plants:f:1") is None
+        assert (await backend.get("companions:f:1")).value == "c" * 5000
+        assert backend.stats()["segments"]["plants"]["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_delete_prefix(self):
+        backend = MemoryBackend()
+        for key in ("plants:a:1", "plants:b:1", "companions:a:1"):
+            await backend.set(key, entry(key))
+
+        assert await backend.delete_prefix("plants:a:") == 1
+        assert await backend.delete_prefix("plants") == 1
+        assert len(backend) == 1
+
+
+class TestTieredCache:
+    """L1 in front of a shared L2"""
+
+    @pytest.mark.asyncio
+    async def test_workers_share_results_through_l2(self, sqlite_path):
+        """A value written by one worker is an L2 hit for another, then an L1 hit"""
+        worker_a = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path))
+        worker_b = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path))
+
+        await worker_a.set("recommendations:f:1", entry({"plants": [1, 2]}))
+
+        assert (await worker_b.get("recommendations:f:1")).value == {"plants": [1, 2]}
+        assert (await worker_b.get("recommendations:f:1")).value == {"plants": [1, 2]}
+        assert worker_b.stats()["prefixes"]["recommendations"]["l2_hits"] == 1
+        assert worker_b.stats()["prefixes"]["recommendations"]["l1_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_l1_lifetime_capped_with_l2(self, sqlite_path):
+        """L1 copies expire early so workers pick up changes made elsewhere"""
+        cache = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path), l1_max_ttl=5)
+        await cache.set("plants:f:1", entry("value", ttl=3600))
+
+        l1_entry = await cache.l1.get("plants:f:1")
+        assert l1_entry.expires_at <= time.time() + 5
+
+    @pytest.mark.asyncio
+    async def test_entry_pickled_once_per_write(self, sqlite_path):
+        """L1 is sized from the bytes written to L2 instead of pickling again"""
+        cache = TieredCache(MemoryBackend(max_bytes=10 ** 6), SQLiteBackend(sqlite_path))
+
+        with patch("pickle.dumps", wraps=pickle.dumps) as dumps:
+            await cache.set("plants:f:1", entry("x" * 5000))
+
+        assert dumps.call_count == 1
+        assert cache.l1.bytes > 5000
+
+    @pytest.mark.asyncio
+    async def test_l2_failures_degrade_to_l1(self):
+        """A broken L2 is counted but never fails the request"""
+        l2 = Mock()
+        l2.get = AsyncMock(side_effect=ConnectionError("down"))
+        l2.set = AsyncMock(side_effect=ConnectionError("down"))
+        l2.invalidations_since = AsyncMock(return_value=([], 0))
+        cache = TieredCache(MemoryBackend(), l2)
+
+        await cache.set("plants:f:1", entry("value"))
+        assert (await cache.get("plants:f:1")).value == "value"
+        assert await cache.get("plants:f:2") is None
+        assert cache.stats()["totals"]["l2_errors"] == 2
+
+    @pytest.mark.asyncio
+    async def test_sqlite_delete_prefix(self, sqlite_path):
+        backend = SQLiteBackend(sqlite_path)
+        for key in ("plants:a:1", "plants:b:1", "plantsx:a:1"):
+            await backend.set(key, entry(key))
+
+        assert await backend.delete_prefix("plants:") == 2
+        assert (await backend.get("plantsx:a:1")).value == "plantsx:a:1"
+
+
+class TestCachedDecorator:
+    """Decorator behaviour on top of the configured cache"""
+
+    @pytest.mark.asyncio
+    async def test_caches_results_and_reports_prefix_stats(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="plants")
+        async def load(plant_id):
+            calls.append(plant_id)
+            return {"id": plant_id}
+
+        assert await load(1) == {"id": 1}
+        assert await load(1) == {"id": 1}
+        assert calls == [1]
+
+        stats = get_cache_stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["prefixes"]["plants"]["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_prefix_ttl_from_settings(self, memory_cache):
+        @cached(ttl=60, prefix="plants")
+        async def load():
+            return "value"
+
+        with patch.object(cache_module.settings, "CACHE_PREFIX_TTL", {"plants": 5}):
+            await load()
+
+        (key,) = list(memory_cache.l1._segments["plants"])
+        assert memory_cache.l1._segments["plants"][key].expires_at <= time.time() + 5
+
+    @pytest.mark.asyncio
+    async def test_invalidate_cache_clears_l1_and_l2(self, sqlite_path):
+        cache = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path))
+        configure_cache(cache)
+        try:
+            await cache.set("plants:f:1", entry("value"))
+            invalidate_cache("plants:*")
+            await next(iter(cache_module._pending_tasks))
+
+            assert await cache.get("plants:f:1") is None
+        finally:
+            configure_cache(None)
+
+
+class TestCacheKeys:
+    """Key derivation for the decorator"""
+
+    def test_equal_requests_share_a_key(self):
+        first = RecommendationRequest(suburb="Carlton", user_preferences={"user_id": "a"})
+        second = RecommendationRequest(user_preferences={"user_id": "a"}, suburb="Carlton")
+        other = RecommendationRequest(suburb="Richmond", user_preferences={"user_id": "a"})
+
+        assert cache_key(first) == cache_key(second)
+        assert cache_key(first) != cache_key(other)
+
+    def test_kwargs_order_ignored(self):
+        assert cache_key(1, a="x", b=[1, 2]) == cache_key(1, b=[1, 2], a="x")
+        assert cache_key(1) != cache_key("1")
+
+    def test_dates_enums_uuids_and_decimals_are_keyed(self):
+        class Season(str, Enum):
+            SPRING = "spring"
+
+        assert cache_key(date(2024, 1, 1)) != cache_key(date(2025, 6, 1))
+        assert cache_key(date(2024, 1, 1), "a") != cache_key("a")
+        assert cache_key(Season.SPRING) != cache_key("spring")
+        assert cache_key(UUID(int=1)) != cache_key(UUID(int=2))
+        assert cache_key(Decimal("1.5")) == cache_key(Decimal("1.5")) != cache_key(Decimal("2"))
+
+    def test_unkeyable_objects_are_rejected(self):
+        with pytest.raises(TypeError, match="key_fields"):
+            cache_key(1, object())
+
+    @pytest.mark.asyncio
+    async def test_self_skipped_by_signature_not_class_name(self, memory_cache):
+        class Loader:
+            def __init__(self):
+                self.calls = 0
+
+            @cached(ttl=60, prefix="plants")
+            async def load(self, plant_id):
+                self.calls += 1
+                return plant_id
+
+        first, second = Loader(), Loader()
+        await first.load(1)
+        await second.load(1)
+
+        assert (first.calls, second.calls) == (1, 0)
+
+    @pytest.mark.asyncio
+    async def test_key_fields(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="recommendations", key_fields=["request.suburb", "month"])
+        async def recommend(request, month, session=None):
+            calls.append((request.suburb, month))
+            return len(calls)
+
+        request = RecommendationRequest(suburb="Carlton", user_preferences={})
+        assert await recommend(request, "May", session=object()) == 1
+        assert await recommend(request.model_copy(update={"n": 3}), month="May") == 1
+        assert await recommend(request, "June") == 2
+
+    def test_key_fields_must_name_parameters(self):
+        with pytest.raises(ValueError):
+            @cached(ttl=60, prefix="plants", key_fields=["missing"])
+            async def load(plant_id):
+                return plant_id
+
+    @pytest.mark.asyncio
+    async def test_key_callable_and_timing_stats(self, memory_cache):
+        @cached(ttl=60, prefix="plants", key=lambda plant, **_: plant["id"])
+        async def load(plant, verbose=False):
+            return dict(plant, verbose=verbose)
+
+        assert await load({"id": 1, "name": "Basil"}) == {"id": 1, "name": "Basil", "verbose": False}
+        assert (await load({"id": 1, "name": "changed"}, verbose=True))["name"] == "Basil"
+
+        stats = get_cache_stats()
+        assert stats["key_computations"] == 2
+        assert stats["prefixes"]["plants"]["key_time_avg_us"] > 0
+
+
+class TestSingleFlight:
+    """Coalescing of concurrent misses and stale-while-revalidate"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_compute_once(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="recommendations")
+        async def recommend(profile):
+            calls.append(profile)
+            await asyncio.sleep(0.01)
+            return {"profile": profile}
+
+        results = await asyncio.gather(*(recommend("a") for _ in range(10)))
+
+        assert calls == ["a"]
+        assert results == [{"profile": "a"}] * 10
+        assert get_cache_stats()["coalesced"] == 9
+        assert cache_module._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_waiter_and_are_not_cached(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="recommendations")
+        async def recommend():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(*(recommend() for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+        with pytest.raises(ValueError):
+            await recommend()
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_computation(self, memory_cache):
+        release = asyncio.Event()
+
+        @cached(ttl=60, prefix="recommendations")
+        async def recommend():
+            await release.wait()
+            return "value"
+
+        first = asyncio.create_task(recommend())
+        second = asyncio.create_task(recommend())
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "value"
+
+    @pytest.mark.asyncio
+    async def test_stale_entry_served_while_refreshing_once(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="recommendations", stale_ttl=60)
+        async def recommend():
+            calls.append(1)
+            return len(calls)
+
+        assert await recommend() == 1
+        (key,) = list(memory_cache.l1._segments["recommendations"])
+        memory_cache.l1._segments["recommendations"][key].expires_at = time.time() - 1
+
+        # Both callers get the stale value; a single refresh runs behind them
+        assert await asyncio.gather(recommend(), recommend()) == [1, 1]
+        while cache_module._inflight:
+            await asyncio.sleep(0)
+
+        assert await recommend() == 2
+        assert len(calls) == 2
+        assert get_cache_stats()["stale_hits"] == 2
+
+    @pytest.mark.asyncio
+    async def test_entries_past_stale_window_are_misses(self, memory_cache):
+        @cached(ttl=60, prefix="recommendations", stale_ttl=5)
+        async def recommend():
+            return "fresh"
+
+        await recommend()
+        (key,) = list(memory_cache.l1._segments["recommendations"])
+        assert memory_cache.l1._segments["recommendations"][key].stale_until <= time.time() + 65
+
+        await memory_cache.set(key, CacheEntry("old", time.time() - 10, time.time() - 1))
+        assert await recommend() == "fresh"
+
+
+class TestTagInvalidation:
+    """Dependency tags on cache entries"""
+
+    def test_matching_tags(self):
+        known = {"plant:*", "plant:5", "plant:6", "suburb:richmond", "suburb:*"}
+
+        assert matching_tags("plant:5", known) == {"plant:5", "plant:*"}
+        assert matching_tags("plant:*", known) == {"plant:*", "plant:5", "plant:6"}
+        assert matching_tags("growth:1", known) == set()
+
+    @pytest.mark.asyncio
+    async def test_decorator_tags_and_invalidation(self, memory_cache):
+        calls = []
+
+        @cached(ttl=60, prefix="recommendations", tags=["plant:*", "suburb:{suburb}"])
+        async def recommend(suburb):
+            calls.append(suburb)
+            return suburb
+
+        @cached(ttl=60, prefix="plants", tags=["growth:{plant_id}"])
+        async def growth(plant_id):
+            calls.append(plant_id)
+            return plant_id
+
+        for call in (recommend("Richmond"), recommend("Carlton"), growth(1), growth(2)):
+            await call
+
+        assert await invalidate_tags("suburb:RICHMOND") == 1
+        assert await invalidate_tags("growth:*") == 2
+        await recommend("Carlton")
+        assert len(calls) == 4
+
+        assert await invalidate_tags("plant:12") == 1
+        assert memory_cache.stats()["invalidations"]["keys"] == 4
+
+    @pytest.mark.asyncio
+    async def test_invalidation_reaches_other_workers(self, sqlite_path):
+        """A tag invalidated by one worker drops the L1 copies held by another"""
+        worker_a = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path))
+        worker_b = TieredCache(MemoryBackend(), SQLiteBackend(sqlite_path))
+        tagged = CacheEntry("value", time.time() + 60, tags=("suburb:richmond",))
+
+        await worker_b.poll_invalidations(force=True)
+        await worker_b.set("recommendations:f:1", tagged)
+        await worker_b.set("recommendations:f:2", entry("untagged"))
+
+        assert await worker_a.delete_tags(["suburb:richmond"]) == 1
+        assert await worker_a.l2.get("recommendations:f:1") is None
+
+        assert await worker_b.l1.get("recommendations:f:1") is not None
+        assert await worker_b.poll_invalidations(force=True) == 1
+        assert await worker_b.l1.get("recommendations:f:1") is None
+        assert (await worker_b.get("recommendations:f:2")).value == "untagged"
+
+        # A worker's own invalidations are not replayed against it
+        await worker_a.poll_invalidations(force=True)
+        await worker_a.set("recommendations:f:1", tagged)
+        await worker_a.delete_tags(["suburb:richmond"])
+        await worker_a.set("recommendations:f:1", tagged)
+        assert await worker_a.poll_invalidations(force=True) == 0
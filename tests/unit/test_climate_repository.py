@@ -0,0 +1,77 @@
+"""
+Unit tests for bulk climate data upserts
+"""
+import pytest
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.repositories.climate_repository import ClimateRepository
+
+
+@pytest.fixture
+def db():
+    """Session whose suburb name lookup returns two names"""
+    session = AsyncMock()
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = ["Carlton", "Richmond"]
+    session.execute = AsyncMock(return_value=result)
+    return session
+
+
+def compiled(call):
+    """SQL text of an executed statement"""
+    return str(call.args[0].compile(dialect=postgresql.dialect()))
+
+
+class TestBulkUpsertClimate:
+    """INSERT ... ON CONFLICT batches"""
+
+    @pytest.mark.asyncio
+    async def test_one_statement_and_commit_per_batch(self, db):
+        records = [
+            {"suburb_id": 1, "temperature_current": 20.0, "data_source": {"weather": "open_meteo"}},
+            {"suburb_id": 2, "temperature_current": 21.0, "data_source": {"weather": "open_meteo"}},
+        ]
+
+        with patch("app.repositories.climate_repository.invalidate_tags", new=AsyncMock()) as invalidate:
+            written = await ClimateRepository(db).bulk_upsert_climate(records)
+
+        assert written == 2
+        sql = compiled(db.execute.await_args_list[0])
+        assert "ON CONFLICT (suburb_id, recorded_date) DO UPDATE" in sql
+        assert "temperature_current = excluded.temperature_current" in sql
+        assert "suburb_id = excluded" not in sql
+        db.commit.assert_awaited_once()
+        invalidate.assert_awaited_once_with("suburb:Carlton", "suburb:Richmond")
+
+    @pytest.mark.asyncio
+    async def test_only_present_fields_are_updated(self, db):
+        records = [
+            {"suburb_id": 1, "temperature_current": 20.0, "recorded_date": date(2025, 1, 1)},
+            {"suburb_id": 2, "uv_index": 5.0, "not_a_column": 1},
+        ]
+
+        with patch("app.repositories.climate_repository.invalidate_tags", new=AsyncMock()):
+            await ClimateRepository(db).bulk_upsert_climate(records)
+
+        upserts = [compiled(call) for call in db.execute.await_args_list[:2]]
+        assert "uv_index" not in upserts[0] and "temperature_current" not in upserts[1]
+        assert all("not_a_column" not in sql for sql in upserts)
+        db.commit.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_rolls_back_on_error(self, db):
+        db.execute = AsyncMock(side_effect=RuntimeError("constraint missing"))
+
+        with pytest.raises(RuntimeError):
+            await ClimateRepository(db).bulk_upsert_climate([{"suburb_id": 1, "uv_index": 5.0}])
+
+        db.rollback.assert_awaited_once()
+        db.commit.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_empty_batch(self, db):
+        assert await ClimateRepository(db).bulk_upsert_climate([]) == 0
+        db.execute.assert_not_awaited()
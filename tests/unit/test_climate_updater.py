@@ -0,0 +1,99 @@
+"""
+Unit tests for the climate updater's grid deduplication and buffered saves
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.services.climate_updater import ClimateUpdateService, group_by_grid
+from app.services.climate_updater import settings as climate_settings
+
+
+@pytest.fixture
+def suburbs():
+    """Three neighbouring inner suburbs and one outer suburb"""
+    return [
+        {"id": 1, "name": "Carlton", "latitude": -37.7960, "longitude": 144.9674},
+        {"id": 2, "name": "Carlton North", "latitude": -37.7840, "longitude": 144.9722},
+        {"id": 3, "name": "Parkville", "latitude": -37.7870, "longitude": 144.9510},
+        {"id": 4, "name": "Frankston", "latitude": -38.1440, "longitude": 145.1260},
+    ]
+
+
+class TestGridDeduplication:
+    """One fetch per grid cell, fanned out to member suburbs"""
+
+    def test_group_by_grid(self, suburbs):
+        cells = group_by_grid(suburbs, 0.05)
+
+        assert [[s["id"] for s in cell["suburbs"]] for cell in cells] == [[1, 2, 3], [4]]
+        assert cells[0]["latitude"] == pytest.approx((-37.7960 - 37.7840 - 37.7870) / 3)
+        assert cells[1]["longitude"] == 145.1260
+
+    def test_zero_grid_keeps_suburbs_separate(self, suburbs):
+        assert len(group_by_grid(suburbs, 0)) == 4
+
+    @pytest.mark.asyncio
+    async def test_update_all_fetches_once_per_cell(self, suburbs, monkeypatch):
+        monkeypatch.setattr(climate_settings, "CLIMATE_WEATHER_GRID_DEGREES", 0.05)
+        monkeypatch.setattr(climate_settings, "CLIMATE_AQI_GRID_DEGREES", 10.0)
+        service = ClimateUpdateService(AsyncMock(), http_session=MagicMock())
+        service.climate_repo.get_all_suburbs = AsyncMock(return_value=suburbs)
+        service.climate_repo.bulk_upsert_climate = AsyncMock(return_value=4)
+        service.climate_repo.update_api_cache = AsyncMock()
+        service.climate_repo.get_api_cache_status = AsyncMock(return_value=[])
+        service.uv_client.get_melbourne_uv = AsyncMock(return_value={"uv_index": 5})
+        service.weather_client.get_weather_bulk = AsyncMock(
+            side_effect=lambda coords: [{"temperature_current": 20 + i} for i in range(len(coords))]
+        )
+        service.weather_client.get_weather = AsyncMock()
+        service.aqi_client.get_nearest_station_aqi = AsyncMock(return_value={"air_quality_index": 42})
+
+        stats = await service.update_all_suburbs()
+
+        assert len(service.weather_client.get_weather_bulk.await_args.args[0]) == 2
+        service.weather_client.get_weather.assert_not_awaited()
+        assert service.aqi_client.get_nearest_station_aqi.await_count == 1
+        service.climate_repo.bulk_upsert_climate.assert_awaited_once()
+        saved = {r["suburb_id"]: r for r in service.climate_repo.bulk_upsert_climate.await_args.args[0]}
+        assert {k: v["temperature_current"] for k, v in saved.items()} == {1: 20, 2: 20, 3: 20, 4: 21}
+        assert all(v["air_quality_index"] == 42 for v in saved.values())
+        assert stats["suburbs_succeeded"] == 4
+        assert (stats["weather_locations"], stats["air_quality_locations"]) == (2, 1)
+
+
+class TestBufferedSaves:
+    """Fetched records are written in batches"""
+
+    @pytest.fixture
+    def service(self, suburbs):
+        service = ClimateUpdateService(AsyncMock(), http_session=MagicMock())
+        service.scheduler.max_retries = 0
+        service.aqi_client.get_nearest_station_aqi = AsyncMock(return_value=None)
+        service.climate_repo.bulk_upsert_climate = AsyncMock(side_effect=lambda records: len(records))
+        return service
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_batch_fills(self, service, suburbs, monkeypatch):
+        monkeypatch.setattr(climate_settings, "CLIMATE_UPSERT_BATCH_SIZE", 3)
+        weather = {s["id"]: {"temperature_current": 20} for s in suburbs}
+
+        await service._process_suburbs(suburbs[:2], {"uv_index": 3}, weather)
+        service.climate_repo.bulk_upsert_climate.assert_not_awaited()
+
+        await service._process_suburbs(suburbs[2:], {"uv_index": 3}, weather)
+
+        assert len(service.climate_repo.bulk_upsert_climate.await_args.args[0]) == 3
+        assert len(service._pending) == 1
+        await service._flush_climate()
+        assert service.stats["suburbs_succeeded"] == 4
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_counts_suburbs_as_failed(self, service, suburbs):
+        service.climate_repo.bulk_upsert_climate = AsyncMock(side_effect=RuntimeError("db down"))
+
+        await service._process_suburbs(suburbs, {"uv_index": 3}, {})
+        await service._flush_climate()
+
+        assert service.stats["suburbs_succeeded"] == 0
+        assert service.stats["suburbs_failed"] == 4
+        assert service._pending == []
@@ -0,0 +1,164 @@
+"""
+Unit tests for boundary tile generation and the tile pack
+"""
+import gzip
+import json
+import os
+import pytest
+
+from app.services.uhi_tiles import StaleTilesError, TileStore, build_tile_pack
+from app.utils.geo_tiles import (
+    TilePack,
+    clip_ring,
+    feature_collection_bytes,
+    lonlat_to_tile,
+    simplify_line,
+    simplify_ring,
+    tile_bounds,
+    write_tile_pack,
+)
+
+
+class TestSimplify:
+    """Douglas-Peucker simplification"""
+
+    def test_drops_points_within_tolerance(self):
+        line = [(0, 0), (1, 0.01), (2, -0.01), (3, 5), (4, 0)]
+
+        assert simplify_line(line, 0.1) == [(0, 0), (2, -0.01), (3, 5), (4, 0)]
+
+    def test_zero_tolerance_keeps_everything(self):
+        line = [(0, 0), (1, 0.01), (2, 0)]
+
+        assert simplify_line(line, 0) == line
+
+    def test_collapsed_ring(self):
+        sliver = [(0, 0), (1, 0.001), (2, 0), (1, -0.001), (0, 0)]
+
+        assert simplify_ring(sliver, 0.01) is None
+        assert simplify_ring(sliver, 0.0001) == sliver
+
+
+class TestTiles:
+    """Tile math and clipping"""
+
+    def test_point_lies_in_its_tile(self):
+        x, y = lonlat_to_tile(144.96, -37.81, 12)
+        west, south, east, north = tile_bounds(12, x, y)
+
+        assert west <= 144.96 < east
+        assert south <= -37.81 < north
+
+    def test_clip_ring_to_rectangle(self):
+        square = [(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+        clipped = clip_ring(square, (0, 0, 2, 2))
+
+        assert clipped[0] == clipped[-1]
+        assert sorted(set(clipped)) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+    def test_clip_ring_outside(self):
+        square = [(-1, -1), (1, -1), (1, 1), (-1, 1), (-1, -1)]
+
+        assert clip_ring(square, (5, 5, 6, 6)) is None
+
+
+class TestTilePack:
+    """Writing and memory-mapped reading"""
+
+    @pytest.fixture
+    def pack(self, tmp_path):
+        feature = {"type": "Feature", "geometry": None, "properties": {"name": "x" * 2000}}
+        tiles = {
+            (9, 462, 314): feature_collection_bytes([feature]),
+            (10, 924, 628): b'{"type":"FeatureCollection","features":[]}'
+        }
+        path = tmp_path / "test.tiles"
+        write_tile_pack(path, tiles, {"min_zoom": 9, "max_zoom": 10})
+        pack = TilePack(path)
+        yield pack
+        pack.close()
+
+    def test_tile_with_gzip_variant(self, pack):
+        body = pack.tile(9, 462, 314)
+
+        assert json.loads(body.identity)["features"][0]["properties"]["name"] == "x" * 2000
+        assert gzip.decompress(body.gzip) == body.identity
+        assert body.media_type == "application/geo+json"
+        assert body.last_modified is not None
+
+    def test_small_tile_not_compressed(self, pack):
+        assert pack.tile(10, 924, 628).gzip is None
+
+    def test_missing_tile_in_range_is_empty(self, pack):
+        body = pack.tile(10, 0, 0)
+
+        assert json.loads(body.identity) == {"type": "FeatureCollection", "features": []}
+
+    def test_out_of_range(self, pack):
+        assert pack.tile(8, 0, 0) is None
+        assert pack.tile(9, 512, 0) is None
+
+    def test_rejects_other_files(self, tmp_path):
+        path = tmp_path / "not.tiles"
+        path.write_bytes(b"{}")
+
+        with pytest.raises(ValueError):
+            TilePack(path)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    """One square suburb boundary and its heat data"""
+    boundaries = tmp_path / "boundaries.geojson"
+    boundaries.write_text(json.dumps({"type": "FeatureCollection", "features": [{
+        "type": "Feature",
+        "properties": {"SUBURB_NAME": "Carlton"},
+        "geometry": {"type": "Polygon", "coordinates": [
+            [[144.96, -37.80], [144.98, -37.80], [144.98, -37.78], [144.96, -37.78], [144.96, -37.80]]
+        ]}
+    }]}))
+    heat = tmp_path / "heat.json"
+    heat.write_text(json.dumps({
+        "heat_categories": {"high": {"label": "High Heat", "color": "#f00"}},
+        "suburbs": [{"id": "c", "name": "Carlton", "heat": {"intensity": 7.0, "category": "High Heat"}}]
+    }))
+    return boundaries, heat
+
+
+class TestTileStore:
+    """Packs are checked against the files they were built from"""
+
+    @pytest.fixture
+    def store(self, tmp_path, sources):
+        return TileStore(tmp_path / "tiles" / "test.tiles", sources)
+
+    def test_missing_pack(self, store):
+        assert not store.is_current()
+        with pytest.raises(FileNotFoundError):
+            store.get()
+
+    def test_serves_current_pack(self, store, sources):
+        build_tile_pack(store.path, 9, 10, sources)
+
+        pack = store.get()
+
+        assert store.is_current()
+        tile = pack.tile(10, 924, 628)
+        assert json.loads(tile.identity)["features"][0]["properties"]["heat_intensity"] == 7.0
+
+    def test_refuses_pack_after_heat_data_changes(self, store, sources):
+        build_tile_pack(store.path, 9, 10, sources)
+        store.get()
+
+        heat = sources[1]
+        heat.write_text(heat.read_text().replace("7.0", "9.5"))
+        stat = os.stat(heat)
+        os.utime(heat, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        with pytest.raises(StaleTilesError):
+            store.get()
+
+        store.ensure_current()
+        tile = store.get().tile(10, 924, 628)
+        assert json.loads(tile.identity)["features"][0]["properties"]["heat_intensity"] == 9.5
@@ -0,0 +1,126 @@
+"""
+Unit tests for conditional, precompressed responses
+"""
+import gzip
+import pytest
+from datetime import datetime
+from fastapi import FastAPI, Request
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.testclient import TestClient
+
+from app.utils.http_cache import conditional_response, response_cache
+
+
+@pytest.fixture
+def dataset():
+    """Mutable dataset version plus a log of builds"""
+    return {"version": "v1", "builds": []}
+
+
+@pytest.fixture
+def client(dataset):
+    """App with one versioned route behind GZipMiddleware, as in app.main"""
+    app = FastAPI()
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    @app.get("/items")
+    async def items(request: Request, size: int = 500, store: bool = True):
+        def build():
+            dataset["builds"].append(size)
+            return {"version": dataset["version"], "items": list(range(size))}
+
+        return await conditional_response(
+            request, dataset["version"], build, last_modified=datetime(2025, 1, 1, 12, 0, 0), cache=store
+        )
+
+    response_cache.clear()
+    yield TestClient(app)
+    response_cache.clear()
+
+
+class TestConditionalResponse:
+    """ETag/304 handling and precompressed bodies"""
+
+    def test_serves_precompressed_gzip_with_validators(self, client):
+        response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert response.headers["last-modified"] == "Wed, 01 Jan 2025 12:00:00 GMT"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.json()["items"][-1] == 499
+
+    def test_identity_when_compression_not_accepted(self, client):
+        response = client.get("/items", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json()["version"] == "v1"
+
+    def test_if_none_match_returns_304_without_rebuilding(self, client, dataset):
+        etag = client.get("/items", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+        response = client.get("/items", headers={"If-None-Match": etag, "Accept-Encoding": "identity"})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert dataset["builds"] == [500]
+
+    def test_new_version_changes_etag(self, client, dataset):
+        etag = client.get("/items").headers["etag"]
+        dataset["version"] = "v2"
+
+        response = client.get("/items", headers={"If-None-Match": etag})
+
+        assert response.status_code == 200
+        assert response.json()["version"] == "v2"
+        assert len(dataset["builds"]) == 2
+
+    def test_query_params_are_part_of_the_key(self, client, dataset):
+        client.get("/items", params={"size": 10})
+        client.get("/items", params={"size": 20})
+        client.get("/items", params={"size": 10})
+
+        assert dataset["builds"] == [10, 20]
+
+    def test_if_modified_since(self, client):
+        assert client.get("/items", headers={"If-Modified-Since": "Wed, 01 Jan 2025 12:00:00 GMT"}).status_code == 304
+        assert client.get("/items", headers={"If-Modified-Since": "Tue, 31 Dec 2024 12:00:00 GMT"}).status_code == 200
+
+    def test_small_bodies_not_compressed(self, client):
+        response = client.get("/items", params={"size": 3}, headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.json()["items"] == [0, 1, 2]
+
+    def test_gzip_body_is_valid(self, client):
+        client.get("/items", headers={"Accept-Encoding": "gzip"})
+        (key,) = list(response_cache._store)
+        body = response_cache.get(key)
+
+        assert gzip.decompress(body.gzip) == body.identity
+
+
+class TestUncachedBodies:
+    """Bodies that are not stored or precompressed"""
+
+    def test_oversized_body_left_to_middleware(self, client, dataset, monkeypatch):
+        monkeypatch.setattr(response_cache._store, "max_bytes", 1000)
+        uncached = response_cache.uncached
+
+        response = client.get("/items", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"  # GZipMiddleware
+        assert response.headers["etag"].startswith('W/"')
+        assert len(response_cache._store) == 0
+        assert response_cache.stats()["uncached"] == uncached + 1
+
+    def test_opted_out_route_revalidates_without_building(self, client, dataset):
+        etag = client.get("/items", params={"store": False}).headers["etag"]
+
+        response = client.get("/items", params={"store": False}, headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert dataset["builds"] == [500]
+        assert len(response_cache._store) == 0
@@ -0,0 +1,162 @@
+"""
+Unit tests for the shared HTTP client and the climate API clients using it
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core import http_client
+from app.services.apis.arpansa import ARPANSAClient
+from app.services.apis.open_meteo import OpenMeteoClient
+from app.services.apis.waqi import WAQIClient
+from app.services.climate_updater import ClimateUpdateService
+
+
+def mock_session(status=200, json_data=None, side_effect=None):
+    """Session whose get() returns an async context manager yielding a response"""
+    response = MagicMock(status=status)
+    response.json = AsyncMock(return_value=json_data or {})
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response, side_effect=side_effect)
+    context.__aexit__ = AsyncMock(return_value=False)
+    session = MagicMock()
+    session.get = MagicMock(return_value=context)
+    return session
+
+
+class TestSharedSession:
+    """Lifecycle of the process-wide session"""
+
+    @pytest.mark.asyncio
+    async def test_session_is_reused_and_closed(self):
+        session = await http_client.init_http_client()
+
+        assert http_client.get_http_session() is session
+        assert session.connector.limit == http_client.settings.HTTP_CLIENT_POOL_SIZE
+        assert session.connector.limit_per_host == http_client.settings.HTTP_CLIENT_PER_HOST
+
+        await http_client.close_http_client()
+
+        assert session.closed
+        replacement = http_client.get_http_session()
+        assert replacement is not session
+        await http_client.close_http_client()
+
+
+class TestClientsUseSession:
+    """API clients reuse the injected session"""
+
+    @pytest.mark.asyncio
+    async def test_open_meteo_uses_injected_session(self):
+        session = mock_session(json_data={"current": {"temperature_2m": 21.5}, "daily": {}})
+        client = OpenMeteoClient(session)
+
+        first = await client.get_weather(-37.8, 144.9)
+        await client.get_weather(-37.9, 145.0)
+
+        assert first["temperature_current"] == 21.5
+        assert session.get.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_waqi_stations_share_one_session(self):
+        session = mock_session(json_data={"status": "error"})
+        client = WAQIClient("token", session)
+
+        assert await client.get_melbourne_stations_aqi() == {}
+        assert session.get.call_count == len(client.melbourne_stations)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("call", [
+        lambda session: OpenMeteoClient(session).get_weather(-37.8, 144.9),
+        lambda session: ARPANSAClient(session).get_uv_index(),
+        lambda session: WAQIClient("token", session).get_air_quality_by_coords(-37.8, 144.9),
+    ])
+    async def test_timeouts_raise_upstream_error(self, call):
+        with pytest.raises(http_client.UpstreamError, match="timed out"):
+            await call(mock_session(side_effect=asyncio.TimeoutError()))
+
+    @pytest.mark.asyncio
+    async def test_waqi_error_status_raises(self):
+        client = WAQIClient("token", mock_session(status=429))
+
+        with pytest.raises(http_client.UpstreamError, match="HTTP 429"):
+            await client.get_air_quality_by_coords(-37.8, 144.9)
+
+    @pytest.mark.asyncio
+    async def test_waqi_station_without_reading_returns_none(self):
+        session = mock_session(json_data={"status": "ok", "data": {"aqi": "-"}})
+
+        assert await WAQIClient("token", session).get_air_quality_by_coords(-37.8, 144.9) is None
+
+    def test_update_service_injects_session(self):
+        session = MagicMock()
+        service = ClimateUpdateService(AsyncMock(), http_session=session)
+
+        assert service.weather_client.session is session
+        assert service.uv_client.session is session
+        assert service.aqi_client.session is session
+
+
+def weather_result(temperature):
+    """One location's Open-Meteo result"""
+    return {"current": {"temperature_2m": temperature}, "daily": {"temperature_2m_max": [temperature + 5]}}
+
+
+class TestBulkWeather:
+    """Multi-location Open-Meteo requests"""
+
+    @pytest.mark.asyncio
+    async def test_locations_are_packed_into_few_requests(self):
+        client = OpenMeteoClient(MagicMock())
+        client.MAX_LOCATIONS_PER_REQUEST = 2
+        client._request = AsyncMock(side_effect=lambda chunk: [weather_result(lat) for lat, _ in chunk])
+
+        results = await client.get_weather_bulk([(1.0, 0.0), (2.0, 0.0), (3.0, 0.0)])
+
+        assert client._request.await_count == 2
+        assert [r["temperature_current"] for r in results] == [1.0, 2.0, 3.0]
+        assert results[2]["temperature_max"] == 8.0
+
+    @pytest.mark.asyncio
+    async def test_failed_chunk_yields_none_for_its_locations(self):
+        client = OpenMeteoClient(MagicMock())
+        client.MAX_LOCATIONS_PER_REQUEST = 2
+        client._request = AsyncMock(
+            side_effect=[[weather_result(1.0), weather_result(2.0)], http_client.UpstreamError("HTTP 500")]
+        )
+
+        results = await client.get_weather_bulk([(1.0, 0.0), (2.0, 0.0), (3.0, 0.0)])
+
+        assert results[2] is None and results[0]["temperature_current"] == 1.0
+
+    @pytest.mark.asyncio
+    async def test_request_sends_comma_separated_coordinates(self):
+        session = mock_session(json_data=[weather_result(1.0), weather_result(2.0)])
+
+        data = await OpenMeteoClient(session)._request([(-37.81, 144.96), (-37.9, 145.0)])
+
+        params = session.get.call_args.kwargs["params"]
+        assert params["latitude"] == "-37.8100,-37.9000"
+        assert params["longitude"] == "144.9600,145.0000"
+        assert len(data) == 2
+
+    @pytest.mark.asyncio
+    async def test_update_service_falls_back_for_missing_weather(self):
+        service = ClimateUpdateService(AsyncMock(), http_session=MagicMock())
+        suburbs = [
+            {"id": 1, "name": "Carlton", "latitude": -37.8, "longitude": 144.97},
+            {"id": 2, "name": "Richmond", "latitude": -37.82, "longitude": 145.0},
+        ]
+        service.scheduler.max_retries = 0
+        service.weather_client.get_weather_bulk = AsyncMock(return_value=[{"temperature_current": 20}, None])
+        service.weather_client.get_weather = AsyncMock(return_value={"temperature_current": 21})
+        service.aqi_client.get_nearest_station_aqi = AsyncMock(return_value=None)
+        service.climate_repo.bulk_upsert_climate = AsyncMock(return_value=2)
+
+        weather_by_id = await service._fetch_weather_bulk(suburbs)
+        await service._process_suburbs(suburbs, {"uv_index": 3}, weather_by_id)
+        await service._flush_climate()
+
+        service.weather_client.get_weather.assert_awaited_once_with(-37.82, 145.0)
+        records = service.climate_repo.bulk_upsert_climate.await_args.args[0]
+        assert {r["suburb_id"]: r["temperature_current"] for r in records} == {1: 20, 2: 21}
@@ -0,0 +1,152 @@
+"""
+Unit tests for the in-memory plant catalog
+"""
+import dataclasses
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.plant_catalog import PlantCatalog, PlantRecord
+
+
+def make_plant(plant_id, name, scientific_name=None, category="herb", updated_at=None):
+    """Plant-like object with every column set to None except the given ones"""
+    values = {field.name: None for field in dataclasses.fields(PlantRecord)}
+    values.update(
+        id=plant_id,
+        plant_name=name,
+        scientific_name=scientific_name,
+        plant_category=category,
+        beneficial_companions="Basil, Marigold",
+        updated_at=updated_at or datetime(2025, 1, 1)
+    )
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def plants():
+    """A small plant table"""
+    return [
+        make_plant(1, "Basil", "Ocimum basilicum"),
+        make_plant(2, "Sweet Basil", "Ocimum basilicum var. sweet"),
+        make_plant(3, "Tomato", "Solanum lycopersicum", category="vegetable"),
+        make_plant(4, "", category="flower"),
+    ]
+
+
+@pytest.fixture
+def repository(plants):
+    """Repository with mocked catalog queries"""
+    repo = DatabasePlantRepository(AsyncMock())
+    repo.get_all_plant_objects = AsyncMock(return_value=plants)
+    repo.get_catalog_state = AsyncMock(return_value=(len(plants), datetime(2025, 1, 1)))
+    repo.get_plant_biophysics = AsyncMock(return_value={})
+    repo.save_plant_biophysics = AsyncMock(return_value=0)
+    return repo
+
+
+@pytest.fixture
+def catalog():
+    """Fresh catalog instance"""
+    return PlantCatalog()
+
+
+class TestCatalogLoading:
+    """Loading and versioning"""
+
+    @pytest.mark.asyncio
+    async def test_load_skips_unnamed_plants(self, catalog, repository):
+        """Rows without a plant name are excluded, as in get_all_plants"""
+        snapshot = await catalog.load(repository)
+
+        assert len(snapshot) == 3
+        assert [p["plant_name"] for p in snapshot.plants] == ["Basil", "Sweet Basil", "Tomato"]
+
+    @pytest.mark.asyncio
+    async def test_ensure_loaded_loads_once(self, catalog, repository):
+        """Subsequent calls reuse the snapshot without querying"""
+        first = await catalog.ensure_loaded(repository)
+        second = await catalog.ensure_loaded(repository)
+
+        assert first is second
+        assert repository.get_all_plant_objects.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_reload_bumps_version_and_invalidates_cache(self, catalog, repository):
+        """Each reload publishes a new version and clears plant caches"""
+        with patch("app.services.plant_catalog.invalidate_tags", new_callable=AsyncMock) as mock_invalidate:
+            first = await catalog.load(repository)
+            mock_invalidate.assert_not_awaited()
+            second = await catalog.load(repository)
+
+        assert (first.version, second.version) == (1, 2)
+        assert catalog.version == 2
+        mock_invalidate.assert_awaited_once_with("plant:*")
+
+    @pytest.mark.asyncio
+    async def test_refresh_if_stale(self, catalog, repository):
+        """Reloads only when count or max(updated_at) changes"""
+        await catalog.load(repository)
+
+        assert await catalog.refresh_if_stale(repository) is False
+
+        repository.get_catalog_state.return_value = (4, datetime(2025, 2, 1))
+        with patch("app.services.plant_catalog.invalidate_tags", new_callable=AsyncMock):
+            assert await catalog.refresh_if_stale(repository) is True
+        assert catalog.version == 2
+
+
+class TestCatalogLookups:
+    """Index lookups on a snapshot"""
+
+    @pytest.mark.asyncio
+    async def test_records_are_frozen(self, catalog, repository):
+        """Plant records cannot be modified"""
+        snapshot = await catalog.load(repository)
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            snapshot.get_by_id(1).plant_name = "Changed"
+
+    @pytest.mark.asyncio
+    async def test_find_by_name_prefers_exact_match(self, catalog, repository):
+        """Exact names win over substring matches, then substrings are searched"""
+        snapshot = await catalog.load(repository)
+
+        assert snapshot.find_by_name("  SWEET BASIL ").id == 2
+        assert snapshot.find_by_name("basil").id == 1
+        assert snapshot.find_by_name("lycopersicum").plant_name == "Tomato"
+        assert snapshot.find_by_name("cucumber") is None
+
+    @pytest.mark.asyncio
+    async def test_id_category_and_batch_lookups(self, catalog, repository):
+        """Dictionary lookups match the repository's contract"""
+        snapshot = await catalog.load(repository)
+
+        assert snapshot.get_dict_by_id(3)["plant_name"] == "Tomato"
+        assert snapshot.get_dict_by_id(99) is None
+        assert [p["id"] for p in snapshot.get_by_category("herb")] == [1, 2]
+        batch = snapshot.find_many_by_names(["Tomato", "ocimum basilicum", "Unknown"])
+        assert set(batch) == {"tomato", "ocimum basilicum"}
+        assert batch["ocimum basilicum"]["id"] == 1
+
+    @pytest.mark.asyncio
+    async def test_matrix_covers_snapshot(self, catalog, repository):
+        """The scoring matrix is built lazily over the snapshot plants"""
+        snapshot = await catalog.load(repository)
+
+        assert snapshot.matrix is snapshot.matrix
+        assert snapshot.matrix.rows_for(snapshot.plants).tolist() == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_records_carry_biophysics(self, catalog, repository):
+        """Each record holds read-only precomputed biophysics; missing rows are stored"""
+        snapshot = await catalog.load(repository)
+
+        biophysics = snapshot.get_by_id(3).biophysics
+        assert biophysics["base_water_need"] == 3.0 * 1.4
+        with pytest.raises(TypeError):
+            biophysics["lai_proxy"] = 0
+        saved = repository.save_plant_biophysics.await_args.args[0]
+        assert [row["plant_id"] for row in saved] == [1, 2, 3]
@@ -0,0 +1,88 @@
+"""
+Unit tests for streaming the plant catalog
+"""
+import dataclasses
+import json
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from app.repositories.database_plant_repository import DatabasePlantRepository
+from app.services.plant_catalog import PlantCatalog, PlantRecord
+from app.services.plant_service import PlantService
+
+
+def make_plant(plant_id, name, category="herb"):
+    """Plant-like object with every column set to None except the given ones"""
+    values = {field.name: None for field in dataclasses.fields(PlantRecord)}
+    values.update(id=plant_id, plant_name=name, plant_category=category, updated_at=datetime(2025, 1, 1))
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def repository():
+    """Repository with five plants behind mocked catalog queries"""
+    plants = [make_plant(i, f"Plant {i}") for i in range(1, 6)]
+    repo = DatabasePlantRepository(AsyncMock())
+    repo.get_all_plant_objects = AsyncMock(return_value=plants)
+    repo.get_catalog_state = AsyncMock(return_value=(len(plants), datetime(2025, 1, 1)))
+    repo.get_plant_biophysics = AsyncMock(return_value={})
+    repo.save_plant_biophysics = AsyncMock(return_value=0)
+    return repo
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+class TestStreamAllPlants:
+    """Chunked JSON and NDJSON output"""
+
+    @pytest.mark.asyncio
+    async def test_json_stream_matches_response_shape(self, repository):
+        service = PlantService(repository)
+        snapshot = await PlantCatalog().load(repository)
+
+        chunks = await collect(service.stream_all_plants(snapshot, batch_size=2))
+        body = json.loads(b"".join(chunks))
+
+        assert len(chunks) == 5  # opening, three batches, closing
+        assert body["total_count"] == 5
+        assert [plant["id"] for plant in body["plants"]] == [1, 2, 3, 4, 5]
+        assert body["plants"][0] == service.plant_with_media(snapshot.plants[0])
+
+    @pytest.mark.asyncio
+    async def test_ndjson_one_plant_per_line(self, repository):
+        service = PlantService(repository)
+        snapshot = await PlantCatalog().load(repository)
+
+        body = b"".join(await collect(service.stream_all_plants(snapshot, ndjson=True, batch_size=2)))
+        lines = body.decode().splitlines()
+
+        assert body.endswith(b"\n")
+        assert [json.loads(line)["plant_name"] for line in lines] == [f"Plant {i}" for i in range(1, 6)]
+
+    @pytest.mark.asyncio
+    async def test_images_are_opt_in(self, repository):
+        service = PlantService(repository)
+        snapshot = await PlantCatalog().load(repository)
+
+        with patch("app.services.plant_service.image_to_base64", return_value="data:image/jpeg;base64,AA") as encode:
+            plain = json.loads(b"".join(await collect(service.stream_all_plants(snapshot))))
+            assert encode.call_count == 0
+
+            inlined = json.loads(b"".join(await collect(service.stream_all_plants(snapshot, include_images=True))))
+            assert encode.call_count == 5
+
+        assert plain["plants"][0]["media"]["image_base64"] == ""
+        assert inlined["plants"][0]["media"]["image_base64"] == "data:image/jpeg;base64,AA"
+
+    @pytest.mark.asyncio
+    async def test_shared_catalog_dicts_are_not_modified(self, repository):
+        service = PlantService(repository)
+        snapshot = await PlantCatalog().load(repository)
+
+        await collect(service.stream_all_plants(snapshot))
+
+        assert "media" not in snapshot.plants[0]
@@ -0,0 +1,182 @@
+"""
+Unit tests for the quantification service batch mode
+"""
+import dataclasses
+import itertools
+import pytest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core.config import settings
+from app.recommender.engine import load_all_plants
+from app.schemas.request import SitePreferences, UserPreferences
+from app.services.plant_catalog import PlantRecord
+from app.services.quantification_service import QuantificationService
+
+
+RECORD_FIELDS = {field.name for field in dataclasses.fields(PlantRecord)}
+
+
+def make_plant(category, characteristics=None, position=None, plant_type=None,
+               plant_spacing=None, days_to_maturity=None, time_to_maturity_days=None):
+    """Plant-like object with the attributes the quantification reads"""
+    return SimpleNamespace(
+        id=None,
+        plant_name=f"{category} plant",
+        plant_category=category,
+        characteristics=characteristics,
+        position=position,
+        plant_type=plant_type,
+        plant_spacing=plant_spacing,
+        days_to_maturity=days_to_maturity,
+        time_to_maturity_days=time_to_maturity_days,
+        updated_at=datetime(2025, 1, 1)
+    )
+
+
+@pytest.fixture(scope="module")
+def plants():
+    """CSV catalog records plus hand-made plants covering every branch"""
+    csv_plants = load_all_plants(settings.CSV_PATHS)[::10]
+    records = [
+        PlantRecord(**{field: plant.get(field) for field in RECORD_FIELDS})
+        for plant in csv_plants
+    ]
+    extras = [
+        make_plant("herb", "Lush, fragrant, attracts bees, native, hardy", "Full sun", "Shrub", "45cm", "50 days"),
+        make_plant("vegetable", "Compact dwarf, moist soil, high maintenance, pruning, toxic", None, "Climbing vine",
+                   "200 cm", "90-130 days"),
+        make_plant("flower", "Drought tolerant, aromatic, thorns", "dry position", "tree", "no spacing",
+                   time_to_maturity_days=150),
+        make_plant("fruit"),
+        make_plant("flower", "pollen, low maintenance, dense", plant_spacing="10", days_to_maturity="1 2 3"),
+    ]
+    return records + extras
+
+
+@pytest.fixture
+def service():
+    return QuantificationService()
+
+
+SITES = [
+    SitePreferences(),
+    SitePreferences(location_type="backyard", area_m2=12.0, sun_exposure="full_sun",
+                    wind_exposure="windy", containers=False),
+    SitePreferences(sun_exposure="low_light", wind_exposure="sheltered",
+                    container_sizes=["large", "very_large", "unknown"]),
+]
+
+PREFERENCES = [
+    UserPreferences(),
+    UserPreferences(goal="edible", season_intent="plan_ahead"),
+    UserPreferences(goal="ornamental"),
+    UserPreferences(goal="other"),
+]
+
+SUBURBS = [
+    None,
+    SimpleNamespace(name="Richmond", suburb_heat_category="Very High Heat", suburb_heat_intensity=10.0),
+    SimpleNamespace(name="Carlton", suburb_heat_category="Low Heat", suburb_heat_intensity=5.0),
+]
+
+
+class TestQuantifyMany:
+    """quantify_many must match the single-plant path exactly"""
+
+    @pytest.mark.parametrize("site, preferences, suburb", list(itertools.product(SITES, PREFERENCES, SUBURBS)))
+    def test_matches_single_plant_quantification(self, service, plants, site, preferences, suburb):
+        """Impact, metrics and suitability are identical for every plant"""
+        with patch("app.services.quantification_service.random.uniform", return_value=75.0):
+            results = service.quantify_many(plants, site, preferences, suburb, plant_count=3)
+
+            assert len(results) == len(plants)
+            for plant, result in zip(plants, results):
+                expected = service.quantify_plant_impact_with_metrics(plant, site, preferences, suburb, plant_count=3)
+                assert result == expected
+
+    def test_context_normalized_once(self, service, plants):
+        """Site context is derived once per batch, not per plant"""
+        with patch.object(service, "_normalize_context", wraps=service._normalize_context) as mock_context:
+            service.quantify_many(plants, SITES[0], PREFERENCES[0], SUBURBS[1])
+
+        assert mock_context.call_count == 1
+
+    def test_empty_batch(self, service):
+        """No plants, no results"""
+        assert service.quantify_many([], SITES[0], PREFERENCES[0], None) == []
+
+    def test_stored_biophysics_match_parsed_values(self, service, plants):
+        """Records carrying stored biophysics quantify exactly like parsed plants"""
+        records = [
+            PlantRecord(id=i, plant_name=p.plant_name, plant_category=p.plant_category,
+                        biophysics=service.derive_static_biophysics(p))
+            for i, p in enumerate(plants)
+        ]
+
+        with patch.object(service, "derive_static_biophysics") as mock_derive:
+            stored = service.quantify_many(records, SITES[1], PREFERENCES[1], SUBURBS[1])
+        mock_derive.assert_not_called()
+
+        parsed = service.quantify_many(plants, SITES[1], PREFERENCES[1], SUBURBS[1])
+        assert [metrics for _, metrics, _ in stored] == [metrics for _, metrics, _ in parsed]
+
+
+class TestEnsureBiophysics:
+    """Lazy compute-and-store of plant biophysics"""
+
+    @pytest.fixture
+    def table_plants(self):
+        plants = [
+            make_plant("herb", "fragrant", plant_spacing="20cm"),
+            make_plant("vegetable", "moist"),
+            make_plant("flower", "drought"),
+        ]
+        for plant_id, plant in enumerate(plants, start=1):
+            plant.id = plant_id
+        return plants
+
+    @pytest.fixture
+    def repository(self, service, table_plants):
+        """Fresh row for plant 1, stale row for plant 2, no row for plant 3"""
+        fresh = SimpleNamespace(
+            **service.derive_static_biophysics(table_plants[0]),
+            plant_updated_at=table_plants[0].updated_at,
+            version=service.BIOPHYSICS_VERSION
+        )
+        stale = SimpleNamespace(
+            **service.derive_static_biophysics(table_plants[1]),
+            plant_updated_at=datetime(2024, 1, 1),
+            version=service.BIOPHYSICS_VERSION
+        )
+        repo = Mock()
+        repo.get_plant_biophysics = AsyncMock(return_value={1: fresh, 2: stale})
+        repo.save_plant_biophysics = AsyncMock(return_value=2)
+        return repo
+
+    @pytest.mark.asyncio
+    async def test_stores_only_missing_and_stale_rows(self, service, repository, table_plants):
+        biophysics = await service.ensure_biophysics(repository, table_plants)
+
+        assert biophysics == {p.id: service.derive_static_biophysics(p) for p in table_plants}
+        saved = repository.save_plant_biophysics.await_args.args[0]
+        assert [row["plant_id"] for row in saved] == [2, 3]
+        assert all(row["version"] == service.BIOPHYSICS_VERSION for row in saved)
+
+    @pytest.mark.asyncio
+    async def test_force_recomputes_everything(self, service, repository, table_plants):
+        await service.ensure_biophysics(repository, table_plants, force=True)
+
+        repository.get_plant_biophysics.assert_not_awaited()
+        assert len(repository.save_plant_biophysics.await_args.args[0]) == 3
+
+    @pytest.mark.asyncio
+    async def test_unreadable_table_still_returns_values(self, service, repository, table_plants):
+        """Before the migration runs, values are computed in memory and not stored"""
+        repository.get_plant_biophysics.side_effect = Exception("relation does not exist")
+
+        biophysics = await service.ensure_biophysics(repository, table_plants)
+
+        assert set(biophysics) == {1, 2, 3}
+        repository.save_plant_biophysics.assert_not_awaited()
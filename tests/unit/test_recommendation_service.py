@@ -0,0 +1,242 @@
+"""
+Unit tests for the recommendation service pipeline
+"""
+import dataclasses
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+from app.core.config import settings
+from app.recommender import engine
+from app.recommender.engine import (
+    load_all_plants, merge_user_preferences, select_environment, hard_filter,
+    relax_if_needed, score_and_rank, category_diversity
+)
+from app.recommender.scoring import weights
+from app.schemas.request import RecommendationRequest, UserRequest
+from app.services.plant_catalog import CatalogSnapshot, PlantRecord, plant_catalog
+from app.services.recommendation_service import RecommendationService
+from app.utils.cache import invalidate_cache
+
+
+RECORD_FIELDS = {field.name for field in dataclasses.fields(PlantRecord)}
+
+
+@pytest.fixture(scope="module")
+def catalog_plants():
+    """CSV plants with database-style ids"""
+    plants = load_all_plants(settings.CSV_PATHS)
+    if not plants:
+        pytest.skip("Plant CSV files not available")
+    return [dict(plant, id=i + 1) for i, plant in enumerate(plants)]
+
+
+@pytest.fixture
+def snapshot(catalog_plants, monkeypatch):
+    """Install a catalog snapshot built from the CSV plants"""
+    records = [
+        PlantRecord(**{k: v for k, v in plant.items() if k in RECORD_FIELDS})
+        for plant in catalog_plants
+    ]
+    snapshot = CatalogSnapshot(records, catalog_plants, version=1, row_count=len(records), max_updated_at=None)
+    monkeypatch.setattr(plant_catalog, "_snapshot", snapshot)
+    return snapshot
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Each test starts with an empty response cache"""
+    invalidate_cache()
+    yield
+    invalidate_cache()
+
+
+@pytest.fixture
+def climate_repository():
+    """Climate repository without data for any suburb"""
+    repo = Mock()
+    repo.get_latest_climate_by_suburb = AsyncMock(return_value=None)
+    repo.get_suburb_by_name = AsyncMock(return_value=None)
+    return repo
+
+
+@pytest.fixture
+def service(climate_repository):
+    """Service with a mocked plant repository"""
+    return RecommendationService(Mock(), climate_repository)
+
+
+def make_request(n=6, **preferences):
+    """Recommendation request with the given preference overrides"""
+    return RecommendationRequest(
+        suburb="Richmond",
+        n=n,
+        user_preferences=UserRequest(preferences=preferences)
+    )
+
+
+def legacy_pipeline(plants, request):
+    """The list-based pipeline the service used before the indexed path"""
+    env = select_environment(request.suburb, {}, cli_override_climate_zone=request.climate_zone)
+    user = merge_user_preferences(request.user_preferences.dict())
+    notes = []
+    candidates = relax_if_needed(hard_filter(plants, user, env), plants, user, env, request.n, notes=notes)
+    ranked = score_and_rank(candidates, user, env, weights)
+    top = category_diversity(ranked, max_per_cat=2, target_count=request.n)[:request.n]
+    return [(round(score, 1), plant["plant_name"]) for score, plant, _ in top], notes
+
+
+class TestGenerateRecommendations:
+    """End-to-end behaviour of generate_recommendations"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("n, preferences", [
+        (6, {}),
+        (9, {"goal": "edible", "colors": ["red"], "maintainability": "high"}),
+        (3, {"goal": "ornamental", "fragrant": False, "time_to_results": "patient"}),
+    ])
+    async def test_matches_legacy_pipeline(self, service, snapshot, catalog_plants, n, preferences):
+        """Same recommendations and notes as the list-based pipeline"""
+        request = make_request(n=n, **preferences)
+
+        output = await service.generate_recommendations(request)
+
+        expected, expected_notes = legacy_pipeline(catalog_plants, request)
+        assert [(r["score"], r["plant_name"]) for r in output["recommendations"]] == expected
+        assert output["notes"] == expected_notes
+
+    @pytest.mark.asyncio
+    async def test_stages_shared_across_preferences(self, service, snapshot, climate_repository):
+        """Requests differing only in scoring preferences reuse environment and candidates"""
+        with patch("app.services.recommendation_service.hard_filter_indexed",
+                   wraps=engine.hard_filter_indexed) as mock_filter:
+            await service.generate_recommendations(make_request(colors=["red"]))
+            await service.generate_recommendations(make_request(colors=["blue"], fragrant=False))
+            await service.generate_recommendations(make_request(goal="edible"))
+
+        assert climate_repository.get_latest_climate_by_suburb.await_count == 1
+        assert mock_filter.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_cached_stages_are_not_mutated(self, service, snapshot):
+        """Returned notes are copies of the cached stage output"""
+        first = await service.generate_recommendations(make_request(n=9, goal="edible"))
+        first["notes"].append("mutated")
+
+        second = await service.generate_recommendations(make_request(n=9, goal="edible", colors=["red"]))
+
+        assert "mutated" not in second["notes"]
+
+    @pytest.mark.asyncio
+    async def test_cached_computation_uses_its_own_session(self, snapshot, climate_repository):
+        """The shared computation never touches the calling request's session"""
+        request_climate = Mock()
+        request_climate.get_latest_climate_by_suburb = AsyncMock(side_effect=AssertionError("request session used"))
+        opened = []
+
+        @asynccontextmanager
+        async def session_factory():
+            opened.append(Mock())
+            yield opened[-1]
+
+        service = RecommendationService(Mock(), request_climate, session_factory=session_factory)
+        with patch("app.services.recommendation_service.ClimateRepository", return_value=climate_repository):
+            output = await service.generate_recommendations(make_request())
+
+        assert output["recommendations"]
+        assert len(opened) == 1
+        climate_repository.get_latest_climate_by_suburb.assert_awaited_once()
+
+
+class TestGenerateRecommendationsBatch:
+    """Batch recommendations for many profiles"""
+
+    @pytest.mark.asyncio
+    async def test_results_match_single_requests_in_order(self, service, snapshot):
+        """Each batch result equals the single-request output at the same index"""
+        requests = [
+            make_request(n=3, goal="edible"),
+            make_request(n=6),
+            make_request(n=4, colors=["red"], fragrant=False),
+        ]
+
+        results = await service.generate_recommendations_batch(requests)
+
+        assert [item["index"] for item in results] == [0, 1, 2]
+        for item, request in zip(results, requests):
+            expected = await service.generate_recommendations(request)
+            assert item["result"]["recommendations"] == expected["recommendations"]
+            assert item["result"]["notes"] == expected["notes"]
+
+    @pytest.mark.asyncio
+    async def test_distinct_suburbs_resolved_once(self, service, snapshot, climate_repository):
+        """Climate is looked up once per distinct suburb, not once per profile"""
+        requests = [make_request(goal="edible"), make_request(colors=["red"]), make_request()]
+        requests.append(RecommendationRequest(suburb="Carlton", n=3, user_preferences=UserRequest()))
+
+        await service.generate_recommendations_batch(requests)
+
+        suburbs = [call.args[0] for call in climate_repository.get_latest_climate_by_suburb.await_args_list]
+        assert sorted(suburbs) == ["Carlton", "Richmond"]
+
+    @pytest.mark.asyncio
+    async def test_failed_profile_reported_per_item(self, service, snapshot):
+        """One failing profile does not fail the rest of the batch"""
+        requests = [make_request(n=3), make_request(n=5)]
+        original = service._build_recommendations
+
+        async def build(request, snap):
+            if request.n == 5:
+                raise ValueError("bad profile")
+            return await original(request, snap)
+
+        with patch.object(service, "_build_recommendations", side_effect=build):
+            results = await service.generate_recommendations_batch(requests)
+
+        assert len(results[0]["result"]["recommendations"]) == 3
+        assert results[1] == {"index": 1, "error": "bad profile"}
+
+
+class TestGenerateRecommendationsWithImpact:
+    """Recommendations enriched with quantified impact"""
+
+    @pytest.mark.asyncio
+    async def test_impact_matches_single_plant_quantification(self, service, snapshot, climate_repository):
+        """Every plant is quantified as quantify_plant_impact would, with one suburb lookup"""
+        suburb = SimpleNamespace(name="Richmond", suburb_heat_category="High Heat", suburb_heat_intensity=9.5)
+        climate_repository.get_suburb_by_name.return_value = suburb
+        request = make_request(n=6, goal="edible")
+
+        with patch("app.services.quantification_service.random.uniform", return_value=75.0):
+            output = await service.generate_recommendations_with_impact(request)
+
+            assert climate_repository.get_suburb_by_name.await_count == 1
+            for rec in output["recommendations"]:
+                plant = snapshot.get_by_id(rec["id"])
+                expected = service.quantification_service.quantify_plant_impact(
+                    plant=plant,
+                    site=request.user_preferences.site,
+                    preferences=request.user_preferences.preferences,
+                    suburb=suburb
+                )
+                assert rec["quantified_impact"] == dataclasses.asdict(expected)
+
+    @pytest.mark.asyncio
+    async def test_unknown_suburb_uses_default_context(self, service, snapshot):
+        """A suburb missing from the database still gets quantified impact"""
+        output = await service.generate_recommendations_with_impact(make_request(n=3))
+
+        impacts = [rec["quantified_impact"] for rec in output["recommendations"]]
+        assert len(impacts) == 3
+        assert all("Richmond" in (impact["community_impact_potential"] or "Richmond") for impact in impacts)
+
+    @pytest.mark.asyncio
+    async def test_base_recommendations_not_mutated(self, service, snapshot):
+        """The cached base output does not gain impact fields"""
+        request = make_request(n=3)
+
+        await service.generate_recommendations_with_impact(request)
+        base = await service.generate_recommendations(request)
+
+        assert all("quantified_impact" not in rec for rec in base["recommendations"])
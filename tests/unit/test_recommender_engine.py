@@ -0,0 +1,242 @@
+"""
+Unit tests for the recommendation engine's vectorised scoring and filtering paths
+"""
+import json
+import pytest
+
+from app.core.config import settings
+from app.recommender.engine import (
+    load_all_plants, score_and_rank, hard_filter, hard_filter_indexed,
+    relax_if_needed, relax_indexed, get_user_preferences, merge_user_preferences,
+    default_user_preferences, select_top_k, category_diversity
+)
+from app.recommender.matrix import PlantMatrix, calculate_scores_batch
+from app.recommender.scoring import calculate_scores, weights
+
+
+@pytest.fixture(scope="module")
+def catalog_plants():
+    """Plants from the bundled CSV files, plus a few awkward records"""
+    plants = load_all_plants(settings.CSV_PATHS)
+    if not plants:
+        pytest.skip("Plant CSV files not available")
+    extras = [
+        {"plant_name": "", "plant_category": "herb"},
+        {"plant_name": "Nameless Sun", "sun_need": None, "maintainability_score": None,
+         "time_to_maturity_days": None, "sowing_months_by_climate": None},
+        {"plant_name": "Odd Sun", "sun_need": "deep_shade", "habit": "vine",
+         "flower_colors": ["purple"], "fragrant": True, "plant_category": "flower",
+         "sowing_months_by_climate": {"temperate": ["March", "Spring"]}},
+    ]
+    return plants + extras
+
+
+@pytest.fixture(scope="module")
+def matrix(catalog_plants):
+    """Matrix built once over the catalog"""
+    return PlantMatrix(catalog_plants)
+
+
+USER_VARIANTS = [
+    {},
+    {
+        "site": {"location_type": "indoors", "area_m2": 1.5, "sun_exposure": "bright_shade",
+                 "wind_exposure": "windy", "containers": True, "container_sizes": ["small"]},
+        "preferences": {"goal": "edible", "edible_types": ["herbs"], "ornamental_types": [],
+                        "colors": ["purple", "white"], "fragrant": True,
+                        "maintainability": "low", "time_to_results": "quick"}
+    },
+    {
+        "site": {"location_type": "balcony", "area_m2": 10, "sun_exposure": "full_sun",
+                 "containers": False, "container_sizes": ["large"]},
+        "preferences": {"ornamental_types": ["flowers"], "colors": ["red"],
+                        "maintainability": "high", "time_to_results": "patient"}
+    },
+    {
+        "site": {"sun_exposure": "unknown"},
+        "preferences": {"maintainability": "other", "time_to_results": "whenever"}
+    },
+    {
+        "site": {"location_type": "indoors", "sun_exposure": "full_sun", "containers": True},
+        "preferences": {"goal": "ornamental"}
+    },
+]
+
+ENV_VARIANTS = [
+    {"climate_zone": "cool", "month_now": "October"},
+    {"climate_zone": "temperate", "month_now": "March"},
+    {"climate_zone": "arid", "month_now": "January"},
+    {"climate_zone": "missing_zone", "month_now": "Smarch"},
+]
+
+
+class TestCalculateScoresBatch:
+    """The batch scorer must match calculate_scores exactly"""
+
+    @pytest.mark.parametrize("user", USER_VARIANTS)
+    @pytest.mark.parametrize("env", ENV_VARIANTS)
+    def test_matches_scalar_scores(self, matrix, catalog_plants, user, env):
+        """Scores and breakdowns are identical to the per-plant scorer"""
+        scores, breakdown = calculate_scores_batch(matrix, user, env)
+
+        for i, plant in enumerate(catalog_plants):
+            expected_score, expected_breakdown = calculate_scores(plant, user, env)
+            assert scores[i] == expected_score
+            for key, value in expected_breakdown.items():
+                assert breakdown[key][i] == value
+
+    def test_scores_subset_of_rows(self, matrix, catalog_plants):
+        """Only the requested rows are scored, in the requested order"""
+        subset = catalog_plants[100:110][::-1]
+        rows = matrix.rows_for(subset)
+
+        scores, _ = calculate_scores_batch(matrix, USER_VARIANTS[1], ENV_VARIANTS[0], rows)
+
+        assert len(scores) == len(subset)
+        for score, plant in zip(scores, subset):
+            assert score == calculate_scores(plant, USER_VARIANTS[1], ENV_VARIANTS[0])[0]
+
+
+class TestPlantMatrix:
+    """Row lookup behaviour"""
+
+    def test_rows_for_uses_plant_id(self):
+        """Plants with an id are found even when the dict is a fresh copy"""
+        plants = [{"id": 7, "plant_name": "Basil"}, {"id": 9, "plant_name": "Mint"}]
+        matrix = PlantMatrix(plants)
+
+        rows = matrix.rows_for([dict(plants[1]), dict(plants[0])])
+
+        assert rows.tolist() == [1, 0]
+
+    def test_rows_for_unknown_plant_raises(self):
+        """Plants outside the matrix are rejected"""
+        matrix = PlantMatrix([{"plant_name": "Basil"}])
+
+        with pytest.raises(KeyError):
+            matrix.rows_for([{"plant_name": "Basil"}])
+
+
+class TestScoreAndRank:
+    """score_and_rank ordering with and without a matrix"""
+
+    @pytest.mark.parametrize("user", USER_VARIANTS[:3])
+    def test_matrix_ranking_matches_scalar(self, matrix, catalog_plants, user):
+        """The vectorised path returns the same ranked list"""
+        env = ENV_VARIANTS[0]
+
+        expected = score_and_rank(catalog_plants, user, env, weights)
+        actual = score_and_rank(catalog_plants, user, env, weights, matrix=matrix)
+
+        assert [(s, p["plant_name"]) for s, p, _ in actual] == \
+            [(s, p["plant_name"]) for s, p, _ in expected]
+        assert [b for _, _, b in actual] == [b for _, _, b in expected]
+
+
+class TestIndexedFilters:
+    """Bitmask filters must select the same plants as the list-based ones"""
+
+    @pytest.mark.parametrize("user", USER_VARIANTS)
+    @pytest.mark.parametrize("env", ENV_VARIANTS)
+    def test_hard_filter_matches(self, matrix, catalog_plants, user, env):
+        """hard_filter_indexed returns hard_filter's plants in the same order"""
+        expected = hard_filter(catalog_plants, user, env)
+
+        rows = hard_filter_indexed(matrix, user, env)
+
+        assert [catalog_plants[i] for i in rows] == expected
+        assert all(catalog_plants[i] is plant for i, plant in zip(rows, expected))
+
+    @pytest.mark.parametrize("user", USER_VARIANTS)
+    @pytest.mark.parametrize("env", ENV_VARIANTS)
+    @pytest.mark.parametrize("target", [5, 200, 5000])
+    def test_relax_matches(self, matrix, catalog_plants, user, env, target):
+        """relax_indexed returns the same candidates, order and notes"""
+        eligible = hard_filter(catalog_plants, user, env)
+        expected_notes = []
+        expected = relax_if_needed(eligible, catalog_plants, user, env, target, notes=expected_notes)
+
+        rows, notes = relax_indexed(matrix, hard_filter_indexed(matrix, user, env), user, env, target)
+
+        assert [id(catalog_plants[i]) for i in rows] == [id(plant) for plant in expected]
+        assert notes == expected_notes
+
+    def test_relax_not_needed(self, matrix):
+        """No relaxation and no notes when the target is already met"""
+        eligible = hard_filter_indexed(matrix, {}, ENV_VARIANTS[0])
+
+        rows, notes = relax_indexed(matrix, eligible, {}, ENV_VARIANTS[0], target=1)
+
+        assert rows is eligible
+        assert notes == []
+
+
+class TestUserPreferences:
+    """In-memory preference merging"""
+
+    def test_merge_matches_file_based_loader(self, tmp_path):
+        """merge_user_preferences gives the same result as the JSON file path"""
+        user_data = {
+            "site": {"location_type": "indoors", "containers": False},
+            "preferences": {"goal": "edible", "colors": []},
+            "extra": {"kept": True}
+        }
+        path = tmp_path / "prefs.json"
+        path.write_text(json.dumps(user_data))
+
+        assert merge_user_preferences(user_data) == get_user_preferences(str(path))
+
+    def test_merge_does_not_mutate_input(self):
+        """Defaults are added to copies, not to the caller's dicts"""
+        user_data = {"site": {"sun_exposure": "full_sun"}}
+
+        merged = merge_user_preferences(user_data)
+
+        assert user_data == {"site": {"sun_exposure": "full_sun"}}
+        assert merged["site"]["sun_exposure"] == "full_sun"
+        assert merged["site"]["location_type"] == "balcony"
+        assert merged["practical"] == default_user_preferences()["practical"]
+
+    def test_invalid_input_falls_back_to_defaults(self):
+        """Malformed sections fall back to the defaults, as the file loader did"""
+        assert merge_user_preferences({"site": None}) == default_user_preferences()
+        assert merge_user_preferences(None) == default_user_preferences()
+
+
+class TestSelectTopK:
+    """The fused top-k selector must match rank + diversity + slice"""
+
+    @pytest.mark.parametrize("user", USER_VARIANTS)
+    @pytest.mark.parametrize("n", [1, 3, 6, 9, 50])
+    @pytest.mark.parametrize("max_per_cat", [1, 2])
+    def test_matches_sorted_pipeline(self, matrix, catalog_plants, user, n, max_per_cat):
+        """Same plants, scores, breakdowns and order as the full sort"""
+        env = ENV_VARIANTS[1]
+        rows = relax_indexed(matrix, hard_filter_indexed(matrix, user, env), user, env, n)[0]
+        candidates = [catalog_plants[i] for i in rows]
+
+        ranked = score_and_rank(candidates, user, env, weights)
+        expected = category_diversity(ranked, max_per_cat=max_per_cat, target_count=n)[:n]
+        actual = select_top_k(rows, user, env, matrix, n=n, max_per_cat=max_per_cat)
+
+        assert [(s, id(p), b) for s, p, b in actual] == [(s, id(p), b) for s, p, b in expected]
+
+    def test_fills_past_cap_and_dedupes(self):
+        """Duplicates are dropped and the cap is relaxed to reach n"""
+        plants = [
+            {"plant_name": "Basil", "scientific_name": "Ocimum", "plant_category": "herb"},
+            {"plant_name": "Basil", "scientific_name": "Ocimum", "plant_category": "vegetable"},
+            {"plant_name": "Mint", "plant_category": "herb"},
+            {"plant_name": "Sage", "plant_category": "herb"},
+        ]
+        matrix = PlantMatrix(plants)
+        rows = matrix.rows_for(plants)
+
+        result = select_top_k(rows, {}, ENV_VARIANTS[1], matrix, n=4, max_per_cat=1)
+
+        assert [p["plant_name"] for _, p, _ in result] == ["Basil", "Mint", "Sage"]
+        assert result[0][1] is plants[0]
+
+    def test_empty_candidates(self, matrix):
+        """No candidates, no recommendations"""
+        assert select_top_k(matrix.rows_for([]), {}, ENV_VARIANTS[0], matrix, n=5) == []
@@ -0,0 +1,56 @@
+"""
+Unit tests for the name and range indexes
+"""
+import pytest
+
+from app.utils.text_search import NameIndex, RangeIndex
+
+
+NAMES = ["Richmond", "Brunswick", "Brunswick East", "East Melbourne", "Carlton", "carlton north", "Brunswick"]
+
+
+@pytest.fixture
+def name_index():
+    return NameIndex(list(range(len(NAMES))), NAMES)
+
+
+def _scan(query):
+    """Linear scan the index must agree with"""
+    matching = [i for i, name in enumerate(NAMES) if query.lower() in name.lower()]
+    matching.sort(key=lambda i: (not NAMES[i].lower().startswith(query.lower()), NAMES[i]))
+    return matching
+
+
+class TestNameIndex:
+    """Substring and fuzzy lookups"""
+
+    @pytest.mark.parametrize("query", ["", "b", "BRUN", "east", "ton", "n", "carlton north", "xyz"])
+    def test_contains_matches_linear_scan(self, name_index, query):
+        assert name_index.contains(query) == _scan(query)
+
+    def test_prefix_matches_first(self, name_index):
+        assert [NAMES[i] for i in name_index.contains("east")] == ["East Melbourne", "Brunswick East"]
+
+    def test_search_applies_limit_without_fuzzy(self, name_index):
+        assert name_index.search("brunswick", limit=2) == ([1, 6], False)
+
+    def test_fuzzy_fallback_for_typos(self, name_index):
+        items, fuzzy = name_index.search("brunswik")
+
+        assert fuzzy is True
+        assert items[:2] == [1, 6]
+
+    def test_no_fuzzy_when_disabled(self, name_index):
+        assert name_index.search("brunswik", fuzzy=False) == ([], False)
+
+
+class TestRangeIndex:
+    """Bisect range queries"""
+
+    def test_between_is_inclusive_and_sorted(self):
+        index = RangeIndex(["a", "b", "c", "d", "e"], [5.0, 1.0, None, 3.0, 3.0])
+
+        assert index.between(3.0, 5.0) == ["d", "e", "a"]
+        assert index.between(high=2.0) == ["b"]
+        assert index.between() == ["b", "d", "e", "a"]
+        assert index.between(6.0, 9.0) == []
@@ -0,0 +1,128 @@
+"""
+Unit tests for the preloaded UHI heat dataset
+"""
+import json
+import os
+import pytest
+
+from app.services.uhi_data import UHIDataStore, build_snapshot
+
+
+def _suburb(suburb_id, name, intensity, category, std_dev=1.0):
+    return {
+        "id": suburb_id,
+        "name": name,
+        "heat": {"intensity": intensity, "category": category, "std_dev": std_dev}
+    }
+
+
+@pytest.fixture
+def raw_data():
+    """Small dataset with one NaN value, as in melbourne_heat_data.json"""
+    return {
+        "metadata": {"source": "test"},
+        "statistics": {"count": 4},
+        "heat_categories": {"High Heat": {"min": 6, "max": 9}},
+        "suburbs": [
+            _suburb("a", "Abbotsford", 5.0, "Moderate Heat"),
+            _suburb("b", "Brunswick", 8.0, "High Heat", std_dev=float("nan")),
+            _suburb("c", "Carlton", 7.0, "High Heat"),
+            _suburb("d", "Docklands", 8.0, "High Heat")
+        ]
+    }
+
+
+@pytest.fixture
+def data_file(tmp_path, raw_data):
+    """Heat data written to disk the way json.dump writes NaN"""
+    path = tmp_path / "melbourne_heat_data.json"
+    path.write_text(json.dumps(raw_data))
+    return path
+
+
+class TestUHISnapshot:
+    """Sanitizing, indexing and prebuilt bodies"""
+
+    def test_nan_is_sanitized_in_data_and_body(self, raw_data):
+        snapshot = build_snapshot(raw_data, "v1")
+
+        assert snapshot.by_id["b"]["heat"]["std_dev"] is None
+        assert json.loads(snapshot.data_body.identity)["suburbs"][1]["heat"]["std_dev"] is None
+
+    def test_metadata_body(self, raw_data):
+        snapshot = build_snapshot(raw_data, "v1")
+
+        assert json.loads(snapshot.metadata_body.identity) == {
+            "metadata": {"source": "test"},
+            "statistics": {"count": 4},
+            "heat_categories": {"High Heat": {"min": 6, "max": 9}}
+        }
+
+    def test_hottest_matches_sorted_filter(self, raw_data):
+        snapshot = build_snapshot(raw_data, "v1")
+
+        expected = sorted(
+            [s for s in snapshot.suburbs if s["heat"]["category"].lower() == "high heat"],
+            key=lambda s: s["heat"]["intensity"],
+            reverse=True
+        )[:2]
+
+        assert snapshot.hottest("HIGH HEAT", limit=2) == expected
+        assert [s["id"] for s in snapshot.hottest(limit=10)] == ["b", "d", "c", "a"]
+        assert snapshot.hottest("Unknown") == []
+
+    def test_missing_intensity_sorts_last(self, raw_data):
+        raw_data["suburbs"].append(_suburb("e", "Elwood", float("nan"), "High Heat"))
+
+        snapshot = build_snapshot(raw_data, "v1")
+
+        assert [s["id"] for s in snapshot.hottest(limit=10)] == ["b", "d", "c", "a", "e"]
+        assert [s["id"] for s in snapshot.in_heat_range(min_intensity=0)] == ["d", "b", "c", "a"]
+
+    def test_search_and_fuzzy_fallback(self, raw_data):
+        snapshot = build_snapshot(raw_data, "v1")
+
+        suburbs, fuzzy = snapshot.search("BRUN")
+        assert [s["id"] for s in suburbs] == ["b"] and fuzzy is False
+
+        suburbs, fuzzy = snapshot.search("Carltn")
+        assert [s["id"] for s in suburbs] == ["c"] and fuzzy is True
+
+    def test_in_heat_range(self, raw_data):
+        snapshot = build_snapshot(raw_data, "v1")
+
+        assert [s["id"] for s in snapshot.in_heat_range(6.0, 8.0, limit=2)] == ["d", "b"]
+        assert [s["id"] for s in snapshot.in_heat_range(max_intensity=5.0)] == ["a"]
+
+
+class TestUHIDataStore:
+    """Loading and change detection"""
+
+    def test_get_loads_once(self, data_file):
+        store = UHIDataStore(data_file)
+
+        first = store.get()
+
+        assert store.get() is first
+        assert len(first.suburbs) == 4
+
+    def test_reloads_when_file_changes(self, data_file, raw_data):
+        store = UHIDataStore(data_file)
+        first = store.get()
+
+        raw_data["suburbs"].append(_suburb("e", "Elwood", 3.0, "Low Heat"))
+        data_file.write_text(json.dumps(raw_data))
+        stat = os.stat(data_file)
+        os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        second = store.get()
+
+        assert second is not first
+        assert "e" in second.by_id
+        assert second.data_body.etag != first.data_body.etag
+
+    def test_missing_file(self, tmp_path):
+        store = UHIDataStore(tmp_path / "missing.json")
+
+        with pytest.raises(FileNotFoundError):
+            store.get()